@@ -5,28 +5,35 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-## Updated langchain import to match optimized installation dependencies
-## Old import was langchain_openai, now using langchain_community
 from crewai import Agent
-try:
-    from langchain_openai import ChatOpenAI
-except ImportError:
-    try:
-        # Fallback to langchain_community
-        from langchain_community.chat_models import ChatOpenAI
-    except ImportError:
-        # last-resort fallback (older LC): completion-style; should still work
-        from langchain_community.llms import OpenAI as ChatOpenAI
-
-from tools import search_tool, financial_document_tool, investment_tool, risk_tool
+from cached_llm import FakeLLM, with_response_cache
+from tools import search_tool, financial_document_tool, document_search_tool, financial_tables_tool, financial_metrics_tool, investment_tool, risk_tool
 
 ## Proper LLM configuration using OpenAI
 ## Fixed undefined llm variable with proper ChatOpenAI initialization
-llm = ChatOpenAI(
-    model=os.getenv("OPENAI_MODEL", "gpt-5"),
-    api_key=os.getenv("OPENAI_API_KEY"),
-    temperature=0.1  # Low temperature for more consistent financial analysis
-)
+## LLM_BACKEND=fake swaps in a local stand-in for offline runs
+if os.getenv("LLM_BACKEND", "openai").lower() == "fake":
+    llm = FakeLLM()
+else:
+    ## The LangChain client is only imported when the OpenAI backend is used
+    ## Updated langchain import to match optimized installation dependencies
+    try:
+        from langchain_openai import ChatOpenAI
+    except ImportError:
+        try:
+            # Fallback to langchain_community
+            from langchain_community.chat_models import ChatOpenAI
+        except ImportError:
+            # last-resort fallback (older LC): completion-style; should still work
+            from langchain_community.llms import OpenAI as ChatOpenAI
+    llm = ChatOpenAI(
+        model=os.getenv("OPENAI_MODEL", "gpt-5"),
+        api_key=os.getenv("OPENAI_API_KEY"),
+        temperature=0.1  # Low temperature for more consistent financial analysis
+    )
+
+## Repeat requests (same model, messages and tool outputs) are answered from the response cache
+llm = with_response_cache(llm)
 
 # ---- Instantiate tools ----
 pdf_tool = financial_document_tool
@@ -34,7 +41,7 @@ investment_tool = investment_tool
 risk_tool = risk_tool
 
 # Some environments may have search_tool = None → filter it out
-toolbox = [t for t in [financial_document_tool, investment_tool, risk_tool, search_tool] if t]
+toolbox = [t for t in [financial_document_tool, document_search_tool, financial_tables_tool, financial_metrics_tool, investment_tool, risk_tool, search_tool] if t]
 
 ## Completely rewrote financial analyst agent with professional approach
 ## Old agent had satirical, unprofessional description that would provide poor advice
@@ -0,0 +1,318 @@
+"""
+Performance benchmarks for the financial document analyzer
+Usage: python benchmark.py extraction data/TSLA-Q2-2025-Update.pdf --workers 1 2 4 8 --strategy fallback auto
+       python benchmark.py normalize --pages 500
+       python benchmark.py pollers --clients 50 --requests 20 --write-ms 50
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from collections import Counter
+
+
+def bench_extraction(path: str, worker_counts, strategies, repeat: int):
+    """Time full-document extraction for each extraction strategy and worker count"""
+    import pdf_extraction
+
+    if not os.path.exists(path):
+        print(f"❌ File not found: {path}")
+        return 1
+
+    # Force the parallel path whenever more than one worker is requested
+    pdf_extraction.PDF_PARALLEL_MIN_PAGES = 1
+    page_count = pdf_extraction.count_pages(path)
+    print(f"📄 {path}: {page_count} pages, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for strategy in strategies:
+        for workers in worker_counts:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pages = list(pdf_extraction.iter_pages(path, workers=workers, strategy=strategy))
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            baseline = baseline or best
+            extractors = Counter(page.extractor for page in pages)
+            print(f"   {strategy:<8} workers={workers:<3} {len(pages):>4} pages  "
+                  f"best {best:7.2f}s  speedup {baseline / best:5.2f}x  {dict(extractors)}")
+    return 0
+
+
+def _legacy_normalize(text: str) -> str:
+    # The repeated-replace loops previously used by the tools
+    while "  " in text:
+        text = text.replace("  ", " ")
+    while "\n\n\n" in text:
+        text = text.replace("\n\n\n", "\n\n")
+    return text
+
+
+def _synthetic_document(pages: int) -> str:
+    # Columnar statement text with the long space runs PDF extraction produces
+    row = "Total revenues" + " " * 40 + "$ 97,690" + " " * 64 + "$ 96,773" + " " * 128 + "12.4%\n"
+    prose = "Revenue growth was driven by higher deliveries and services income.   " * 6 + "\n\n\n\n"
+    return "".join(f"\n--- Page {n} ---\n" + prose + row * 40 + "\n" * 6 for n in range(1, pages + 1))
+
+
+def bench_normalize(pages: int, repeat: int):
+    """Compare repeated-replace and single-pass whitespace normalisation"""
+    from pdf_extraction import normalize_whitespace
+
+    text = _synthetic_document(pages)
+    print(f"📄 Synthetic document: {pages} pages, {len(text) / (1024 * 1024):.1f} MB")
+
+    results = {}
+    for name, normalize in [("legacy loop", _legacy_normalize), ("single pass", normalize_whitespace)]:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = normalize(text)
+            timings.append(time.perf_counter() - start)
+        print(f"   {name:<12} best {min(timings) * 1000:9.1f} ms")
+
+    print(f"   identical output: {results['legacy loop'] == results['single pass']}")
+    return 0
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def bench_pollers(clients: int, requests: int, analyses: int, write_ms: int):
+    """Concurrent /status pollers against sync-session and async-session handlers
+
+    Runs the API in-process on a scratch SQLite database while a background
+    writer repeatedly holds an exclusive lock for write_ms (a slow worker
+    commit). The sync handler blocks the event loop while it waits; the async
+    handler only blocks its own request. The longest event loop stall is
+    reported alongside throughput and latency.
+    """
+    import sqlite3
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-db-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    import httpx
+    import main as api
+    from database import SessionLocal, init_db
+    from models import Analysis, Document
+
+    init_db()
+    db = SessionLocal()
+    document = Document(filename="bench.pdf", file_hash="0" * 64, file_size=1)
+    db.add(document)
+    db.flush()
+    db.add_all([
+        Analysis(document_id=document.id, task_id=f"bench-{i}", query="bench", status="completed", result="x" * 2000)
+        for i in range(analyses)
+    ])
+    db.commit()
+    db.close()
+
+    api.get_task_status = lambda task_id: "SUCCESS"  # keep the result backend out of the measurement
+
+    @api.app.get("/bench/sync-status/{analysis_id}")
+    async def sync_status(analysis_id: int):
+        # The previous handler shape: a sync Session used inside an async def
+        session = SessionLocal()
+        try:
+            analysis = session.query(Analysis).filter(Analysis.id == analysis_id).first()
+            return {"analysis_id": analysis.id, "status": analysis.status, "result": analysis.result}
+        finally:
+            session.close()
+
+    stop = threading.Event()
+
+    def slow_writer():
+        connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        while not stop.is_set():
+            connection.execute("BEGIN EXCLUSIVE")
+            connection.execute("UPDATE analyses SET error_message = ? WHERE id = 1", (str(time.time()),))
+            time.sleep(write_ms / 1000)
+            connection.execute("COMMIT")
+            time.sleep(write_ms / 1000)
+        connection.close()
+
+    async def run(route: str):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            latencies, loop_lags = [], []
+
+            async def poller(n: int):
+                for i in range(requests):
+                    start = time.perf_counter()
+                    response = await client.get(f"{route}/{(n * requests + i) % analyses + 1}")
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            async def lag_monitor(done: asyncio.Event):
+                # How late a 10 ms sleep wakes up = how long the event loop was blocked
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await asyncio.sleep(0.01)
+                    loop_lags.append(time.perf_counter() - start - 0.01)
+
+            done = asyncio.Event()
+            sampler = asyncio.create_task(lag_monitor(done))
+            start = time.perf_counter()
+            await asyncio.gather(*(poller(n) for n in range(clients)))
+            elapsed = time.perf_counter() - start
+            done.set()
+            await sampler
+        return elapsed, latencies, loop_lags
+
+    writer = threading.Thread(target=slow_writer, daemon=True)
+    if write_ms:
+        writer.start()
+    print(f"🗄️  {clients} clients x {requests} polls, {analyses} analyses, writer lock {write_ms} ms")
+    try:
+        for name, route in [("sync session", "/bench/sync-status"), ("async session", "/status")]:
+            elapsed, latencies, loop_lags = asyncio.run(run(route))
+            print(f"   {name:<14} {len(latencies) / elapsed:8.1f} req/s  "
+                  f"p50 {_percentile(latencies, 0.5) * 1000:7.1f} ms  p95 {_percentile(latencies, 0.95) * 1000:7.1f} ms  "
+                  f"max loop stall {max(loop_lags, default=0) * 1000:7.1f} ms")
+    finally:
+        stop.set()
+    return 0
+
+
+def bench_worker_setup(analyses: int):
+    """Worker start-up cost and per-analysis crew setup, fresh crews vs the warm pool
+
+    Start-up is measured in a fresh interpreter: importing the task module
+    (CrewAI, LangChain, agents, tools) and warming the crew pool. Per-analysis
+    setup compares building the stage crews for every analysis, as before the
+    pool, with checking a warm crew set out of the pool and resetting it. Runs
+    with the offline fake LLM, so no API key is needed.
+    """
+    import subprocess
+    os.environ["LLM_BACKEND"] = "fake"
+    probe = (
+        "import time; t = time.perf_counter(); import tasks; i = time.perf_counter(); "
+        "tasks.crew_pool.warm(); w = time.perf_counter(); "
+        "print(f'{(i - t) * 1000:.0f} {(w - i) * 1000:.0f}')"
+    )
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout.split()
+    import_ms, warm_ms = float(output[-2]), float(output[-1])
+    print(f"🚀 Worker start-up: import {import_ms:.0f} ms, crew pool warm-up {warm_ms:.0f} ms")
+    print(f"   max-tasks-per-child=10 pays the start-up once per 10 analyses "
+          f"({(import_ms + warm_ms) / 10:.0f} ms each)")
+
+    import tasks
+    timings = {"fresh crews": [], "warm pool": []}
+    for _ in range(analyses):
+        start = time.perf_counter()
+        tasks.build_stage_crews()
+        timings["fresh crews"].append(time.perf_counter() - start)
+    tasks.crew_pool.warm()
+    for _ in range(analyses):
+        start = time.perf_counter()
+        with tasks.crew_pool.acquire():
+            pass
+        timings["warm pool"].append(time.perf_counter() - start)
+    for name, values in timings.items():
+        print(f"   {name:<12} p50 {_percentile(values, 0.5) * 1000:8.2f} ms  max {max(values) * 1000:8.2f} ms per analysis")
+    return 0
+
+
+# Modules the API process should never load (they belong to the analysis workers)
+ANALYSIS_STACK = ("crewai", "crewai_tools", "langchain", "langchain_openai", "langchain_community",
+                  "openai", "litellm", "pandas", "numpy", "scipy", "pdfplumber", "pypdf", "PyPDF2")
+
+
+def bench_imports(module: str, top: int, repeat: int):
+    """Cold-start import time and memory of a module, via python -X importtime
+
+    Each run is a fresh interpreter; the best total is reported with the
+    heaviest top-level imports of that run, the peak RSS after import, and any
+    analysis-stack modules that were loaded.
+    """
+    import subprocess
+    probe = (
+        f"import resource, sys; import {module}; "
+        "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss); print(' '.join(sys.modules))"
+    )
+    best = None
+    for _ in range(repeat):
+        run = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], capture_output=True, text=True)
+        if run.returncode != 0:
+            print(run.stderr.strip().splitlines()[-1] if run.stderr.strip() else "import failed")
+            return 1
+        # "import time: <self us> | <cumulative us> | <module>": nested modules are indented
+        # two spaces per level and listed before the module that imported them
+        total, children, pending = 0, [], []
+        for line in run.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if depth == 1:
+                pending.append((int(cumulative), name.strip()))
+            elif depth == 0:
+                if name.strip() == module:
+                    total, children = int(cumulative), pending
+                pending = []
+        if best is None or total < best[0]:
+            rss_kb, loaded = run.stdout.splitlines()[-2:]
+            best = (total, children, int(rss_kb), loaded.split())
+
+    total, children, rss_kb, loaded = best
+    print(f"📦 import {module}: {total / 1000:.0f} ms, peak RSS {rss_kb / 1024:.0f} MB, {len(loaded)} modules loaded")
+    for cumulative, name in sorted(children, reverse=True)[:top]:
+        print(f"   {cumulative / 1000:8.1f} ms  {name}")
+    heavy = sorted({name.split(".")[0] for name in loaded if name.split(".")[0] in ANALYSIS_STACK})
+    print(f"   analysis stack loaded: {', '.join(heavy) if heavy else 'none'}")
+    return 0
+
+
+def main():
+    """Run the selected benchmark"""
+    parser = argparse.ArgumentParser(description="Financial Document Analyzer benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    extraction = subparsers.add_parser("extraction", help="PDF extraction scaling with worker count")
+    extraction.add_argument("path", help="PDF file to extract")
+    extraction.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    extraction.add_argument("--strategy", nargs="+", default=["fallback", "auto"], choices=["fallback", "auto"])
+    extraction.add_argument("--repeat", type=int, default=3)
+
+    normalize = subparsers.add_parser("normalize", help="Whitespace normalisation on a synthetic document")
+    normalize.add_argument("--pages", type=int, default=500)
+    normalize.add_argument("--repeat", type=int, default=3)
+
+    pollers = subparsers.add_parser("pollers", help="Concurrent /status polling with sync vs async sessions")
+    pollers.add_argument("--clients", type=int, default=50)
+    pollers.add_argument("--requests", type=int, default=20)
+    pollers.add_argument("--analyses", type=int, default=200)
+    pollers.add_argument("--write-ms", type=int, default=50)
+
+    worker_setup = subparsers.add_parser("worker-setup", help="Worker start-up and per-analysis crew setup cost")
+    worker_setup.add_argument("--analyses", type=int, default=20)
+
+    imports = subparsers.add_parser("imports", help="Cold-start import time and memory (python -X importtime)")
+    imports.add_argument("--module", default="main", help="Module to import, e.g. main (API) or tasks (worker)")
+    imports.add_argument("--top", type=int, default=15)
+    imports.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.benchmark == "extraction":
+        return bench_extraction(args.path, args.workers, args.strategy, args.repeat)
+    if args.benchmark == "normalize":
+        return bench_normalize(args.pages, args.repeat)
+    if args.benchmark == "pollers":
+        return bench_pollers(args.clients, args.requests, args.analyses, args.write_ms)
+    if args.benchmark == "worker-setup":
+        return bench_worker_setup(args.analyses)
+    if args.benchmark == "imports":
+        return bench_imports(args.module, args.top, args.repeat)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Content-addressed storage for uploaded documents
+
+Each distinct upload is stored once at data/blobs/<hash[:2]>/<hash>.pdf and
+shared by every Document analysis that references it. Documents carry a
+reference count of in-flight analyses; blobs that are no longer referenced
+are kept for a retention period (so re-analysing a filing with a new query
+skips the upload write and reuses its cached extraction) and then evicted,
+oldest first, once they expire or the store exceeds its size budget.
+"""
+import os
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Document
+
+logger = logging.getLogger(__name__)
+
+# Blob store configuration from environment variables
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "data/blobs")
+BLOB_RETENTION_HOURS = float(os.getenv("BLOB_RETENTION_HOURS", "168"))  # unreferenced blobs kept a week
+BLOB_STORE_MAX_MB = int(os.getenv("BLOB_STORE_MAX_MB", "2048"))  # 0 disables the size budget
+
+
+class BlobStore:
+    """Files on disk addressed by their SHA-256"""
+
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        self.root = root
+
+    def path_for(self, file_hash: str) -> str:
+        return os.path.join(self.root, file_hash[:2], f"{file_hash}.pdf")
+
+    def exists(self, file_hash: str) -> bool:
+        return os.path.exists(self.path_for(file_hash))
+
+    def create_temp(self) -> Tuple[int, str]:
+        """Open a temp file inside the store so commit() is an atomic rename"""
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkstemp(dir=self.root, suffix=".upload")
+
+    def commit(self, temp_path: str, file_hash: str) -> str:
+        """Move a fully written temp file into place, or drop it if the blob already exists"""
+        path = self.path_for(file_hash)
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+        return path
+
+    def delete(self, file_hash: str) -> None:
+        try:
+            os.remove(self.path_for(file_hash))
+        except FileNotFoundError:
+            pass
+
+
+blob_store = BlobStore()
+
+
+def acquire_document(db: Session, file_hash: str, filename: str, file_size: int) -> Document:
+    """Get or create the Document for a hash and take a reference on its blob
+
+    The reference is taken before the blob is written, so a concurrent
+    eviction never removes a blob an analysis is about to use. The returned
+    document's file_path is re-read after the increment: None means the blob
+    was never stored or has just been evicted, and must be written again.
+    """
+    document = db.query(Document).filter(Document.file_hash == file_hash).first()
+    if not document:
+        document = Document(filename=filename, file_hash=file_hash, file_size=file_size, ref_count=0)
+        db.add(document)
+        db.flush()
+    db.query(Document).filter(Document.id == document.id).update(
+        {Document.ref_count: Document.ref_count + 1, Document.last_used_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()
+    db.refresh(document)
+    return document
+
+
+def release_document(db: Session, document_id: int) -> None:
+    """Drop one reference once an analysis no longer needs the blob"""
+    db.query(Document).filter(Document.id == document_id, Document.ref_count > 0).update(
+        {Document.ref_count: Document.ref_count - 1, Document.last_used_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def evict_blobs(db: Session, now: Optional[datetime] = None) -> int:
+    """Apply the retention policy to unreferenced blobs and return how many were evicted
+
+    Unreferenced blobs idle longer than BLOB_RETENTION_HOURS are removed, then
+    the least recently used ones until the store fits in BLOB_STORE_MAX_MB.
+    """
+    now = now or datetime.utcnow()
+    expiry = now - timedelta(hours=BLOB_RETENTION_HOURS)
+    max_bytes = BLOB_STORE_MAX_MB * 1024 * 1024
+    stored = db.query(Document).filter(Document.file_path.isnot(None))
+    total = sum(size for (size,) in stored.with_entities(Document.file_size))
+
+    evicted = 0
+    candidates = (
+        stored.filter(Document.ref_count == 0)
+        .order_by(Document.last_used_at.asc())
+        .with_entities(Document.id, Document.file_hash, Document.file_size, Document.last_used_at)
+        .all()
+    )
+    for document_id, file_hash, file_size, last_used_at in candidates:
+        expired = last_used_at is None or last_used_at < expiry
+        if not expired and not (max_bytes and total > max_bytes):
+            break  # ordered oldest first, so nothing later qualifies either
+        if claim_blob(db, document_id, file_hash):
+            total -= file_size
+            evicted += 1
+    if evicted:
+        logger.info(f"Evicted {evicted} unreferenced document blobs")
+    return evicted
+
+
+def claim_blob(db: Session, document_id: int, file_hash: str) -> bool:
+    """Evict one blob if it is still unreferenced, returning whether it was removed
+
+    The conditional update claims the row only while its reference count is
+    zero, and the file is deleted before the claim commits, so an analysis
+    that takes a reference meanwhile waits on the row lock and then sees
+    file_path cleared (and writes the blob again).
+    """
+    claimed = db.query(Document).filter(
+        Document.id == document_id, Document.ref_count == 0, Document.file_path.isnot(None)
+    ).update({Document.file_path: None}, synchronize_session=False)
+    if claimed != 1:
+        db.rollback()
+        return False  # referenced or evicted since the candidates were listed
+    try:
+        blob_store.delete(file_hash)
+    except OSError as e:
+        db.rollback()
+        logger.warning(f"Could not evict blob {file_hash}: {str(e)}")
+        return False
+    db.commit()
+    return True
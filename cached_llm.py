@@ -0,0 +1,117 @@
+"""
+CrewAI LLM wrappers around the response cache
+
+CachedLLM answers identical requests from llm_cache.llm_response_cache
+instead of calling the provider. FakeLLM is a local stand-in
+(LLM_BACKEND=fake) so the crew and the cache can be exercised without
+network access or an API key.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from crewai.llms.base_llm import BaseLLM
+from crewai.utilities.llm_utils import create_llm
+
+from llm_cache import LLM_CACHE_ENABLED, LLMResponseCache, Messages, llm_response_cache, tool_names
+
+logger = logging.getLogger(__name__)
+
+# Simulated provider latency of the fake LLM, to make cache hits visible offline
+FAKE_LLM_LATENCY_MS = int(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+
+
+class CachedLLM(BaseLLM):
+    """Wrap an LLM so identical requests are answered from the response cache
+
+    Only plain-text completions are cached; anything else (e.g. structured
+    tool-call objects) is passed through untouched.
+    """
+
+    def __init__(self, llm: Any, cache: LLMResponseCache = llm_response_cache):
+        self.llm = create_llm(llm)  # accept LangChain chat models as well as CrewAI LLMs
+        self.cache = cache
+        super().__init__(model=self.llm.model, temperature=getattr(self.llm, "temperature", None))
+
+    @property
+    def stop(self) -> List[str]:
+        return getattr(self.llm, "stop", None) or []
+
+    @stop.setter
+    def stop(self, value: List[str]) -> None:
+        # The agent executor sets stop words on the LLM it was given; forward them
+        if hasattr(self, "llm"):
+            self.llm.stop = value
+
+    def call(
+        self,
+        messages: Messages,
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Union[str, Any]:
+        settings = {"temperature": self.temperature, "stop": self.stop}
+        key = self.cache.make_key(self.model, settings, messages, tool_names(tools))
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"LLM response cache hit for {self.model} ({key[:12]})")
+            return cached
+
+        response = self.llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+        if isinstance(response, str) and response.strip():
+            self.cache.put(key, self.model, response)
+        return response
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
+
+
+class FakeLLM(BaseLLM):
+    """Deterministic offline stand-in for the provider
+
+    Answers every request with a final answer derived from the request hash,
+    after FAKE_LLM_LATENCY_MS of simulated latency, and counts its calls.
+    """
+
+    def __init__(self, model: str = "fake-llm", latency_ms: int = FAKE_LLM_LATENCY_MS):
+        super().__init__(model=model, temperature=0.0)
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def call(
+        self,
+        messages: Messages,
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> str:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"Thought: I now know the final answer\nFinal Answer: Offline analysis {digest[:12]}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 128000
+
+
+def with_response_cache(llm: Any) -> Any:
+    """Wrap llm in the response cache unless LLM_CACHE_ENABLED is false"""
+    return CachedLLM(llm) if LLM_CACHE_ENABLED else llm
@@ -10,6 +10,17 @@ load_dotenv()
 # Redis configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+# Worker recycling: crews are pooled and reset between analyses, so children can live
+# for many tasks; the memory cap (KiB) replaces a child that grows past it
+WORKER_MAX_TASKS_PER_CHILD = int(os.getenv("WORKER_MAX_TASKS_PER_CHILD", "200"))
+WORKER_MAX_MEMORY_PER_CHILD_MB = int(os.getenv("WORKER_MAX_MEMORY_PER_CHILD_MB", "2048"))
+
+# Autoscaling mode (start_worker.py): the pool grows with queue depth up to the maximum,
+# admitting tasks only within the memory headroom (see worker_autoscale.py)
+WORKER_AUTOSCALE = os.getenv("WORKER_AUTOSCALE", "false").lower() == "true"
+WORKER_AUTOSCALE_MAX = int(os.getenv("WORKER_AUTOSCALE_MAX", str(os.cpu_count() or 1)))
+WORKER_AUTOSCALE_MIN = int(os.getenv("WORKER_AUTOSCALE_MIN", "1"))
+
 # Create Celery app
 celery_app = Celery(
     "financial_analyzer",
@@ -30,7 +41,9 @@ celery_app.conf.update(
     task_soft_time_limit=12 * 60,  # 12 minutes soft limit
     worker_prefetch_multiplier=1,
     task_acks_late=True,
-    worker_max_tasks_per_child=1000,
+    worker_max_tasks_per_child=WORKER_MAX_TASKS_PER_CHILD,
+    worker_max_memory_per_child=WORKER_MAX_MEMORY_PER_CHILD_MB * 1024,
+    worker_autoscaler="worker_autoscale:MemoryAwareAutoscaler",
     task_routes={
         "tasks.analyze_document": {"queue": "analysis"},
     },
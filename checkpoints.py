@@ -0,0 +1,63 @@
+"""
+Per-stage checkpoints of crew output
+
+Each crew stage (verification, analysis, investment, risk) saves its output
+as soon as it finishes, in its own transaction. When Celery retries a failed
+analysis, the stages that already completed are loaded instead of being
+re-run, so a retry only pays for the stages that did not finish.
+"""
+import logging
+from typing import Dict
+
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import AnalysisCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+def load_checkpoints(analysis_id: int) -> Dict[str, str]:
+    """Completed stage outputs of an analysis, keyed by stage name"""
+    db = SessionLocal()
+    try:
+        rows = db.query(AnalysisCheckpoint.stage, AnalysisCheckpoint.output).filter(
+            AnalysisCheckpoint.analysis_id == analysis_id
+        ).all()
+        return {stage: output for stage, output in rows}
+    finally:
+        db.close()
+
+
+def save_checkpoint(analysis_id: int, stage: str, output: str) -> None:
+    """Record a completed stage (never raises; a lost checkpoint only costs a re-run)"""
+    db = SessionLocal()
+    try:
+        checkpoint = db.query(AnalysisCheckpoint).filter(
+            AnalysisCheckpoint.analysis_id == analysis_id, AnalysisCheckpoint.stage == stage
+        ).first()
+        if checkpoint:
+            checkpoint.output = output
+        else:
+            db.add(AnalysisCheckpoint(analysis_id=analysis_id, stage=stage, output=output))
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # another attempt saved the same stage first
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not checkpoint stage {stage} of analysis {analysis_id}: {str(e)}")
+    finally:
+        db.close()
+
+
+def clear_checkpoints(analysis_id: int) -> None:
+    """Drop an analysis's checkpoints once its result is stored"""
+    db = SessionLocal()
+    try:
+        db.query(AnalysisCheckpoint).filter(AnalysisCheckpoint.analysis_id == analysis_id).delete()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not clear checkpoints of analysis {analysis_id}: {str(e)}")
+    finally:
+        db.close()
@@ -0,0 +1,130 @@
+"""
+Warm pool of per-stage crews reused across analyses in a worker process
+
+Building the stage crews (agent executors, LLM clients, tool wiring) is done
+once when the worker process starts instead of on every analysis. Between
+analyses each crew is reset: task outputs and counters, agent tool results
+and executors, crew memory and the short-term and entity memory stores of
+the crew and its agents are cleared, so nothing from one document's run can
+reach the next. A crew set that fails to reset is dropped
+and rebuilt.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pool configuration from environment variables
+CREW_POOL_ENABLED = os.getenv("CREW_POOL_ENABLED", "true").lower() == "true"
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "1"))  # crew sets per process (raise for --pool=threads)
+
+CrewSet = Dict[str, Any]  # stage name -> Crew
+
+# Per-run attributes of CrewAI objects and the empty values they are reset to
+_TASK_STATE = {"output": None, "used_tools": 0, "tools_errors": 0, "delegations": 0, "start_time": None, "end_time": None}
+_AGENT_STATE = {"agent_executor": None, "tools_results": list, "_times_executed": 0}
+_CREW_STATE = {"usage_metrics": None}
+
+# Per-run memory stores a crew or an agent may hold (with or without a leading underscore)
+_MEMORY_STORES = ("short_term_memory", "_short_term_memory", "entity_memory", "_entity_memory")
+
+
+def _reset_attributes(obj: Any, state: Dict[str, Any]) -> None:
+    for name, empty in state.items():
+        if hasattr(obj, name):
+            setattr(obj, name, empty() if callable(empty) else empty)
+
+
+def _reset_memory_stores(obj: Any) -> None:
+    for name in _MEMORY_STORES:
+        store = getattr(obj, name, None)
+        if store is not None and hasattr(store, "reset"):
+            store.reset()
+
+
+def reset_crew_state(crew: Any) -> None:
+    """Clear everything a kickoff leaves behind on a crew, its tasks and its agents
+
+    Agents are built with memory=True while the stage crews are not, so the
+    agents' own memory stores are cleared as well as the crew's.
+    """
+    for task in crew.tasks:
+        _reset_attributes(task, _TASK_STATE)
+        if hasattr(task, "processed_by_agents"):
+            task.processed_by_agents = set()
+    for agent in crew.agents:
+        _reset_attributes(agent, _AGENT_STATE)
+        _reset_memory_stores(agent)
+    _reset_attributes(crew, _CREW_STATE)
+    if getattr(crew, "memory", False):
+        crew.reset_memories(command_type="all")
+    else:
+        _reset_memory_stores(crew)
+
+
+class CrewPool:
+    """Fixed-size pool of crew sets built by factory, checked out one analysis at a time"""
+
+    def __init__(self, factory: Callable[[], CrewSet], size: int = CREW_POOL_SIZE):
+        self.factory = factory
+        self.size = max(1, size)
+        self._idle: "queue.Queue[CrewSet]" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _build(self) -> CrewSet:
+        started = time.perf_counter()
+        crews = self.factory()
+        logger.info(f"Built crew set ({', '.join(crews)}) in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return crews
+
+    def warm(self) -> None:
+        """Build crew sets up to the pool size (call on worker process start)"""
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                self._idle.put(self._build())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[CrewSet]:
+        """Check out a crew set, building one if the pool is not full; reset and return it afterwards"""
+        crews: Optional[CrewSet] = None
+        try:
+            crews = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                build = self._created < self.size
+                if build:
+                    self._created += 1
+            if build:
+                try:
+                    crews = self._build()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                crews = self._idle.get(timeout=timeout)
+        try:
+            yield crews
+        finally:
+            try:
+                for crew in crews.values():
+                    reset_crew_state(crew)
+                self._idle.put(crews)
+            except Exception as e:
+                logger.warning(f"Dropping crew set that could not be reset: {str(e)}")
+                with self._lock:
+                    self._created -= 1
@@ -2,26 +2,109 @@
 Database configuration and session management
 """
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, Session
-from models import Base
-from typing import Generator
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from models import Base, seed_analysis_counts
+from typing import Any, AsyncGenerator, Dict, Generator, Union
 
 # Database URL from environment variable or default to SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./financial_analyzer.db")
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Connection pool settings for server databases (PostgreSQL, MySQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
 
-# Create session factory
+# SQLite pragmas applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # readers no longer block on writers
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # safe with WAL, fsync only at checkpoints
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # wait for locks instead of failing
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+
+# Async drivers used by the API for the same database
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mariadb": "mariadb+aiomysql",
+}
+
+def to_async_url(url: str) -> str:
+    """
+    Map a sync database URL onto its async driver (sqlite -> aiosqlite, postgresql -> asyncpg,
+    mysql/mariadb -> aiomysql); other backends must name their async driver in the URL
+    """
+    scheme, sep, rest = url.partition("://")
+    backend, _, driver = scheme.partition("+")
+    if backend in ASYNC_DRIVERS:
+        return f"{ASYNC_DRIVERS[backend]}{sep}{rest}"
+    if not driver:
+        raise ValueError(
+            f"No async driver is known for '{backend}' databases; "
+            f"set ASYNC_DATABASE_URL to a URL with an async driver (e.g. {backend}+<driver>://...)"
+        )
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record, in_memory: bool) -> None:
+    cursor = dbapi_connection.cursor()
+    if not in_memory:  # WAL and mmap need a database file
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def create_db_engine(url: str, use_async: bool = False) -> Union[Engine, AsyncEngine]:
+    """
+    Create a sync or async engine tuned for the database backend
+    SQLite gets WAL-mode pragmas on every connection; server databases get a
+    pre-pinged, recycled connection pool sized from the DB_POOL_* settings
+    """
+    backend = make_url(url).get_backend_name()
+    options: Dict[str, Any] = {}
+    if backend == "sqlite":
+        options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+
+    db_engine = create_async_engine(url, **options) if use_async else create_engine(url, **options)
+
+    if backend == "sqlite":
+        database = make_url(url).database
+        in_memory = not database or database == ":memory:"
+        event.listen(
+            db_engine.sync_engine if use_async else db_engine,
+            "connect",
+            lambda dbapi_connection, connection_record: _set_sqlite_pragmas(dbapi_connection, connection_record, in_memory),
+        )
+    return db_engine
+
+# Sync engine for Celery workers and scripts; async engine for the FastAPI handlers
+engine = create_db_engine(DATABASE_URL)
+async_engine = create_db_engine(ASYNC_DATABASE_URL, use_async=True)
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        seed_analysis_counts(connection)
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency to get database session"""
@@ -31,6 +114,15 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def dispose_engines() -> None:
+    """Drop pooled connections inherited from a parent process (call after fork)"""
+    engine.dispose(close=False)
+
 def init_db():
     """Initialize database with tables"""
-    create_tables()
\ No newline at end of file
+    create_tables()
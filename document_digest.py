@@ -0,0 +1,244 @@
+"""
+Deterministic, size-bounded document digest built before the crew runs
+
+Extraction, metrics, statement tables, the keyword/risk signals and section
+detection run once per analysis, in a single page-by-page pass over the
+extracted text. Their results are condensed into a digest
+that goes into the crew inputs, so agents rarely need to pull the full
+document text into their prompts.
+"""
+import os
+import re
+import json
+import logging
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from pdf_extraction import PDFExtractionError, normalize_whitespace
+from extraction_cache import iter_document_pages
+from document_sections import iter_sections
+from financial_metrics import add_text_line_items, compute_metrics, format_metrics, line_items_from_tables
+from financial_tables import extract_financial_tables, format_tables
+from term_scanner import ScanResult, term_scanner
+from term_signals import investment_signals, risk_signals
+
+logger = logging.getLogger(__name__)
+
+# Digest configuration from environment variables
+DIGEST_ENABLED = os.getenv("DIGEST_ENABLED", "true").lower() == "true"
+DIGEST_MAX_CHARS = int(os.getenv("DIGEST_MAX_CHARS", "12000"))  # roughly 3k tokens
+
+# Share of the character budget for each digest part (metrics are always kept whole)
+DIGEST_BUDGET = {"tables": 0.3, "sections": 0.4, "risk_passages": 0.3}
+
+# Sections quoted in the digest, in priority order
+DIGEST_SECTIONS = [
+    "Financial Highlights",
+    "Results of Operations",
+    "Management's Discussion and Analysis",
+    "Liquidity and Capital Resources",
+    "Outlook",
+    "Risk Factors",
+    "Debt",
+]
+
+PASSAGE_MAX_CHARS = 400  # caps runaway "sentences" from tables and lists
+_SENTENCE_START_RE = re.compile(r"[.!?]\s+|\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:max(0, limit - 15)].rstrip() + " ...[truncated]"
+
+
+def _risk_passages(text: str, limit: int, scan: ScanResult) -> List[str]:
+    """Sentences mentioning high- or moderate-risk terms (from a scan of text), in order, within a size limit"""
+    offsets = sorted(
+        offset
+        for group in ("high_risk", "moderate_risk")
+        for term in scan.found(group)
+        for offset in scan.positions[term]
+    )
+    passages, seen, used, last_end = [], set(), 0, -1
+    for offset in offsets:
+        if offset < last_end:
+            continue  # already quoted as part of the previous sentence
+        window_start = max(0, offset - PASSAGE_MAX_CHARS)
+        boundaries = [m.end() for m in _SENTENCE_START_RE.finditer(text, window_start, offset)]
+        start = boundaries[-1] if boundaries else window_start
+        match = _SENTENCE_END_RE.search(text, offset, start + PASSAGE_MAX_CHARS)
+        end = match.start() if match else min(len(text), start + PASSAGE_MAX_CHARS)
+        last_end = end
+        passage = " ".join(text[start:end].split())
+        if passage in seen:
+            continue  # boilerplate repeated across pages
+        if used + len(passage) > limit:
+            break
+        seen.add(passage)
+        passages.append(passage)
+        used += len(passage)
+    return passages
+
+
+def _omit(path: str, part: str, error: Exception) -> None:
+    logger.warning(f"Omitting {part} from the digest of {path}: {str(error)}")
+
+
+class _PageScan:
+    """Per-page work for the digest, done while the pages stream through section detection
+
+    Each part is accumulated separately; a part that fails is dropped and the
+    others carry on.
+    """
+
+    def __init__(self, path: str, items: Dict[str, pd.Series], passage_limit: int):
+        self.path = path
+        self.items = items
+        self.passage_limit = passage_limit
+        self.scan = ScanResult(term_scanner.dictionaries, {})
+        self.passages: List[str] = []
+        self.seen = set()
+        self.text_chars = 0
+        self.failed = set()
+
+    def _guard(self, part: str, func, *args) -> None:
+        if part in self.failed:
+            return
+        try:
+            func(*args)
+        except Exception as e:
+            self.failed.add(part)
+            _omit(self.path, part, e)
+
+    def _scan(self, text: str) -> Optional[ScanResult]:
+        if {"signals", "risk passages"} <= self.failed:
+            return None
+        try:
+            return term_scanner.scan(text)
+        except Exception as e:
+            self.failed.update({"signals", "risk passages"})
+            _omit(self.path, "signals and risk passages", e)
+            return None
+
+    def _add_passages(self, text: str, scan: ScanResult) -> None:
+        used = sum(len(passage) for passage in self.passages)
+        if used >= self.passage_limit:
+            return
+        for passage in _risk_passages(text, self.passage_limit - used, scan):
+            if passage not in self.seen:  # boilerplate repeated across pages
+                self.seen.add(passage)
+                self.passages.append(passage)
+
+    def pages(self, records):
+        for record in records:
+            self._guard("metrics", add_text_line_items, self.items, record.text)
+            # One term scan per page serves both the signals and the risk passages
+            text = normalize_whitespace(record.text, collapse_blank_lines=False)
+            scan = self._scan(text)
+            if scan is not None:
+                self._guard("signals", self.scan.merge, scan, self.text_chars)
+                self._guard("risk passages", self._add_passages, text, scan)
+            self.text_chars += len(text) + 1
+            yield record
+
+
+def _signals(scan: ScanResult, text_chars: int, metrics: Dict) -> Dict:
+    investment = investment_signals(scan, text_chars, metrics)
+    risk = risk_signals(scan, metrics)
+    return {
+        "key_financial_terms": investment.get("key_financial_terms", []),
+        "investment_indicators": investment.get("investment_indicators", []),
+        "risk_score": risk.get("risk_score"),
+        "overall_risk_level": risk.get("overall_risk_level"),
+        "identified_risks": risk.get("identified_risks", []),
+    }
+
+
+def _within(passages: List[str], limit: int) -> List[str]:
+    kept, used = [], 0
+    for passage in passages:
+        if used + len(passage) > limit:
+            break
+        kept.append(passage)
+        used += len(passage)
+    return kept
+
+
+def build_document_digest(path: str, max_chars: int = DIGEST_MAX_CHARS) -> str:
+    """Build the digest for one document, at most max_chars characters long
+
+    Parts that cannot be built (metrics, signals, tables, sections or risk
+    passages) are left out rather than failing the whole digest.
+
+    Raises:
+        PDFExtractionError: if no text can be extracted from the document
+        ValueError: if none of the parts could be built
+    """
+    tables: Dict[str, pd.DataFrame] = {}
+    items: Dict[str, pd.Series] = {}
+    try:
+        tables = extract_financial_tables(path)
+        items = line_items_from_tables(tables)
+    except Exception as e:
+        _omit(path, "tables", e)
+
+    # One streaming pass: sections are detected while the other parts scan each page
+    page_scan = _PageScan(path, items, int(max_chars * DIGEST_BUDGET["risk_passages"]))
+    pages = page_scan.pages(iter_document_pages(path))
+    sections: Dict[str, str] = {}
+    try:
+        for section in iter_sections(pages):
+            if section.title in DIGEST_SECTIONS and section.title not in sections:
+                sections[section.title] = f"(pages {section.start_page}-{section.end_page})\n{section.text}"
+    except PDFExtractionError:
+        raise  # nothing can be read from the document
+    except Exception as e:
+        _omit(path, "sections", e)
+        sections = {}
+        for _ in pages:
+            pass  # the other parts still need every page
+
+    parts: List[str] = []
+    metrics: Dict = {"error": "Metric extraction failed"} if "metrics" in page_scan.failed else {}
+    if "metrics" not in page_scan.failed:
+        try:
+            metrics = compute_metrics(page_scan.items)
+            parts.append("## Key metrics (JSON)\n" + format_metrics(metrics))
+        except Exception as e:
+            metrics = {"error": f"Metric extraction failed: {str(e)}"}
+            _omit(path, "metrics", e)
+    if "signals" not in page_scan.failed:
+        try:
+            signals = _signals(page_scan.scan, page_scan.text_chars, metrics)
+            parts.append("## Keyword and risk signals (JSON)\n" + json.dumps(signals, separators=(",", ":")))
+        except Exception as e:
+            _omit(path, "signals", e)
+    fixed = sum(len(part) for part in parts)
+    budget = max(0, max_chars - fixed)
+
+    if tables:
+        try:
+            formatted = format_tables(tables)
+            parts.append("## Financial statements (CSV)\n" + _truncate(formatted, int(budget * DIGEST_BUDGET["tables"])))
+        except Exception as e:
+            _omit(path, "tables", e)
+
+    section_budget = int(budget * DIGEST_BUDGET["sections"])
+    present = [title for title in DIGEST_SECTIONS if title in sections]
+    if present:
+        per_section = section_budget // len(present)
+        quoted = [f"### {title} {_truncate(sections[title], per_section)}" for title in present]
+        parts.append("## Key sections\n" + "\n\n".join(quoted))
+
+    passages = _within(page_scan.passages, int(budget * DIGEST_BUDGET["risk_passages"]))
+    if passages and "risk passages" not in page_scan.failed:
+        parts.append("## Risk passages\n" + "\n".join(f"- {passage}" for passage in passages))
+
+    if not parts:
+        raise ValueError("no digest part could be built")
+    digest = _truncate("\n\n".join(parts), max_chars)
+    logger.info(f"Built document digest for {path}: {len(digest)} chars from {page_scan.text_chars} chars of text")
+    return digest
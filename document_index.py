@@ -0,0 +1,206 @@
+"""
+Section-aware chunking and BM25 retrieval over extracted documents
+
+Documents are split into section-labelled chunks (see document_sections) and
+indexed with BM25 in a SciPy sparse matrix. Term frequencies are stored per
+document hash next to the extracted pages, so agents can fetch the few
+kilobytes relevant to a question instead of the whole report.
+"""
+import os
+import re
+import bisect
+import itertools
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from document_sections import iter_sections
+from extraction_cache import extraction_cache, iter_document_pages
+
+# Index configuration from environment variables
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "1500"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Bump when chunking or tokenisation changes so cached indexes are rebuilt
+INDEX_PIPELINE = "bm25"
+INDEX_PIPELINE_VERSION = 2
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9&'-]*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the this to was were which will with we".split()
+)
+
+
+class Chunk(NamedTuple):
+    """A retrievable piece of one document section"""
+    section: str
+    start_page: int
+    end_page: int
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _paragraph_spans(text: str, max_chars: int) -> Iterator[Tuple[int, int, bool]]:
+    """(start, end, whole) offsets of a section's paragraphs
+
+    Oversized paragraphs are split at line breaks; their leading pieces come
+    with whole=False and become chunks of their own.
+    """
+    start = 0
+    for separator in itertools.chain(_PARAGRAPH_BREAK_RE.finditer(text), [None]):
+        start, end = _strip_span(text, start, separator.start() if separator else len(text))
+        while end - start > max_chars:
+            cut = text.rfind("\n", start, start + max_chars)
+            cut = cut if cut > start else start + max_chars
+            yield _strip_span(text, start, cut) + (False,)
+            start, end = _strip_span(text, cut, end)
+        if end > start:
+            yield start, end, True
+        if separator:
+            start = separator.end()
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def chunk_document(path: str, max_chars: int = CHUNK_MAX_CHARS) -> List[Chunk]:
+    """Split a document into chunks of at most max_chars that never cross a section boundary
+
+    Each chunk is labelled with the pages of its own first and last lines,
+    not those of the whole section.
+    """
+    chunks = []
+    for section in iter_sections(iter_document_pages(path)):
+        text = section.text
+        line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+
+        def page_at(offset: int) -> int:
+            return section.line_pages[bisect.bisect_right(line_starts, offset) - 1]
+
+        spans: List[Tuple[int, int]] = []
+        size = 0
+        for start, end, whole in _paragraph_spans(text, max_chars):
+            if spans and (not whole or size + end - start > max_chars):
+                chunks.append(_make_chunk(section.title, text, spans, page_at))
+                spans, size = [], 0
+            if not whole:
+                chunks.append(_make_chunk(section.title, text, [(start, end)], page_at))
+                continue
+            spans.append((start, end))
+            size += end - start + 2
+        if spans:
+            chunks.append(_make_chunk(section.title, text, spans, page_at))
+    return chunks
+
+
+def _make_chunk(title: str, text: str, spans: List[Tuple[int, int]], page_at: Callable[[int], int]) -> Chunk:
+    return Chunk(title, page_at(spans[0][0]), page_at(spans[-1][1] - 1), "\n\n".join(text[start:end] for start, end in spans))
+
+
+class DocumentIndex:
+    """BM25 index over the chunks of one document"""
+
+    def __init__(self, chunks: List[Chunk], vocabulary: Dict[str, int], term_counts: sparse.csr_matrix):
+        self.chunks = chunks
+        self.vocabulary = vocabulary
+        self.term_counts = term_counts
+
+        # Precompute the BM25 weight of every (chunk, term) entry so a query is a column sum
+        counts = term_counts.tocsc().astype("float64")
+        chunk_lengths = np.asarray(term_counts.sum(axis=1)).ravel()
+        average_length = chunk_lengths.mean() if len(chunk_lengths) else 0.0
+        document_frequency = np.diff(counts.indptr)
+        idf = np.log1p((len(chunks) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        rows = counts.indices
+        columns = np.repeat(np.arange(counts.shape[1]), document_frequency)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk_lengths[rows] / (average_length or 1.0))
+        counts.data = idf[columns] * counts.data * (BM25_K1 + 1) / (counts.data + norm)
+        self._weights = counts
+
+    @classmethod
+    def build(cls, chunks: List[Chunk]) -> "DocumentIndex":
+        vocabulary: Dict[str, int] = {}
+        rows, columns, values = [], [], []
+        for row, chunk in enumerate(chunks):
+            frequencies: Dict[int, int] = {}
+            for token in tokenize(f"{chunk.section} {chunk.text}"):
+                column = vocabulary.setdefault(token, len(vocabulary))
+                frequencies[column] = frequencies.get(column, 0) + 1
+            rows.extend([row] * len(frequencies))
+            columns.extend(frequencies.keys())
+            values.extend(frequencies.values())
+        term_counts = sparse.csr_matrix(
+            (np.array(values, dtype="int32"), (np.array(rows, dtype="int32"), np.array(columns, dtype="int32"))),
+            shape=(len(chunks), len(vocabulary)),
+        )
+        return cls(chunks, vocabulary, term_counts)
+
+    def search(self, query: str, top_k: int = 5, section: Optional[str] = None) -> List[Chunk]:
+        """Return the top_k chunks for a query, optionally restricted to one section"""
+        columns = [self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary]
+        if not columns or not self.chunks:
+            return []
+        scores = np.asarray(self._weights[:, columns].sum(axis=1)).ravel()
+        if section:
+            wanted = section.lower()
+            scores = np.where([wanted in chunk.section.lower() for chunk in self.chunks], scores, 0.0)
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [self.chunks[i] for i in top if scores[i] > 0]
+
+    def to_artifact(self) -> Dict:
+        return {
+            "chunks": [list(chunk) for chunk in self.chunks],
+            "vocabulary": self.vocabulary,
+            "data": self.term_counts.data.tolist(),
+            "indices": self.term_counts.indices.tolist(),
+            "indptr": self.term_counts.indptr.tolist(),
+        }
+
+    @classmethod
+    def from_artifact(cls, artifact: Dict) -> "DocumentIndex":
+        chunks = [Chunk(*chunk) for chunk in artifact["chunks"]]
+        term_counts = sparse.csr_matrix(
+            (artifact["data"], artifact["indices"], artifact["indptr"]),
+            shape=(len(chunks), len(artifact["vocabulary"])),
+            dtype="int32",
+        )
+        return cls(chunks, artifact["vocabulary"], term_counts)
+
+
+@lru_cache(maxsize=8)
+def _load_index(key: str, path: str) -> DocumentIndex:
+    artifact = extraction_cache.get_artifact(key)
+    if artifact is not None:
+        return DocumentIndex.from_artifact(artifact)
+    index = DocumentIndex.build(chunk_document(path))
+    extraction_cache.put_artifact(key, index.to_artifact())
+    return index
+
+
+def get_document_index(path: str) -> DocumentIndex:
+    """Return the retrieval index for a PDF, building and caching it by document hash on first use"""
+    key = extraction_cache.artifact_key(path, INDEX_PIPELINE, INDEX_PIPELINE_VERSION)
+    return _load_index(key, path)
+
+
+def format_chunks(chunks: List[Chunk]) -> str:
+    """Render retrieved chunks with their section and page labels"""
+    if not chunks:
+        return "No matching passages found"
+    return "\n\n".join(
+        f"[{chunk.section}, pages {chunk.start_page}-{chunk.end_page}]\n{chunk.text}" for chunk in chunks
+    )
@@ -0,0 +1,88 @@
+"""
+Section detection for extracted financial documents
+
+Splits streamed page records into sections at recognised headings such as
+"Risk Factors" or "Liquidity and Capital Resources". Text before the first
+recognised heading belongs to a "Preamble" section.
+"""
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+from pdf_extraction import PageRecord
+
+# Canonical section titles and the heading patterns that introduce them
+SECTION_HEADINGS = [
+    ("Financial Highlights", r"(?:financial|quarterly|annual)?\s*highlights|financial summary"),
+    ("Letter to Shareholders", r"letter to (?:our )?(?:shareholders|stockholders)"),
+    ("Business Overview", r"(?:item\s+1\.?\s+)?business(?: overview)?"),
+    ("Risk Factors", r"(?:item\s+1a\.?\s+)?risk factors"),
+    ("Management's Discussion and Analysis", r"(?:item\s+7\.?\s+)?management[’']?s discussion and analysis.*|md&a"),
+    ("Results of Operations", r"results of operations"),
+    ("Liquidity and Capital Resources", r"liquidity and capital resources|liquidity"),
+    ("Outlook", r"outlook|guidance"),
+    ("Income Statement", r"(?:consolidated )?(?:statements? of (?:operations|income)|income statements?)"),
+    ("Balance Sheet", r"(?:consolidated )?(?:balance sheets?|statements? of financial position)"),
+    ("Cash Flow Statement", r"(?:consolidated )?statements? of cash flows?"),
+    ("Debt", r"(?:note\s+\d+\.?\s*[-–—:]?\s*)?(?:debt|borrowings|long-term debt)(?: and finance leases)?"),
+    ("Forward-Looking Statements", r"(?:cautionary note regarding )?forward-looking statements"),
+]
+HEADING_MAX_CHARS = 80  # longer lines are body text, not headings
+
+_HEADING_RES = [
+    (title, re.compile(rf"^\s*(?:\d+(?:\.\d+)*\.?\s+)?(?:{pattern})\s*:?\s*$", re.IGNORECASE))
+    for title, pattern in SECTION_HEADINGS
+]
+
+
+class Section(NamedTuple):
+    """A run of document text under one heading"""
+    title: str
+    start_page: int
+    end_page: int
+    text: str
+    line_pages: Tuple[int, ...] = ()  # page of each line of text
+
+
+def match_heading(line: str) -> str:
+    """Return the canonical section title a heading line introduces, or "" if it is not a heading"""
+    if not line or len(line) > HEADING_MAX_CHARS:
+        return ""
+    for title, pattern in _HEADING_RES:
+        if pattern.match(line):
+            return title
+    return ""
+
+
+def _section(title: str, lines: List[str], pages: List[int]) -> Section:
+    # Blank lines are dropped from both ends so text and line_pages stay aligned line for line
+    start, stop = 0, len(lines)
+    while start < stop and not lines[start].strip():
+        start += 1
+    while stop > start and not lines[stop - 1].strip():
+        stop -= 1
+    pages = pages[start:stop] or pages[:1]
+    return Section(title, pages[0], pages[-1], "\n".join(lines[start:stop]).strip(), tuple(pages))
+
+
+def iter_sections(records: Iterable[PageRecord]) -> Iterator[Section]:
+    """Group streamed page records into sections, yielding each once it is complete
+
+    Each section records the page of every line, so its pieces can be
+    labelled with the pages they actually come from.
+    """
+    title = "Preamble"
+    lines: List[str] = []
+    pages: List[int] = []
+
+    for record in records:
+        for line in record.text.splitlines():
+            heading = match_heading(line.strip())
+            if heading:
+                if lines:
+                    yield _section(title, lines, pages)
+                title, lines, pages = heading, [], []
+            lines.append(line)
+            pages.append(record.page_num)
+
+    if lines:
+        yield _section(title, lines, pages)
@@ -0,0 +1,274 @@
+"""
+Content-addressed cache for text extracted from financial PDFs
+
+Entries are keyed by the document's SHA-256 (see Document.create_hash) plus the
+name and version of the extraction pipeline that produced them, so every agent
+tool call and every re-upload of the same file reuses a single extraction pass.
+"""
+import os
+import json
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models import Document
+from pdf_extraction import PageRecord, iter_pages, EXTRACTION_PIPELINE, EXTRACTION_PIPELINE_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration from environment variables
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "data/cache/extraction")
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "32"))  # documents kept in memory
+EXTRACTION_CACHE_MEMORY_MB = int(os.getenv("EXTRACTION_CACHE_MEMORY_MB", "128"))  # text kept in memory
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+
+
+class ExtractionCacheError(Exception):
+    """Raised while streaming a disk entry that turns out to be unreadable (the entry is deleted)"""
+
+
+class ExtractionCache:
+    """Two-level (in-process LRU + on-disk JSON Lines) store of extracted page records
+
+    The in-memory level is bounded both by entry count and by total characters;
+    documents larger than the character budget are served from disk only.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = EXTRACTION_CACHE_DIR,
+        max_entries: int = EXTRACTION_CACHE_SIZE,
+        max_memory_chars: int = EXTRACTION_CACHE_MEMORY_MB * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_memory_chars = max_memory_chars
+        self._memory: "OrderedDict[str, List[PageRecord]]" = OrderedDict()
+        self._memory_chars = 0
+        self._artifacts: "OrderedDict[str, Any]" = OrderedDict()
+        self._hashes: Dict[str, Tuple[float, int, str]] = {}  # path -> (mtime, size, sha256)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(file_hash: str, extractor: str, version: int) -> str:
+        """Build the cache key for a document hash and extractor name/version"""
+        return f"{file_hash}-{extractor}-v{version}"
+
+    def artifact_key(self, path: str, pipeline: str, version: int) -> str:
+        """Build the cache key for an artifact derived from a document's extracted pages
+
+        The key names the extraction pipeline and version as well, so a change
+        to the extracted text also invalidates everything built from it.
+        """
+        extractor = f"{EXTRACTION_PIPELINE}-v{EXTRACTION_PIPELINE_VERSION}-{pipeline}"
+        return self.make_key(self.file_hash(path), extractor, version)
+
+    def file_hash(self, path: str) -> str:
+        """Return the SHA-256 of a file, memoised on its mtime and size"""
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        digest = Document.create_file_hash(path)
+        self._hashes[path] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.jsonl")
+
+    def iter_pages(self, key: str) -> Optional[Iterator[PageRecord]]:
+        """Return an iterator over a cached extraction, or None on a miss
+
+        Disk entries are streamed line by line and promoted to memory once
+        fully read, if they fit in the memory budget. A truncated or corrupt
+        line deletes the entry and raises ExtractionCacheError after the
+        records before it have been yielded.
+        """
+        with self._lock:
+            records = self._memory.get(key)
+            if records is not None:
+                self._memory.move_to_end(key)
+                return iter(records)
+
+        disk_path = self._disk_path(key)
+        if not os.path.exists(disk_path):
+            return None
+        return self._iter_disk(key, disk_path)
+
+    def _iter_disk(self, key: str, disk_path: str) -> Iterator[PageRecord]:
+        promoted: Optional[List[PageRecord]] = []
+        chars = 0
+        with open(disk_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    record = PageRecord(*json.loads(line))
+                except (ValueError, TypeError) as e:
+                    self._discard(disk_path)
+                    raise ExtractionCacheError(f"{disk_path} line {line_number}: {str(e)}") from e
+                if promoted is not None:
+                    chars += len(record.text)
+                    promoted = promoted if chars <= self.max_memory_chars else None
+                    if promoted is not None:
+                        promoted.append(record)
+                yield record
+        if promoted:
+            self._remember(key, promoted, chars)
+
+    @staticmethod
+    def _discard(disk_path: str) -> None:
+        try:
+            os.remove(disk_path)
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[List[PageRecord]]:
+        """Return a cached extraction as a list, or None on a miss"""
+        records = self.iter_pages(key)
+        if records is None:
+            return None
+        try:
+            return list(records)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable extraction cache entry {key}: {str(e)}")
+            return None
+
+    @contextmanager
+    def writer(self, key: str):
+        """Collect page records as they stream and commit them atomically on success
+
+        Usage:
+            with cache.writer(key) as add:
+                for record in records:
+                    add(record)
+
+        Nothing is stored if the block raises or is abandoned (e.g. a consumer
+        stops iterating early), or if no records were added.
+        """
+        disk_path = self._disk_path(key)
+        os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(disk_path), suffix=".tmp")
+        memory: Optional[List[PageRecord]] = []
+        chars = 0
+        count = 0
+
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                def add(record: PageRecord) -> None:
+                    nonlocal memory, chars, count
+                    f.write(json.dumps(list(record)) + "\n")
+                    count += 1
+                    chars += len(record.text)
+                    if memory is not None:
+                        memory = memory if chars <= self.max_memory_chars else None
+                        if memory is not None:
+                            memory.append(record)
+
+                yield add
+
+            if count:
+                os.replace(tmp_path, disk_path)
+                if memory:
+                    self._remember(key, memory, chars)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _remember(self, key: str, records: List[PageRecord], chars: int) -> None:
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = records
+            self._memory_chars += chars
+            while self._memory and (
+                len(self._memory) > self.max_entries or self._memory_chars > self.max_memory_chars
+            ):
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_chars -= sum(len(record.text) for record in evicted)
+
+    def get_artifact(self, key: str) -> Optional[Any]:
+        """Load a JSON artifact derived from a document (tables, indexes, ...), or None on a miss"""
+        with self._lock:
+            if key in self._artifacts:
+                self._artifacts.move_to_end(key)
+                return self._artifacts[key]
+
+        disk_path = os.path.join(self.cache_dir, key[:2], f"{key}.json")
+        if not os.path.exists(disk_path):
+            return None
+        try:
+            with open(disk_path, "r", encoding="utf-8") as f:
+                artifact = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache artifact {disk_path}: {str(e)}")
+            return None
+        self._remember_artifact(key, artifact)
+        return artifact
+
+    def put_artifact(self, key: str, artifact: Any) -> None:
+        """Store a JSON-serialisable artifact next to the document's extracted pages"""
+        self._remember_artifact(key, artifact)
+        disk_path = os.path.join(self.cache_dir, key[:2], f"{key}.json")
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(disk_path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(artifact, f)
+                os.replace(tmp_path, disk_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except Exception as e:
+            logger.warning(f"Could not persist cache artifact {key}: {str(e)}")
+
+    def _remember_artifact(self, key: str, artifact: Any) -> None:
+        with self._lock:
+            self._artifacts[key] = artifact
+            self._artifacts.move_to_end(key)
+            while len(self._artifacts) > self.max_entries:
+                self._artifacts.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop the in-process entries (disk entries are kept)"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_chars = 0
+            self._artifacts.clear()
+            self._hashes.clear()
+
+
+# Shared per-process cache used by the document tools
+extraction_cache = ExtractionCache()
+
+
+def iter_document_pages(path: str) -> Iterator[PageRecord]:
+    """Stream the page records of a PDF, served from the extraction cache when possible
+
+    Raises:
+        PDFExtractionError: if the document is not cached and no backend could extract it
+    """
+    if not EXTRACTION_CACHE_ENABLED:
+        yield from iter_pages(path)
+        return
+
+    key = extraction_cache.make_key(extraction_cache.file_hash(path), EXTRACTION_PIPELINE, EXTRACTION_PIPELINE_VERSION)
+    cached = extraction_cache.iter_pages(key)
+    last_page = 0
+    if cached is not None:
+        try:
+            for record in cached:
+                last_page = record.page_num
+                yield record
+            return
+        except ExtractionCacheError as e:
+            # Re-extract the whole document so the entry is rewritten, but only yield the pages not yet served
+            logger.warning(f"Unreadable extraction cache entry, re-extracting {path} after page {last_page}: {str(e)}")
+
+    with extraction_cache.writer(key) as add:
+        for record in iter_pages(path):
+            add(record)
+            if record.page_num > last_page:
+                yield record
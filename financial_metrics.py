@@ -0,0 +1,266 @@
+"""
+Quantitative metric engine for financial documents
+
+Maps numeric line items (revenue, net income, EBITDA, debt, equity, cash
+flow, ...) from statement tables or extracted text onto canonical names,
+aligns them by reporting period and computes margins, period-over-period
+growth and leverage ratios with vectorized NumPy operations. The output is a
+compact, JSON-serialisable dict intended to be handed to the LLM agents in
+place of raw document text.
+"""
+import re
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from financial_tables import extract_financial_tables, parse_amounts, unique_labels
+from extraction_cache import iter_document_pages
+
+# Canonical line items and the labels they are reported under (matched on the
+# normalised label, exact match first and then prefix match)
+LINE_ITEM_ALIASES: Dict[str, List[str]] = {
+    "revenue": ["total revenues", "total revenue", "total net sales", "net sales", "revenues", "revenue"],
+    "gross_profit": ["total gross profit", "gross profit"],
+    "operating_income": ["income from operations", "operating income", "income (loss) from operations"],
+    "net_income": [
+        "net income attributable to common stockholders", "net income", "net earnings", "net income (loss)",
+        "net (loss) income", "net loss",
+    ],
+    "ebitda": ["adjusted ebitda", "ebitda"],
+    "total_assets": ["total assets"],
+    "total_liabilities": ["total liabilities"],
+    "total_equity": [
+        "total stockholders' equity", "total shareholders' equity", "total stockholders’ equity",
+        "total shareholders’ equity", "total equity", "stockholders' equity", "shareholders' equity",
+    ],
+    "total_debt": ["total debt", "total debt and finance leases", "long-term debt", "long-term debt and finance leases"],
+    "cash": ["cash and cash equivalents", "cash, cash equivalents and investments"],
+    "operating_cash_flow": [
+        "net cash provided by operating activities", "net cash provided by (used in) operating activities",
+        "operating cash flow", "cash flows from operating activities",
+    ],
+    "capital_expenditures": ["capital expenditures", "purchases of property and equipment"],
+    "free_cash_flow": ["free cash flow"],
+}
+
+# ratio name -> (numerator line item, denominator line item)
+RATIOS = {
+    "gross_margin": ("gross_profit", "revenue"),
+    "operating_margin": ("operating_income", "revenue"),
+    "net_margin": ("net_income", "revenue"),
+    "ebitda_margin": ("ebitda", "revenue"),
+    "free_cash_flow_margin": ("free_cash_flow", "revenue"),
+    "debt_to_equity": ("total_debt", "total_equity"),
+    "liabilities_to_assets": ("total_liabilities", "total_assets"),
+    "debt_to_ebitda": ("total_debt", "ebitda"),
+    "return_on_equity": ("net_income", "total_equity"),
+}
+
+# Line items whose period-over-period growth is reported
+GROWTH_ITEMS = ["revenue", "gross_profit", "operating_income", "net_income", "ebitda", "operating_cash_flow", "free_cash_flow"]
+
+_AMOUNT = r"\(?-?\$?\s?\d[\d,]*(?:\.\d+)?\)?%?"
+_LINE_ITEM_RE = re.compile(
+    rf"^(?P<label>[A-Za-z][^\d$()]*?(?:\([^)]*\)[^\d$()]*?)?)(?:\s+(?P<footnote>\(\d{{1,2}}\)))?\s+(?P<values>(?:{_AMOUNT}\s*)+)$"
+)
+_AMOUNT_RE = re.compile(_AMOUNT)
+_PERIOD_HEADER_RE = re.compile(r"^(?:(?:FY|Q[1-4])?[\s-]*'?(?:19|20)\d{2}\s*)+$", re.IGNORECASE)
+_PERIOD_RE = re.compile(r"(?:(?:FY|Q[1-4])[\s-]*)?'?(?:19|20)\d{2}", re.IGNORECASE)
+_YEAR_RE = re.compile(r"(?:19|20)\d{2}")
+_DURATION_RE = re.compile(r"\b(?:three|six|nine|twelve)\s+months\s+ended|\bquarters?\s+ended|\b(?:fiscal\s+)?years?\s+ended", re.IGNORECASE)
+_LABEL_NOISE_RE = re.compile(r"[\s:]+$|\s*\(\d{1,2}\)$")
+
+_ALIAS_LOOKUP = {alias: item for item, aliases in LINE_ITEM_ALIASES.items() for alias in aliases}
+_ALIASES_BY_LENGTH = sorted(_ALIAS_LOOKUP, key=len, reverse=True)
+
+
+def canonical_line_item(label: str) -> Optional[str]:
+    """Return the canonical line item name for a reported label, if it is one we track"""
+    label = _LABEL_NOISE_RE.sub("", " ".join(label.lower().split()))
+    if label in _ALIAS_LOOKUP:
+        return _ALIAS_LOOKUP[label]
+    for alias in _ALIASES_BY_LENGTH:
+        if label.startswith(alias + " ") or label.startswith(alias + ","):
+            return _ALIAS_LOOKUP[alias]
+    return None
+
+
+def line_items_from_tables(tables: Dict[str, pd.DataFrame]) -> Dict[str, pd.Series]:
+    """Pick the tracked line items out of statement DataFrames (first occurrence wins)"""
+    items: Dict[str, pd.Series] = {}
+    for frame in tables.values():
+        for label, row in frame.iterrows():
+            item = canonical_line_item(str(label))
+            if item and item not in items and row.notna().any():
+                items[item] = row.astype("float64")
+    return items
+
+
+def line_items_from_text(text: str) -> Dict[str, pd.Series]:
+    """Parse tracked line items and their period columns from extracted text
+
+    Period labels come from the closest preceding line made only of years or
+    quarters (e.g. "2024 2023" or "Q2-2025 Q2-2024"). When the line above it
+    names the column groups ("Three Months Ended ... Nine Months Ended ..."),
+    each period is qualified with its group; labels that still repeat get an
+    occurrence suffix ("2025 [2]"). Rows seen without a header get positional
+    labels (p1, p2, ...).
+
+    A "(1)"-style marker after the label is a footnote when the amounts after
+    it fill the period columns (or, without a header, are at least two);
+    otherwise it is the first amount, as in "Net loss (12) (10)".
+    """
+    items: Dict[str, pd.Series] = {}
+    periods: Optional[List[str]] = None
+    previous = ""
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.startswith("--- Page "):
+            periods, previous = None, ""
+            continue
+        if _PERIOD_HEADER_RE.match(line):
+            periods = [" ".join(p.split()) for p in _PERIOD_RE.findall(line)]
+            durations = [" ".join(m.group(0).split()).title() for m in _DURATION_RE.finditer(previous)]
+            if durations and len(periods) % len(durations) == 0:
+                span = len(periods) // len(durations)
+                periods = [f"{period} ({durations[i // span]})" for i, period in enumerate(periods)]
+            periods = unique_labels(periods)
+            previous = line
+            continue
+        previous = line
+        match = _LINE_ITEM_RE.match(line)
+        if not match:
+            continue
+        item = canonical_line_item(match.group("label"))
+        if not item or item in items:
+            continue
+        values = _AMOUNT_RE.findall(match.group("values"))
+        footnote = match.group("footnote")
+        if footnote and len(values) < (len(periods) if periods else 2):
+            values.insert(0, footnote)
+        amounts = parse_amounts(pd.Series(values))
+        if periods and len(periods) == len(amounts):
+            amounts.index = periods
+        else:
+            amounts.index = [f"p{i}" for i in range(1, len(amounts) + 1)]
+        if amounts.notna().any():
+            items[item] = amounts
+    return items
+
+
+def _period_groups(periods: List[str]) -> Tuple[List[List[str]], List[str]]:
+    """Split period labels into comparable groups, each sorted most recent first
+
+    Labels are grouped by what remains once the year is removed ("Q2-",
+    "(Nine Months Ended ...)", "[2]"), so only like-for-like periods are
+    compared. Labels without a year (positional p1, p2, ...) are returned
+    separately in reported order and never enter a growth comparison.
+    """
+    groups: Dict[str, List[Tuple[str, str]]] = {}
+    undated: List[str] = []
+    for period in periods:
+        year = _YEAR_RE.search(period)
+        if year is None:
+            undated.append(period)
+            continue
+        key = " ".join(_YEAR_RE.sub("", period, count=1).split())
+        groups.setdefault(key, []).append((year.group(0), period))
+    dated = [[period for _, period in sorted(members, reverse=True)] for members in groups.values()]
+    return dated, undated
+
+
+def compute_metrics(items: Dict[str, pd.Series]) -> Dict[str, Any]:
+    """Compute ratios and growth for aligned line items
+
+    Returns {"periods", "line_items", "ratios", "growth"} with NaN/undefined
+    values omitted. Ratios are fractions (0.12 = 12%); growth compares each
+    dated period with the next older period of the same kind (see
+    _period_groups).
+    """
+    if not items:
+        return {"periods": [], "line_items": {}, "ratios": {}, "growth": {}}
+
+    # Duplicate period labels cannot be aligned; qualify them before building the frame
+    items = {
+        item: series if series.index.is_unique else series.set_axis(unique_labels([str(p) for p in series.index]))
+        for item, series in items.items()
+    }
+    frame = pd.DataFrame(items).T  # line items x periods, aligned on period labels
+    frame.columns = [str(p) for p in frame.columns]
+    dated, undated = _period_groups(list(frame.columns))
+    periods = [period for group in dated for period in group] + undated
+    frame = frame[periods].astype("float64")
+
+    # Free cash flow derived from operating cash flow and capex when not reported
+    if "free_cash_flow" not in frame.index and {"operating_cash_flow", "capital_expenditures"} <= set(frame.index):
+        frame.loc["free_cash_flow"] = frame.loc["operating_cash_flow"] - np.abs(frame.loc["capital_expenditures"])
+
+    values = frame.to_numpy()
+    row = {item: i for i, item in enumerate(frame.index)}
+    empty = np.full(len(periods), np.nan)
+
+    def line(item: str) -> np.ndarray:
+        return values[row[item]] if item in row else empty
+
+    ratio_names = list(RATIOS)
+    numerators = np.vstack([line(num) for num, _ in RATIOS.values()])
+    denominators = np.vstack([line(den) for _, den in RATIOS.values()])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.where(denominators != 0, numerators / denominators, np.nan)
+
+    growth_names = [item for item in GROWTH_ITEMS if item in row]
+    column = {period: i for i, period in enumerate(periods)}
+    pairs = [(group[i], group[i + 1]) for group in dated for i in range(len(group) - 1)]
+    growth_labels = [f"{current} vs {prior}" for current, prior in pairs]
+    if growth_names and growth_labels:
+        series = np.vstack([line(item) for item in growth_names])
+        current = series[:, [column[current] for current, _ in pairs]]
+        prior = series[:, [column[prior] for _, prior in pairs]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth = np.where(prior != 0, (current - prior) / np.abs(prior), np.nan)
+    else:
+        growth = np.empty((0, 0))
+
+    def compact(matrix: np.ndarray, names: List[str], labels: List[str], digits: int) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name, data in zip(names, matrix):
+            kept = {label: round(float(value), digits) for label, value in zip(labels, data) if np.isfinite(value)}
+            if kept:
+                result[name] = kept
+        return result
+
+    return {
+        "periods": periods,
+        "line_items": compact(values, list(frame.index), periods, 2),
+        "ratios": compact(ratios, ratio_names, periods, 4),
+        "growth": compact(growth, growth_names, growth_labels, 4),
+    }
+
+
+def metrics_from_text(text: str) -> Dict[str, Any]:
+    """Metrics for a document given only its extracted text"""
+    return compute_metrics(line_items_from_text(text))
+
+
+def add_text_line_items(items: Dict[str, pd.Series], text: str) -> Dict[str, pd.Series]:
+    """Fill line items missing from items with those parsed from a page of text"""
+    for item, series in line_items_from_text(text).items():
+        items.setdefault(item, series)
+    return items
+
+
+def metrics_from_document(path: str) -> Dict[str, Any]:
+    """Metrics for a PDF, preferring statement tables and filling gaps from its text"""
+    items = line_items_from_tables(extract_financial_tables(path))
+    for record in iter_document_pages(path):
+        add_text_line_items(items, record.text)
+    return compute_metrics(items)
+
+
+def format_metrics(metrics: Dict[str, Any]) -> str:
+    """Serialise metrics as compact JSON for LLM consumption"""
+    return json.dumps(metrics, separators=(",", ":"))
@@ -0,0 +1,229 @@
+"""
+Structured extraction of financial statement tables
+
+Finds income statement, balance sheet and cash-flow tables with pdfplumber's
+table finder and turns them into float64 DataFrames indexed by line item with
+one column per reporting period, so metrics can be computed with vectorized
+pandas/NumPy operations instead of re-parsing text.
+"""
+import re
+import logging
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from pdf_extraction import PDFPLUMBER_AVAILABLE
+from extraction_cache import extraction_cache, iter_document_pages
+
+if PDFPLUMBER_AVAILABLE:
+    import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table output changes so cached tables are rebuilt
+TABLES_PIPELINE = "tables"
+TABLES_PIPELINE_VERSION = 2
+
+# Line items that identify each statement type
+STATEMENT_KEYWORDS: Dict[str, List[str]] = {
+    "income_statement": [
+        "total revenues", "revenue", "cost of revenues", "gross profit", "operating expenses",
+        "income from operations", "operating income", "net income", "earnings per share",
+        "research and development", "selling, general and administrative",
+    ],
+    "balance_sheet": [
+        "total assets", "total liabilities", "total current assets", "total current liabilities",
+        "cash and cash equivalents", "accounts receivable", "inventory", "property, plant and equipment",
+        "stockholders' equity", "shareholders' equity", "retained earnings", "long-term debt",
+    ],
+    "cash_flow": [
+        "operating activities", "investing activities", "financing activities",
+        "capital expenditures", "free cash flow", "depreciation and amortization",
+        "net increase in cash", "purchases of property",
+    ],
+}
+STATEMENT_MIN_HITS = 2  # keyword hits needed before a page or table is treated as a statement
+
+_PERIOD_RE = re.compile(r"^(?:(?:FY|Q[1-4])\s*'?\d{2,4}|(?:19|20)\d{2}(?:\s*[A-Z]{0,2})?|.*\b(?:19|20)\d{2}\b.*)$", re.IGNORECASE)
+_NUMERIC_CELL_RE = re.compile(r"^\(?[-$]?\s*\d[\d,]*(?:\.\d+)?\s*\)?%?$")
+
+
+def _keyword_hits(text: str, statement: str) -> int:
+    return sum(1 for keyword in STATEMENT_KEYWORDS[statement] if keyword in text)
+
+
+def classify_statement(text: str) -> Optional[str]:
+    """Return the statement type whose line items best match the text, if any"""
+    text = text.lower()
+    scores = {statement: _keyword_hits(text, statement) for statement in STATEMENT_KEYWORDS}
+    statement, hits = max(scores.items(), key=lambda item: item[1])
+    return statement if hits >= STATEMENT_MIN_HITS else None
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """Vectorized conversion of formatted amounts ("$1,234", "(56)", "7.5%", "—") to float64"""
+    cells = values.fillna("").astype(str).str.strip()
+    negative = cells.str.match(r"^\(.*\)$") | cells.str.startswith("-")
+    digits = cells.str.replace(r"[\s$,%()—–-]", "", regex=True)
+    amounts = pd.to_numeric(digits, errors="coerce").astype("float64")
+    return amounts.where(~negative, -amounts)
+
+
+def _is_header_row(row: List[Optional[str]]) -> bool:
+    cells = [(cell or "").strip() for cell in row[1:]]
+    labelled = [cell for cell in cells if cell]
+    return bool(labelled) and all(
+        _PERIOD_RE.match(cell) or not _NUMERIC_CELL_RE.match(cell) for cell in labelled
+    )
+
+
+def _is_period_row(row: List[Optional[str]]) -> bool:
+    labelled = [(cell or "").strip() for cell in row[1:] if cell and cell.strip()]
+    return bool(labelled) and all(_PERIOD_RE.match(cell) for cell in labelled)
+
+
+def unique_labels(labels: List[str]) -> List[str]:
+    """Suffix repeated labels with their occurrence number ("2025", "2025 [2]", ...)"""
+    seen: Dict[str, int] = {}
+    unique = []
+    for label in labels:
+        seen[label] = seen.get(label, 0) + 1
+        unique.append(label if seen[label] == 1 else f"{label} [{seen[label]}]")
+    return unique
+
+
+def _clean_cell(cell: Optional[str]) -> str:
+    return " ".join((cell or "").split()).strip(" ,:")
+
+
+def _header_columns(header_rows: List[List[Optional[str]]], width: int) -> List[str]:
+    # The last header row holds the periods; rows above it hold column-group headings
+    # ("Three Months Ended ...") that span the following empty cells
+    padded = [row + [None] * (width - len(row)) for row in header_rows]
+    groups: List[List[str]] = []
+    for row in padded[:-1]:
+        current, spans = "", []
+        for cell in row[1:]:
+            current = _clean_cell(cell) or current
+            spans.append(current)
+        groups.append(spans)
+    columns = []
+    for i, cell in enumerate(padded[-1][1:]):
+        period = _clean_cell(cell)
+        group = " ".join(spans[i] for spans in groups if spans[i])
+        if period and group:
+            columns.append(f"{period} ({group})")
+        else:
+            columns.append(period or group or f"col_{i + 1}")
+    return unique_labels(columns)
+
+
+def table_to_frame(rows: List[List[Optional[str]]]) -> Optional[pd.DataFrame]:
+    """Convert raw table rows into a float64 DataFrame indexed by line item
+
+    The first rows whose value cells are period labels (years, quarters) or
+    text form the header: the last of them names the periods and any above it
+    are column-group headings, so a 10-Q's three- and nine-month columns come
+    out as "2025 (Three Months Ended ...)" and "2025 (Nine Months Ended ...)".
+    Column labels are always unique. Rows without a label or any amount are
+    dropped.
+    """
+    rows = [row for row in rows if row and any(cell and cell.strip() for cell in row)]
+    if len(rows) < 2 or len(rows[0]) < 2:
+        return None
+
+    header_index = next((i for i, row in enumerate(rows[:3]) if _is_header_row(row)), None)
+    width = max(len(row) for row in rows)
+    if header_index is None:
+        columns = [f"col_{i}" for i in range(1, width)]
+        body = rows
+    else:
+        header_end = header_index + 1
+        if header_end < min(len(rows) - 1, 3) and _is_period_row(rows[header_end]):
+            header_end += 1
+        columns = _header_columns(rows[header_index:header_end], width)
+        body = rows[header_end:]
+
+    frame = pd.DataFrame([row + [None] * (width - len(row)) for row in body])
+    labels = frame.iloc[:, 0].fillna("").astype(str).str.replace("\n", " ").str.strip()
+    values = frame.iloc[:, 1:].apply(parse_amounts)
+    values.columns = columns
+    values.index = labels.rename(None)
+    values = values[(labels != "").to_numpy() & values.notna().any(axis=1).to_numpy()]
+    values = values.loc[:, values.notna().any(axis=0)]
+    if values.empty:
+        return None
+    return values[~values.index.duplicated(keep="first")]
+
+
+def _merge_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    merged = pd.concat(frames, axis=0, sort=False)
+    return merged[~merged.index.duplicated(keep="first")].astype("float64")
+
+
+def _extract_tables(path: str) -> Dict[str, pd.DataFrame]:
+    # Only run pdfplumber's (expensive) table finder on pages whose text looks like a statement
+    candidate_pages = [
+        record.page_num for record in iter_document_pages(path) if classify_statement(record.text)
+    ]
+    if not candidate_pages or not PDFPLUMBER_AVAILABLE:
+        return {}
+
+    found: Dict[str, List[pd.DataFrame]] = {}
+    with pdfplumber.open(path) as pdf:
+        for page_num in candidate_pages:
+            page = pdf.pages[page_num - 1]
+            try:
+                tables = page.extract_tables()
+            except Exception as e:
+                logger.warning(f"Table extraction failed on page {page_num} of {path}: {str(e)}")
+                continue
+            finally:
+                page.flush_cache()
+            for rows in tables:
+                frame = table_to_frame(rows)
+                if frame is None:
+                    continue
+                statement = classify_statement(" ".join(frame.index))
+                if statement:
+                    found.setdefault(statement, []).append(frame)
+
+    return {statement: _merge_frames(frames) for statement, frames in found.items()}
+
+
+def extract_financial_tables(path: str) -> Dict[str, pd.DataFrame]:
+    """Return the document's financial statements keyed by statement type
+
+    Keys are "income_statement", "balance_sheet" and "cash_flow" (only those
+    found). Results are cached next to the extracted pages under the
+    document's SHA-256.
+    """
+    key = extraction_cache.artifact_key(path, TABLES_PIPELINE, TABLES_PIPELINE_VERSION)
+    cached = extraction_cache.get_artifact(key)
+    if cached is not None:
+        return {
+            statement: pd.DataFrame(payload["data"], index=payload["index"], columns=payload["columns"], dtype="float64")
+            for statement, payload in cached.items()
+        }
+
+    tables = _extract_tables(path)
+    extraction_cache.put_artifact(key, {
+        statement: {
+            "index": list(frame.index),
+            "columns": list(frame.columns),
+            # NaN is not valid JSON; store missing cells as null
+            "data": frame.astype(object).where(frame.notna(), None).to_numpy().tolist(),
+        }
+        for statement, frame in tables.items()
+    })
+    return tables
+
+
+def format_tables(tables: Dict[str, pd.DataFrame]) -> str:
+    """Render statements as compact CSV blocks for LLM consumption"""
+    if not tables:
+        return "No financial statement tables found"
+    blocks = []
+    for statement, frame in tables.items():
+        blocks.append(f"### {statement}\n{frame.to_csv(float_format='%.12g')}")
+    return "\n".join(blocks)
@@ -0,0 +1,174 @@
+"""
+Response cache store for the LLM shared by the crew agents
+
+Every completion is stored in a SQLite file keyed by a SHA-256 of the model,
+its sampling settings, the full message list (which carries the document
+digest, the blob path that embeds the document hash, and every tool output
+the agent has seen so far) and the tools offered. Re-running an analysis of
+the same document and query replays the stored completions instead of
+calling the provider. Entries expire after a TTL and the least recently used
+ones are evicted once the file exceeds its size budget.
+
+This module has no CrewAI dependency; the CrewAI LLM wrappers that use it
+(CachedLLM and the offline FakeLLM) live in cached_llm.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration from environment variables
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/cache/llm_responses.sqlite3")
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+Messages = Union[str, List[Dict[str, Any]]]
+
+
+class LLMResponseCache:
+    """SQLite store of LLM completions with TTL expiry and LRU size eviction
+
+    One connection is shared by the threads of a worker process (stages run
+    concurrently); WAL mode lets several worker processes use the same file.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl_seconds: float = LLM_CACHE_TTL_HOURS * 3600,
+        max_bytes: int = LLM_CACHE_MAX_MB * 1024 * 1024,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_llm_responses_last_used_at ON llm_responses (last_used_at)")
+            self._connection = connection
+        return self._connection
+
+    def reset_connection(self) -> None:
+        """Drop a connection inherited from a parent process (call after fork)"""
+        self._connection = None
+
+    @staticmethod
+    def make_key(model: str, settings: Dict[str, Any], messages: Messages, tools: Optional[List[Any]] = None) -> str:
+        """Build the cache key for one completion request"""
+        payload = json.dumps(
+            {"model": model, "settings": settings, "messages": messages, "tools": tools or []},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a stored completion, or None on a miss or an expired entry"""
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl_seconds:
+                    connection.execute("UPDATE llm_responses SET last_used_at = ? WHERE key = ?", (now, key))
+                    self.hits += 1
+                    return row[0]
+                if row is not None:
+                    connection.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self.misses += 1
+        except sqlite3.Error as e:
+            logger.warning(f"LLM response cache lookup failed: {str(e)}")
+            self.misses += 1
+        return None
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store a completion and evict entries beyond the TTL and size budget (never raises)"""
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, last_used_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, len(response.encode("utf-8")), now, now),
+                )
+                self._evict(connection, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store LLM response in cache: {str(e)}")
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        connection.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in connection.execute("SELECT key, size FROM llm_responses ORDER BY last_used_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} LLM responses to stay within {self.max_bytes // (1024 * 1024)} MB")
+
+    def clear(self) -> None:
+        """Remove every stored completion"""
+        with self._lock:
+            self._connect().execute("DELETE FROM llm_responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts of this process plus the size of the store"""
+        entries, size = 0, 0
+        try:
+            with self._lock:
+                entries, size = self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+                ).fetchone()
+        except sqlite3.Error:
+            pass
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+
+# Module-level cache instance shared by the agents of a worker process
+llm_response_cache = LLMResponseCache()
+
+
+def tool_names(tools: Optional[List[Any]]) -> List[str]:
+    """Sorted names of the tools offered with a request (tool schemas or tool objects)"""
+    names = []
+    for tool in tools or []:
+        if isinstance(tool, dict):
+            names.append(str(tool.get("function", tool).get("name", tool)))
+        else:
+            names.append(str(getattr(tool, "name", tool)))
+    return sorted(names)
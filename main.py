@@ -1,30 +1,52 @@
 ## Enhanced imports for async processing with Celery and database
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Header, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 import os
-import uuid
+import base64
+import hashlib
 import sys
 import asyncio
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Database and task imports
-from database import get_db, init_db
-from models import Document, Analysis
-from tasks import analyze_document
+from database import get_async_db, init_db, AsyncSessionLocal
+from models import Document, Analysis, AnalysisCount
+from blob_store import blob_store, acquire_document, release_document
+from status_cache import (
+    status_cache, build_status_payload, publish_status, is_terminal, make_etag, StatusEntry, STATUS_CACHE_ENABLED
+)
+from progress_events import subscribe_events, format_sse
+from query_matching import best_match, QUERY_SIMILARITY_THRESHOLD, QUERY_SIMILARITY_CANDIDATES
 from celery_app import celery_app
 
+# Tasks are enqueued by name so the API never imports the CrewAI/LLM analysis stack
+ANALYZE_DOCUMENT_TASK = "tasks.analyze_document"
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Financial Document Analyzer - Async Version")
 
+# Upload configuration
+MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
+MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Largest page served by GET /analyses
+MAX_PAGE_SIZE = 100
+
+# Progress stream keep-alive interval (also the polling interval when Redis pub/sub is unavailable)
+PROGRESS_HEARTBEAT_SECONDS = float(os.getenv("PROGRESS_HEARTBEAT_SECONDS", "15"))
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
@@ -32,17 +54,92 @@ async def startup_event():
     init_db()
     logger.info("Database initialized successfully")
 
-def find_existing_analysis(db: Session, file_hash: str, query: str) -> Optional[Analysis]:
-    """Check if identical analysis already exists"""
-    document = db.query(Document).filter(Document.file_hash == file_hash).first()
-    if document:
-        analysis = db.query(Analysis).filter(
-            Analysis.document_id == document.id,
-            Analysis.query == query,
-            Analysis.status == "completed"
-        ).first()
-        return analysis
-    return None
+async def find_existing_analysis(db: AsyncSession, file_hash: str, query: str) -> Optional[Analysis]:
+    """
+    Find a completed analysis of the same document for an equivalent query
+    Canonical-equal queries are one indexed lookup on the query fingerprint; when
+    QUERY_SIMILARITY_THRESHOLD is set, the most similar recent query of the same
+    document is used instead if none matches exactly
+    """
+    completed_for_document = (
+        select(Analysis)
+        .join(Document, Analysis.document_id == Document.id)
+        .where(Document.file_hash == file_hash, Analysis.status == "completed")
+    )
+    existing = (await db.execute(
+        completed_for_document.where(Analysis.query_fingerprint == Analysis.fingerprint_query(query)).limit(1)
+    )).scalar_one_or_none()
+    if existing or QUERY_SIMILARITY_THRESHOLD <= 0:
+        return existing
+    
+    candidates = (await db.execute(
+        completed_for_document.with_only_columns(Analysis.id, Analysis.query)
+        .order_by(Analysis.created_at.desc())
+        .limit(QUERY_SIMILARITY_CANDIDATES)
+    )).all()
+    match = best_match(query, candidates)
+    if match is None:
+        return None
+    logger.info(f"Query matched analysis {match[0]} with similarity {match[1]:.2f}")
+    return await db.get(Analysis, match[0])
+
+def get_task_status(task_id: str) -> Optional[str]:
+    """Look up a Celery task state (a blocking result-backend call; run it in the threadpool)"""
+    try:
+        return celery_app.AsyncResult(task_id).status
+    except Exception as e:
+        logger.warning(f"Could not get Celery task status: {str(e)}")
+        return None
+
+def _write_upload_chunk(out, sha256, chunk: bytes) -> None:
+    # hashlib releases the GIL for large buffers, so hashing and the disk write run off the event loop together
+    sha256.update(chunk)
+    out.write(chunk)
+
+async def spool_upload(file: UploadFile) -> Tuple[str, str, int]:
+    """
+    Stream an upload into a blob store temp file, hashing it in the same pass
+    Returns (temp_path, file_hash, file_size); raises 400 once the size limit is
+    exceeded. The caller commits the temp file with store_upload or removes it.
+    """
+    sha256 = hashlib.sha256()
+    file_size = 0
+    fd, temp_path = blob_store.create_temp()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE_BYTES:
+                    raise HTTPException(status_code=400, detail=f"File too large (max {MAX_FILE_SIZE_MB}MB)")
+                await run_in_threadpool(_write_upload_chunk, out, sha256, chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path, sha256.hexdigest(), file_size
+
+def store_upload(temp_path: str, file_hash: str, stored_path: Optional[str] = None) -> str:
+    """
+    Move a spooled upload into the blob store unless identical content is already stored
+    stored_path is the document's file_path read after taking a reference: the
+    blob is only reused when it is set, since an eviction may still be removing it otherwise
+    The blob appears atomically; the temp file is gone either way
+    """
+    if stored_path and blob_store.exists(file_hash):
+        os.remove(temp_path)
+        return blob_store.path_for(file_hash)
+    return blob_store.commit(temp_path, file_hash)
+
+def discard_upload(temp_path: Optional[str]) -> None:
+    """Remove a spooled upload that was not stored"""
+    if temp_path is None:
+        return
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
 
 @app.get("/")
 async def root():
@@ -53,7 +150,7 @@ async def root():
 async def analyze_uploaded_document(
     file: UploadFile = File(...),
     query: str = Form(default="Analyze this financial document for investment insights"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Submit financial document for asynchronous analysis
@@ -69,74 +166,66 @@ async def analyze_uploaded_document(
     try:
         logger.info(f"Processing uploaded file: {file.filename}")
         
-        # Ensure data directory exists
-        os.makedirs("data", exist_ok=True)
-        
-        # Read and validate file content
-        content = await file.read()
-        if len(content) == 0:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+        # Hash the upload while streaming it to a temp file: one pass over the bytes
+        temp_path, file_hash, file_size = await spool_upload(file)
+        try:
+            if file_size == 0:
+                raise HTTPException(status_code=400, detail="Uploaded file is empty")
             
-        if len(content) > 50 * 1024 * 1024:  # 50MB limit
-            raise HTTPException(status_code=400, detail="File too large (max 50MB)")
-        
-        # Calculate file hash for deduplication
-        file_hash = Document.create_hash(content)
-        
-        # Validate and clean query
-        if not query or query.strip() == "":
-            query = "Analyze this financial document for investment insights"
-        query = query.strip()
-        
-        # Check for existing analysis
-        existing_analysis = find_existing_analysis(db, file_hash, query)
-        if existing_analysis:
-            logger.info(f"Returning existing analysis: {existing_analysis.id}")
-            return {
-                "status": "completed",
-                "analysis_id": existing_analysis.id,
-                "task_id": existing_analysis.task_id,
-                "message": "Analysis already exists",
-                "cached": True
-            }
-        
-        # Create unique file path
-        file_id = str(uuid.uuid4())
-        file_path = f"data/financial_document_{file_id}.pdf"
-        
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # Create or get document record
-        document = db.query(Document).filter(Document.file_hash == file_hash).first()
-        if not document:
-            document = Document(
-                filename=file.filename,
-                file_path=file_path,
-                file_hash=file_hash,
-                file_size=len(content)
-            )
-            db.add(document)
-            db.commit()
-            db.refresh(document)
-        
-        # Create analysis record
-        analysis = Analysis(
-            document_id=document.id,
-            query=query,
-            status="pending"
-        )
-        db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
-        
-        # Submit task to Celery
-        task = analyze_document.delay(analysis.id, file_path, query)
+            # Validate and clean query
+            if not query or query.strip() == "":
+                query = "Analyze this financial document for investment insights"
+            query = query.strip()
+            
+            # Check for existing analysis
+            existing_analysis = await find_existing_analysis(db, file_hash, query)
+            if existing_analysis:
+                logger.info(f"Returning existing analysis: {existing_analysis.id}")
+                return {
+                    "status": "completed",
+                    "analysis_id": existing_analysis.id,
+                    "task_id": existing_analysis.task_id,
+                    "message": "Analysis already exists",
+                    "cached": True
+                }
+            
+            # Reference the document's blob (released by the worker when the analysis finishes)
+            document = await db.run_sync(acquire_document, file_hash, file.filename, file_size)
+            document_id = document.id
+            try:
+                # Identical content is stored once; re-analysis drops the temp file instead of storing it again
+                file_path = await run_in_threadpool(store_upload, temp_path, file_hash, document.file_path)
+                temp_path = None
+                if document.file_path != file_path:
+                    document.file_path = file_path
+                    await db.commit()
+                
+                # Create analysis record
+                analysis = Analysis(
+                    document_id=document_id,
+                    query=query,
+                    query_fingerprint=Analysis.fingerprint_query(query),
+                    status="pending"
+                )
+                db.add(analysis)
+                await db.commit()
+                await db.refresh(analysis)
+                
+                # Submit task to Celery (broker publish is blocking, so keep it off the event loop)
+                task = await run_in_threadpool(
+                    celery_app.send_task, ANALYZE_DOCUMENT_TASK, args=[analysis.id, file_path, query]
+                )
+            except BaseException:
+                await db.rollback()
+                await db.run_sync(release_document, document_id)
+                raise
+        finally:
+            discard_upload(temp_path)
         
         # Update analysis with task_id
         analysis.task_id = task.id
-        db.commit()
+        await db.commit()
+        await run_in_threadpool(publish_status, analysis)
         
         logger.info(f"Analysis {analysis.id} submitted with task {task.id}")
         
@@ -146,7 +235,7 @@ async def analyze_uploaded_document(
             "task_id": task.id,
             "message": "Analysis submitted for processing",
             "file_processed": file.filename,
-            "file_size_mb": round(len(content) / (1024 * 1024), 2)
+            "file_size_mb": round(file_size / (1024 * 1024), 2)
         }
         
     except HTTPException:
@@ -155,58 +244,157 @@ async def analyze_uploaded_document(
         logger.error(f"Unexpected error processing document: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error submitting analysis: {str(e)}")
 
+async def load_status_entry(db: AsyncSession, analysis_id: int) -> Optional[StatusEntry]:
+    """Current status of an analysis from the status cache, else the database and Celery"""
+    entry = status_cache.peek(analysis_id) if STATUS_CACHE_ENABLED else None
+    if entry is None and STATUS_CACHE_ENABLED:
+        entry = await run_in_threadpool(status_cache.get, analysis_id)
+    
+    if entry is None:
+        analysis = await db.get(Analysis, analysis_id)
+        if not analysis:
+            return None
+        
+        # Get Celery task status if available
+        task_status = None
+        if analysis.task_id:
+            task_status = await run_in_threadpool(get_task_status, analysis.task_id)
+        
+        payload = build_status_payload(analysis, task_status)
+        entry = status_cache.put(payload) if STATUS_CACHE_ENABLED else StatusEntry(payload, make_etag(payload), is_terminal(payload))
+    return entry
+
 @app.get("/status/{analysis_id}")
-async def get_analysis_status(analysis_id: int, db: Session = Depends(get_db)):
+async def get_analysis_status(
+    analysis_id: int,
+    if_none_match: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Get the status of an analysis job
     Returns current status and results if completed
+    Served from the status cache when possible; unchanged polls sending If-None-Match get 304
     """
-    analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-    if not analysis:
+    entry = await load_status_entry(db, analysis_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Analysis not found")
     
-    # Get Celery task status if available
-    task_status = None
-    if analysis.task_id:
-        try:
-            celery_task = celery_app.AsyncResult(analysis.task_id)
-            task_status = celery_task.status
-        except Exception as e:
-            logger.warning(f"Could not get Celery task status: {str(e)}")
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if if_none_match and entry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry.payload, headers=headers)
+
+@app.get("/progress/{analysis_id}")
+async def stream_analysis_progress(analysis_id: int, request: Request):
+    """
+    Stream analysis progress as Server-Sent Events
+    Sends the current status first, then "status" events on state transitions and
+    "task" events as each crew task finishes; the stream ends at a terminal status
+    """
+    async with AsyncSessionLocal() as db:
+        entry = await load_status_entry(db, analysis_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
     
-    response = {
-        "analysis_id": analysis.id,
-        "status": analysis.status,
-        "task_id": analysis.task_id,
-        "task_status": task_status,
-        "query": analysis.query,
-        "created_at": analysis.created_at.isoformat(),
-        "started_at": analysis.started_at.isoformat() if analysis.started_at else None,
-        "completed_at": analysis.completed_at.isoformat() if analysis.completed_at else None,
-        "duration_seconds": analysis.duration_seconds
-    }
+    # Read the status again once subscribed so no transition is missed in between
+    events = await subscribe_events(analysis_id, timeout=PROGRESS_HEARTBEAT_SECONDS)
+    try:
+        async with AsyncSessionLocal() as db:
+            entry = await load_status_entry(db, analysis_id) or entry
+    except BaseException:
+        if events is not None:
+            await events.aclose()
+        raise
     
-    if analysis.status == "completed":
-        response["result"] = analysis.result
-    elif analysis.status == "failed":
-        response["error_message"] = analysis.error_message
+    async def event_stream():
+        try:
+            current = entry
+            yield format_sse("status", dict(current.payload, terminal=current.terminal))
+            if current.terminal:
+                return
+            
+            if events is None:
+                # No pub/sub available: follow the status cache/database instead
+                while not await request.is_disconnected():
+                    await asyncio.sleep(PROGRESS_HEARTBEAT_SECONDS / 5)
+                    async with AsyncSessionLocal() as db:
+                        latest = await load_status_entry(db, analysis_id)
+                    if latest is not None and latest.etag != current.etag:
+                        current = latest
+                        yield format_sse("status", dict(current.payload, terminal=current.terminal))
+                        if current.terminal:
+                            return
+                return
+            
+            async for message in events:
+                if await request.is_disconnected():
+                    return
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(message["event"], message["data"])
+                if message["event"] == "status" and message["data"].get("terminal"):
+                    return
+        finally:
+            if events is not None:
+                await events.aclose()
     
-    return response
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def encode_cursor(analysis: Analysis) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of an analysis"""
+    raw = f"{analysis.created_at.isoformat()}|{analysis.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, analysis_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(analysis_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @app.get("/analyses")
 async def list_analyses(
     limit: int = 10,
     offset: int = 0,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List recent analyses with optional filtering"""
-    query = db.query(Analysis)
+    """
+    List recent analyses with optional filtering, newest first
+    Pass the returned next_cursor to get the following page; this seeks on the
+    (created_at, id) index, so deep pages cost the same as the first one.
+    offset is still accepted for older clients but scans every skipped row.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(Analysis)
     
     if status:
-        query = query.filter(Analysis.status == status)
+        query = query.where(Analysis.status == status)
     
-    analyses = query.order_by(Analysis.created_at.desc()).offset(offset).limit(limit).all()
+    if cursor:
+        created_at, analysis_id = decode_cursor(cursor)
+        query = query.where(tuple_(Analysis.created_at, Analysis.id) < tuple_(created_at, analysis_id))
+    elif offset:
+        query = query.offset(offset)
+    
+    # Fetch one extra row to learn whether another page exists
+    rows = (await db.execute(
+        query.order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(limit + 1)
+    )).scalars().all()
+    analyses = rows[:limit]
+    next_cursor = encode_cursor(analyses[-1]) if len(rows) > limit else None
+    
+    # Totals come from the per-status counters maintained on every write, not a COUNT(*) scan
+    counts = select(func.coalesce(func.sum(AnalysisCount.count), 0))
+    if status:
+        counts = counts.where(AnalysisCount.status == status)
+    total = (await db.execute(counts)).scalar_one()
     
     return {
         "analyses": [
@@ -219,9 +407,10 @@ async def list_analyses(
             }
             for a in analyses
         ],
-        "total": query.count(),
+        "total": total,
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "next_cursor": next_cursor
     }
 
 @app.get("/health")
@@ -229,8 +418,8 @@ async def health_check():
     """Extended health check including Celery and database status"""
     try:
         # Check database
-        db = next(get_db())
-        db.execute("SELECT 1")
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception as e:
         db_status = f"unhealthy: {str(e)}"
@@ -238,7 +427,7 @@ async def health_check():
     try:
         # Check Celery
         celery_inspect = celery_app.control.inspect()
-        active_workers = celery_inspect.active()
+        active_workers = await run_in_threadpool(celery_inspect.active)
         celery_status = "healthy" if active_workers else "no workers"
     except Exception as e:
         celery_status = f"unhealthy: {str(e)}"
@@ -0,0 +1,66 @@
+"""
+Blob reference counts, nullable task ids and the analysis cache lookup index
+
+Brings databases created by the original create_all() schema up to date.
+Steps whose result already exists (e.g. a database created after these
+columns were added to models.py) are skipped.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _columns(table: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    document_columns = _columns("documents")
+    with op.batch_alter_table("documents") as batch:
+        if "ref_count" not in document_columns:
+            batch.add_column(sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"))
+        if "last_used_at" not in document_columns:
+            batch.add_column(sa.Column("last_used_at", sa.DateTime(), nullable=True))
+
+    analysis_columns = _columns("analyses")
+    if "query_fingerprint" not in analysis_columns:
+        op.add_column("analyses", sa.Column("query_fingerprint", sa.String(64), nullable=True))
+
+    # Backfill fingerprints in Python so the hash matches Analysis.fingerprint_query exactly
+    bind = op.get_bind()
+    analyses = sa.table("analyses", sa.column("id", sa.Integer), sa.column("query", sa.Text),
+                        sa.column("query_fingerprint", sa.String))
+    rows = bind.execute(sa.select(analyses.c.id, analyses.c.query).where(analyses.c.query_fingerprint.is_(None)))
+    for analysis_id, query in rows.fetchall():
+        fingerprint = hashlib.sha256(query.strip().encode("utf-8")).hexdigest()
+        bind.execute(analyses.update().where(analyses.c.id == analysis_id).values(query_fingerprint=fingerprint))
+
+    with op.batch_alter_table("analyses") as batch:
+        batch.alter_column("query_fingerprint", existing_type=sa.String(64), nullable=False)
+        batch.alter_column("task_id", existing_type=sa.String(255), nullable=True)
+
+    if "ix_analyses_cache_lookup" not in _indexes("analyses"):
+        op.create_index("ix_analyses_cache_lookup", "analyses", ["document_id", "query_fingerprint", "status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_analyses_cache_lookup", table_name="analyses")
+    with op.batch_alter_table("analyses") as batch:
+        batch.drop_column("query_fingerprint")
+    with op.batch_alter_table("documents") as batch:
+        batch.drop_column("last_used_at")
+        batch.drop_column("ref_count")
@@ -0,0 +1,57 @@
+"""
+Keyset pagination indexes and per-status analysis counters
+
+Adds the (created_at, id) and (status, created_at, id) indexes behind
+GET /analyses cursors, and the analysis_counts table that serves its totals,
+seeded from the existing analyses.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Statuses that always have a counter row, even before any analysis reaches them
+ANALYSIS_STATUSES = ("pending", "running", "completed", "failed")
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    indexes = {index["name"] for index in inspector.get_indexes("analyses")}
+    if "ix_analyses_created_at_id" not in indexes:
+        op.create_index("ix_analyses_created_at_id", "analyses", ["created_at", "id"])
+    if "ix_analyses_status_created_at_id" not in indexes:
+        op.create_index("ix_analyses_status_created_at_id", "analyses", ["status", "created_at", "id"])
+
+    if "analysis_counts" not in inspector.get_table_names():
+        op.create_table(
+            "analysis_counts",
+            sa.Column("status", sa.String(50), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False),
+        )
+
+    # Seed counters for existing analyses, then zero rows for the remaining statuses
+    # (the SQL is inlined so this revision does not change with models.py)
+    bind = op.get_bind()
+    bind.execute(sa.text(
+        "INSERT INTO analysis_counts (status, count) "
+        "SELECT status, COUNT(*) FROM analyses "
+        "WHERE status NOT IN (SELECT status FROM analysis_counts) GROUP BY status"
+    ))
+    for status in ANALYSIS_STATUSES:
+        bind.execute(sa.text(
+            "INSERT INTO analysis_counts (status, count) SELECT :status, 0 "
+            "WHERE NOT EXISTS (SELECT 1 FROM analysis_counts WHERE status = :status)"
+        ), {"status": status})
+
+
+def downgrade() -> None:
+    op.drop_table("analysis_counts")
+    op.drop_index("ix_analyses_status_created_at_id", table_name="analyses")
+    op.drop_index("ix_analyses_created_at_id", table_name="analyses")
@@ -0,0 +1,34 @@
+"""
+Per-stage crew checkpoints for resuming retried analyses
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "analysis_checkpoints" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "analysis_checkpoints",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("analysis_id", sa.Integer(), sa.ForeignKey("analyses.id"), nullable=False),
+        sa.Column("stage", sa.String(50), nullable=False),
+        sa.Column("output", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("analysis_id", "stage", name="uq_analysis_checkpoints_stage"),
+    )
+    op.create_index("ix_analysis_checkpoints_analysis_id", "analysis_checkpoints", ["analysis_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_analysis_checkpoints_analysis_id", table_name="analysis_checkpoints")
+    op.drop_table("analysis_checkpoints")
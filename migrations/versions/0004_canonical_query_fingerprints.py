@@ -0,0 +1,42 @@
+"""
+Recompute query fingerprints over canonical queries
+
+Analysis.fingerprint_query now hashes the case-, punctuation- and
+whitespace-folded query, so existing fingerprints are recomputed for cached
+results to keep matching.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+from query_matching import canonicalize_query
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+analyses = sa.table("analyses", sa.column("id", sa.Integer), sa.column("query", sa.Text),
+                    sa.column("query_fingerprint", sa.String))
+
+
+def _refingerprint(normalize) -> None:
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(analyses.c.id, analyses.c.query, analyses.c.query_fingerprint)).fetchall()
+    for analysis_id, query, current in rows:
+        fingerprint = hashlib.sha256(normalize(query).encode("utf-8")).hexdigest()
+        if fingerprint != current:
+            bind.execute(analyses.update().where(analyses.c.id == analysis_id).values(query_fingerprint=fingerprint))
+
+
+def upgrade() -> None:
+    _refingerprint(canonicalize_query)
+
+
+def downgrade() -> None:
+    _refingerprint(str.strip)
@@ -1,11 +1,13 @@
 """
 Database models for financial document analyzer
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index, UniqueConstraint, event, func, select, update, insert, delete
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm.attributes import get_history
 from datetime import datetime
 import hashlib
+from query_matching import canonicalize_query
 
 Base = declarative_base()
 
@@ -15,9 +17,11 @@ class Document(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
-    file_path = Column(String(500), nullable=True)  # Path where file is stored
+    file_path = Column(String(500), nullable=True)  # Blob store path; None once evicted
     file_hash = Column(String(64), nullable=False, index=True)  # SHA-256 hash
     file_size = Column(Integer, nullable=False)  # File size in bytes
+    ref_count = Column(Integer, nullable=False, default=0)  # In-flight analyses using the stored blob
+    last_used_at = Column(DateTime, default=datetime.utcnow)  # Drives blob retention and eviction
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship to analyses
@@ -27,15 +31,35 @@ class Document(Base):
     def create_hash(cls, content: bytes) -> str:
         """Create SHA-256 hash from file content"""
         return hashlib.sha256(content).hexdigest()
+    
+    @classmethod
+    def create_file_hash(cls, path: str, chunk_size: int = 1024 * 1024) -> str:
+        """Create SHA-256 hash of a file on disk without loading it into memory"""
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+def _query_fingerprint_default(context) -> str:
+    return Analysis.fingerprint_query(context.get_current_parameters()["query"])
 
 class Analysis(Base):
     """Analysis model for storing analysis results and status"""
     __tablename__ = "analyses"
+    __table_args__ = (
+        # Result cache lookup: one index seek for (document, query, completed)
+        Index("ix_analyses_cache_lookup", "document_id", "query_fingerprint", "status"),
+        # Keyset pagination of /analyses, newest first, with and without a status filter
+        Index("ix_analyses_created_at_id", "created_at", "id"),
+        Index("ix_analyses_status_created_at_id", "status", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
-    task_id = Column(String(255), nullable=False, index=True)  # Celery task ID
+    task_id = Column(String(255), nullable=True, index=True)  # Celery task ID, set once the task is queued
     query = Column(Text, nullable=False)  # User query
+    query_fingerprint = Column(String(64), nullable=False, default=_query_fingerprint_default)  # SHA-256 of the canonical query
     status = Column(String(50), nullable=False, default="pending")  # pending, running, completed, failed
     result = Column(Text, nullable=True)  # JSON serialized analysis result
     error_message = Column(Text, nullable=True)  # Error details if failed
@@ -46,9 +70,75 @@ class Analysis(Base):
     # Relationship to document
     document = relationship("Document", back_populates="analyses")
     
+    @classmethod
+    def fingerprint_query(cls, query: str) -> str:
+        """Create SHA-256 fingerprint of a query's canonical form (case, punctuation and whitespace folded)"""
+        return hashlib.sha256(canonicalize_query(query).encode("utf-8")).hexdigest()
+    
     @property
     def duration_seconds(self) -> float:
         """Calculate analysis duration in seconds"""
         if self.started_at and self.completed_at:
             return (self.completed_at - self.started_at).total_seconds()
-        return 0.0
\ No newline at end of file
+        return 0.0
+
+class AnalysisCheckpoint(Base):
+    """Output of one completed crew stage, so a retried analysis resumes after it"""
+    __tablename__ = "analysis_checkpoints"
+    __table_args__ = (UniqueConstraint("analysis_id", "stage", name="uq_analysis_checkpoints_stage"),)
+    
+    id = Column(Integer, primary_key=True)
+    analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=False, index=True)
+    stage = Column(String(50), nullable=False)  # verification, analysis, investment, risk
+    output = Column(Text, nullable=False)  # Raw crew task output
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class AnalysisCount(Base):
+    """Number of analyses per status, maintained on every insert, status change and delete
+
+    The counters are kept by ORM flush events, so they only see analyses
+    written through a Session. Bulk Query.update()/delete() and Core
+    statements on analyses bypass them; run recount_analysis_counts() in the
+    same transaction after any such write.
+    """
+    __tablename__ = "analysis_counts"
+    
+    status = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+ANALYSIS_STATUSES = ["pending", "running", "completed", "failed"]
+
+def seed_analysis_counts(connection) -> None:
+    """Create missing counter rows, counting existing analyses once"""
+    existing = set(connection.execute(select(AnalysisCount.status)).scalars())
+    counted = dict(connection.execute(select(Analysis.status, func.count()).group_by(Analysis.status)).all())
+    for status in sorted(set(ANALYSIS_STATUSES) | set(counted)):
+        if status not in existing:
+            connection.execute(insert(AnalysisCount).values(status=status, count=counted.get(status, 0)))
+
+def recount_analysis_counts(connection) -> None:
+    """Recompute every counter from the analyses table (after a bulk write)"""
+    connection.execute(delete(AnalysisCount))
+    seed_analysis_counts(connection)
+
+def _bump_analysis_count(connection, status: str, delta: int) -> None:
+    result = connection.execute(
+        update(AnalysisCount).where(AnalysisCount.status == status).values(count=AnalysisCount.count + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(AnalysisCount).values(status=status, count=max(delta, 0)))
+
+@event.listens_for(Analysis, "after_insert")
+def _count_inserted_analysis(mapper, connection, target):
+    _bump_analysis_count(connection, target.status, 1)
+
+@event.listens_for(Analysis, "after_update")
+def _count_status_change(mapper, connection, target):
+    history = get_history(target, "status")
+    if history.deleted and history.added and history.deleted[0] != history.added[0]:
+        _bump_analysis_count(connection, history.deleted[0], -1)
+        _bump_analysis_count(connection, history.added[0], 1)
+
+@event.listens_for(Analysis, "after_delete")
+def _count_deleted_analysis(mapper, connection, target):
+    _bump_analysis_count(connection, target.status, -1)
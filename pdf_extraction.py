@@ -0,0 +1,295 @@
+"""
+PDF text extraction backends for financial documents
+
+Kept free of CrewAI/LangChain imports so that extraction worker processes
+start quickly.
+"""
+import os
+import re
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Deque, Iterator, List, NamedTuple, Optional, Tuple
+
+# PDF processing imports
+try:
+    from pypdf import PdfReader  # Primary PDF library
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
+try:
+    import pdfplumber
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    PDFPLUMBER_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Extraction configuration from environment variables
+PDF_EXTRACTION_STRATEGY = os.getenv("PDF_EXTRACTION_STRATEGY", "auto").lower()  # auto or fallback
+PDF_PROBE_PAGES = int(os.getenv("PDF_PROBE_PAGES", "3"))  # pages sampled with pypdf before choosing
+
+# Parallel extraction configuration from environment variables
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "1"))  # 1 = serial extraction
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))  # smaller files stay serial
+PDF_CHUNKS_PER_WORKER = 4  # several page ranges per worker keeps the pool evenly loaded
+PDF_MAX_IN_FLIGHT_PER_WORKER = 2  # page ranges submitted ahead of the consumer, per worker
+
+# Identifies the extraction pipeline in cache keys; bump the version whenever
+# the page records it produces change so stale cache entries are not reused
+EXTRACTION_PIPELINE = "auto" if PDF_EXTRACTION_STRATEGY == "auto" else "fallback-chain"
+EXTRACTION_PIPELINE_VERSION = 3
+
+_SPACE_RUN_RE = re.compile(r" {2,}")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+# A line is tabular when it carries several numeric cells (amounts, percentages, years)
+# or is a lone numeric cell, which is how pypdf often emits table columns
+_NUMBER_RE = re.compile(r"\(?[-$]?\d[\d,]*(?:\.\d+)?\)?%?")
+TABLE_LINE_MIN_NUMBERS = 3
+TABLE_PAGE_MIN_RATIO = 0.3  # share of tabular lines that marks a page as table-heavy
+
+
+class PageRecord(NamedTuple):
+    """Text extracted from one PDF page"""
+    page_num: int  # 1-based
+    text: str
+    extractor: str  # backend that produced the text
+
+
+class PDFExtractionError(Exception):
+    """Raised when no PDF backend could extract a document"""
+
+
+def available_backends() -> List[str]:
+    """Extractor names in order of preference (pdfplumber is best for financial documents)"""
+    backends = []
+    if PDFPLUMBER_AVAILABLE:
+        backends.append("pdfplumber")
+    if PYPDF_AVAILABLE:
+        backends.append("pypdf")
+    if PYPDF2_AVAILABLE:
+        backends.append("PyPDF2")
+    return backends
+
+
+def normalize_whitespace(text: str, collapse_spaces: bool = True, collapse_blank_lines: bool = True) -> str:
+    """Collapse runs of spaces to one and runs of blank lines to a single blank line
+
+    Each collapse is one linear regex pass, instead of repeated replace()
+    calls that copy the whole text until no run is left.
+    """
+    if collapse_spaces:
+        text = _SPACE_RUN_RE.sub(" ", text)
+    if collapse_blank_lines:
+        text = _BLANK_LINES_RE.sub("\n\n", text)
+    return text
+
+
+def clean_page_text(text: str) -> str:
+    """Clean and format the text of one page"""
+    # Remove excessive blank lines and format properly
+    return normalize_whitespace(text.strip(), collapse_spaces=False)
+
+
+def looks_table_heavy(text: str) -> bool:
+    """Heuristically detect pages dominated by numeric tables
+
+    pypdf tends to scramble column layout on such pages, so they are
+    re-extracted with pdfplumber.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return False
+    table_lines = sum(
+        1 for line in lines
+        if len(_NUMBER_RE.findall(line)) >= TABLE_LINE_MIN_NUMBERS or _NUMBER_RE.fullmatch(line.strip().lstrip("$ "))
+    )
+    return table_lines >= TABLE_LINE_MIN_NUMBERS and table_lines / len(lines) >= TABLE_PAGE_MIN_RATIO
+
+
+def _needs_layout_extraction(text: Optional[str]) -> bool:
+    return not text or not text.strip() or looks_table_heavy(text)
+
+
+def _iter_page_range(path: str, backend: str, start: int, stop: Optional[int] = None) -> Iterator[Tuple[int, str, str]]:
+    """Yield (page_index, raw_text, extractor) for pages [start, stop) of a PDF using one backend
+
+    The "auto" backend extracts each page with pypdf and falls back to
+    pdfplumber only for pages that came back empty or look table-heavy.
+    """
+    if backend == "pdfplumber":
+        with pdfplumber.open(path) as pdf:
+            for index, page in enumerate(pdf.pages[start:stop], start=start):
+                text = page.extract_text()
+                page.flush_cache()  # release parsed page objects as we go
+                yield index, text, backend
+        return
+
+    if backend == "auto":
+        plumber = None
+        try:
+            with open(path, "rb") as file:
+                reader = PdfReader(file)
+                for index, page in enumerate(reader.pages[start:stop], start=start):
+                    text = page.extract_text()
+                    if _needs_layout_extraction(text):
+                        plumber = plumber or pdfplumber.open(path)
+                        layout_page = plumber.pages[index]
+                        layout_text = layout_page.extract_text()
+                        layout_page.flush_cache()
+                        if layout_text and layout_text.strip():
+                            yield index, layout_text, "pdfplumber"
+                            continue
+                    yield index, text, "pypdf"
+        finally:
+            if plumber is not None:
+                plumber.close()
+        return
+
+    with open(path, "rb") as file:
+        reader = PdfReader(file) if backend == "pypdf" else PyPDF2.PdfReader(file)
+        for index, page in enumerate(reader.pages[start:stop], start=start):
+            yield index, page.extract_text(), backend
+
+
+def _extract_page_range(path: str, backend: str, start: int, stop: Optional[int] = None) -> List[PageRecord]:
+    """Extract pages [start, stop) of a PDF with one backend
+
+    Opens the file itself so that it can run in a separate worker process.
+    """
+    return [
+        PageRecord(index + 1, clean_page_text(text), extractor)
+        for index, text, extractor in _iter_page_range(path, backend, start, stop)
+        if text
+    ]
+
+
+def count_pages(path: str) -> int:
+    """Return the number of pages in a PDF using the cheapest available backend"""
+    if PYPDF_AVAILABLE:
+        with open(path, "rb") as file:
+            return len(PdfReader(file).pages)
+    if PYPDF2_AVAILABLE:
+        with open(path, "rb") as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _probe_prefers_fast_path(path: str) -> bool:
+    """Sample the first pages with pypdf to decide whether the fast path is worthwhile
+
+    Documents whose sampled pages are mostly empty (scanned or oddly encoded)
+    or mostly tables gain nothing from pypdf, so they go straight to pdfplumber.
+    """
+    try:
+        with open(path, "rb") as file:
+            samples = [page.extract_text() for page in PdfReader(file).pages[:PDF_PROBE_PAGES]]
+    except Exception as e:
+        logger.warning(f"pypdf probe failed on {path}: {str(e)}")
+        return False
+    if not samples:
+        return False
+    slow_pages = sum(1 for text in samples if _needs_layout_extraction(text))
+    return slow_pages * 2 < len(samples)
+
+
+def backend_chain(path: str, strategy: Optional[str] = None) -> List[str]:
+    """Backends to try for a document, in order"""
+    strategy = strategy or PDF_EXTRACTION_STRATEGY
+    backends = available_backends()
+    if strategy == "auto" and PYPDF_AVAILABLE and PDFPLUMBER_AVAILABLE and _probe_prefers_fast_path(path):
+        backends.insert(0, "auto")
+    return backends
+
+
+def _can_use_process_pool() -> bool:
+    # Celery prefork children are daemonic and may not start child processes
+    return not multiprocessing.current_process().daemon
+
+
+def iter_pages(path: str, workers: int = PDF_EXTRACTION_WORKERS, strategy: Optional[str] = None) -> Iterator[PageRecord]:
+    """Stream the pages of a PDF as PageRecords, in page order
+
+    With the "auto" strategy a pypdf probe decides whether pages are read with
+    pypdf (re-extracting empty or table-heavy pages with pdfplumber) or with
+    pdfplumber throughout; "fallback" always starts with pdfplumber. If a
+    backend fails part-way through, the next one resumes from the first page
+    not yet produced, so pages already yielded are kept. Pages without text
+    are skipped. With workers > 1 and a large enough document, page ranges are
+    extracted in a process pool.
+
+    Raises:
+        PDFExtractionError: if no backend could extract the document
+    """
+    page_count = None
+    if workers > 1 and _can_use_process_pool():
+        try:
+            page_count = count_pages(path)
+        except Exception as e:
+            logger.warning(f"Could not count pages of {path}, extracting serially: {str(e)}")
+    parallel = page_count is not None and page_count >= PDF_PARALLEL_MIN_PAGES
+
+    next_index = 0
+    for backend in backend_chain(path, strategy):
+        try:
+            if parallel:
+                for stop, records in _iter_parallel(path, backend, next_index, page_count, workers):
+                    yield from records
+                    next_index = stop
+            else:
+                for index, text, extractor in _iter_page_range(path, backend, next_index):
+                    if text:
+                        yield PageRecord(index + 1, clean_page_text(text), extractor)
+                    next_index = index + 1
+            return
+        except Exception as e:
+            logger.warning(f"{backend} failed on {path} at page {next_index + 1}: {str(e)}")  # Try next method
+
+    raise PDFExtractionError("No PDF processing libraries available or all methods failed")
+
+
+def _iter_parallel(path: str, backend: str, start: int, page_count: int, workers: int) -> Iterator[Tuple[int, List[PageRecord]]]:
+    """Split pages [start, page_count) across a process pool
+
+    Yields (range stop, records) for each range in page order as soon as it and
+    all earlier ranges are done. At most PDF_MAX_IN_FLIGHT_PER_WORKER ranges per
+    worker are submitted ahead of the consumer, so results that finish out of
+    order (or faster than they are consumed) stay bounded in memory.
+    """
+    remaining = page_count - start
+    if remaining <= 0:
+        return
+    chunk_count = min(remaining, workers * PDF_CHUNKS_PER_WORKER)
+    chunk_size = -(-remaining // chunk_count)  # ceiling division
+    ranges = [(low, min(low + chunk_size, page_count)) for low in range(start, page_count, chunk_size)]
+
+    pending = iter(ranges)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight: Deque[Tuple[int, Future]] = deque()
+
+        def submit_next() -> None:
+            for low, stop in islice(pending, 1):
+                in_flight.append((stop, pool.submit(_extract_page_range, path, backend, low, stop)))
+
+        for _ in range(workers * PDF_MAX_IN_FLIGHT_PER_WORKER):
+            submit_next()
+        try:
+            while in_flight:
+                stop, future = in_flight.popleft()
+                records = future.result()
+                submit_next()
+                yield stop, records
+        finally:
+            for _, future in in_flight:
+                future.cancel()
@@ -0,0 +1,110 @@
+"""
+Analysis progress events over Redis pub/sub
+
+Workers publish an event on every state transition and after each crew task
+finishes; the API relays them to clients as Server-Sent Events. Each
+analysis has its own channel, so subscribers only receive their analysis.
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Progress event configuration from environment variables
+PROGRESS_EVENTS_ENABLED = os.getenv("PROGRESS_EVENTS_ENABLED", "true").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+CHANNEL_PREFIX = "analysis-progress:"
+
+_publisher = None
+
+
+def channel_for(analysis_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{analysis_id}"
+
+
+def publish_event(analysis_id: int, event: str, data: Dict[str, Any]) -> None:
+    """Publish one progress event for an analysis (never raises)"""
+    global _publisher
+    if not PROGRESS_EVENTS_ENABLED:
+        return
+    try:
+        if _publisher is None:
+            import redis
+            _publisher = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        message = json.dumps({"event": event, "data": data}, separators=(",", ":"))
+        _publisher.publish(channel_for(analysis_id), message)
+    except Exception as e:
+        _publisher = None
+        logger.warning(f"Could not publish {event} event for analysis {analysis_id}: {str(e)}")
+
+
+class ProgressSubscription:
+    """
+    Async iterator over one analysis's progress channel
+    Yields {"event", "data"} dicts, or None when no message arrived within
+    timeout seconds. aclose() releases the pub/sub connection and is safe to
+    call at any point, including before iteration has started.
+    """
+
+    def __init__(self, client: Any, pubsub: Any, timeout: float):
+        self.client = client
+        self.pubsub = pubsub
+        self.timeout = timeout
+        self.closed = False
+
+    def __aiter__(self) -> "ProgressSubscription":
+        return self
+
+    async def __anext__(self) -> Optional[Dict[str, Any]]:
+        if self.closed:
+            raise StopAsyncIteration
+        message = await self.pubsub.get_message(timeout=self.timeout)
+        return json.loads(message["data"]) if message else None
+
+    async def aclose(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.pubsub.unsubscribe()
+        except Exception as e:
+            logger.warning(f"Could not unsubscribe from progress events: {str(e)}")
+        await _close(self.pubsub)
+        await _close(self.client)
+
+
+async def _close(connection: Any) -> None:
+    try:
+        await connection.aclose() if hasattr(connection, "aclose") else await connection.close()
+    except Exception as e:
+        logger.warning(f"Could not close progress events connection: {str(e)}")
+
+
+async def subscribe_events(analysis_id: int, timeout: float) -> Optional[ProgressSubscription]:
+    """
+    Subscribe to an analysis's progress channel
+    Returns a ProgressSubscription (close it with aclose()), or None if Redis is unavailable
+    """
+    if not PROGRESS_EVENTS_ENABLED:
+        return None
+    client = pubsub = None
+    try:
+        import redis.asyncio as aioredis
+        client = aioredis.Redis.from_url(REDIS_URL, socket_connect_timeout=1)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel_for(analysis_id))
+    except Exception as e:
+        logger.warning(f"Progress events unavailable for analysis {analysis_id}: {str(e)}")
+        for connection in (pubsub, client):
+            if connection is not None:
+                await _close(connection)
+        return None
+    return ProgressSubscription(client, pubsub, timeout)
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
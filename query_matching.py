@@ -0,0 +1,63 @@
+"""
+Query canonicalisation and lexical similarity for the analysis result cache
+
+Queries are folded to a canonical form (Unicode-normalised, case-folded,
+punctuation and whitespace collapsed) before they are fingerprinted, so
+"Analyze Q3 risks" and "analyze q3 risks." share one cached result. When
+QUERY_SIMILARITY_THRESHOLD is set, a query with no exact match can also reuse
+the completed analysis of the same document whose query has the highest
+token-set (Jaccard) similarity at or above the threshold. Tokens containing
+digits (years, quarters, percentages) must match exactly, so "Q3 2024" never
+reuses an answer for "Q4 2024".
+"""
+import os
+import re
+import unicodedata
+from typing import FrozenSet, Iterable, Optional, Tuple
+
+# 0 disables similarity matching; only canonical-equal queries share results
+QUERY_SIMILARITY_THRESHOLD = float(os.getenv("QUERY_SIMILARITY_THRESHOLD", "0"))
+QUERY_SIMILARITY_CANDIDATES = int(os.getenv("QUERY_SIMILARITY_CANDIDATES", "200"))  # recent analyses compared
+
+# Punctuation is dropped unless it sits between two digits ("3.5", "10,000")
+_PUNCTUATION = re.compile(r"(?<!\d)[^\w\s]|[^\w\s](?!\d)")
+
+# Words that carry no meaning for which analysis is being asked for
+_STOPWORDS = frozenset({
+    "a", "an", "the", "this", "that", "these", "those", "of", "for", "to", "in", "on", "and",
+    "or", "with", "by", "about", "from", "its", "it", "is", "are", "me", "my", "our",
+    "please", "document", "report", "file",
+})
+
+
+def canonicalize_query(query: str) -> str:
+    """Fold a query to its canonical form: NFKC, case-folded, punctuation and whitespace collapsed"""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def query_terms(query: str) -> FrozenSet[str]:
+    """Content-bearing terms of a query, used for similarity matching"""
+    return frozenset(term for term in canonicalize_query(query).split() if term not in _STOPWORDS)
+
+
+def query_similarity(left: str, right: str) -> float:
+    """Jaccard similarity of two queries' terms; 0.0 when their numeric terms differ"""
+    left_terms, right_terms = query_terms(left), query_terms(right)
+    if not left_terms or not right_terms:
+        return 1.0 if canonicalize_query(left) == canonicalize_query(right) else 0.0
+    if {t for t in left_terms if any(c.isdigit() for c in t)} != {t for t in right_terms if any(c.isdigit() for c in t)}:
+        return 0.0
+    return len(left_terms & right_terms) / len(left_terms | right_terms)
+
+
+def best_match(query: str, candidates: Iterable[Tuple[int, str]], threshold: float = QUERY_SIMILARITY_THRESHOLD) -> Optional[Tuple[int, float]]:
+    """Return (id, score) of the most similar candidate query at or above threshold, if any"""
+    if threshold <= 0:
+        return None
+    best: Optional[Tuple[int, float]] = None
+    for candidate_id, candidate_query in candidates:
+        score = query_similarity(query, candidate_query)
+        if score >= threshold and (best is None or score > best[1]):
+            best = (candidate_id, score)
+    return best
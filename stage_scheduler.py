@@ -0,0 +1,78 @@
+"""
+Dependency-driven execution of analysis stages
+
+Stages form a DAG: each one starts as soon as every stage it depends on has
+finished, and independent stages run concurrently in a thread pool (the work
+is LLM-bound, so threads are enough). Wall-clock time approaches the
+critical path rather than the sum of all stages.
+"""
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def run_stages(
+    dependencies: Dict[str, Sequence[str]],
+    run_stage: Callable[[str, Dict[str, str]], str],
+    completed: Optional[Dict[str, str]] = None,
+    max_parallel: int = 2,
+    on_stage_complete: Optional[Callable[[str, str, int], None]] = None,
+) -> Dict[str, str]:
+    """
+    Run every stage not already in completed, respecting dependencies
+
+    run_stage(name, dependency_outputs) returns the stage output and is called
+    from a worker thread. on_stage_complete(name, output, completed_count) is
+    called from the caller's thread as each stage finishes. Returns the
+    outputs of all stages; the first stage failure is re-raised after stages
+    already running have finished.
+    """
+    outputs: Dict[str, str] = dict(completed or {})
+    pending = {name: list(deps) for name, deps in dependencies.items() if name not in outputs}
+    timings: Dict[str, float] = {}
+    started_at = time.perf_counter()
+
+    def timed(name: str, inputs: Dict[str, str]) -> str:
+        start = time.perf_counter()
+        try:
+            return run_stage(name, inputs)
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    failure: Optional[BaseException] = None
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="stage") as pool:
+        running = {}
+        while pending or running:
+            if failure is None:
+                ready = [name for name, deps in pending.items() if all(dep in outputs for dep in deps)]
+                for name in ready:
+                    inputs = {dep: outputs[dep] for dep in pending.pop(name)}
+                    running[pool.submit(timed, name, inputs)] = name
+            if not running:
+                if pending and failure is None:
+                    raise ValueError(f"Stages with unsatisfiable dependencies: {', '.join(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outputs[name] = future.result()
+                except BaseException as e:
+                    failure = failure or e  # let the stages already running finish (and checkpoint)
+                    continue
+                if on_stage_complete:
+                    on_stage_complete(name, outputs[name], len(outputs))
+
+    if timings:
+        elapsed = time.perf_counter() - started_at
+        logger.info(
+            f"Ran {len(timings)} stages in {elapsed:.1f}s wall clock "
+            f"(sum of stages {sum(timings.values()):.1f}s): "
+            + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items())
+        )
+    if failure is not None:
+        raise failure
+    return outputs
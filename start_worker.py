@@ -4,7 +4,9 @@ Usage: python start_worker.py
 """
 import os
 import sys
-from celery_app import celery_app
+from celery_app import (
+    celery_app, WORKER_MAX_TASKS_PER_CHILD, WORKER_AUTOSCALE, WORKER_AUTOSCALE_MAX, WORKER_AUTOSCALE_MIN
+)
 
 def main():
     """Start Celery worker with optimal configuration"""
@@ -17,10 +19,15 @@ def main():
         'worker',
         '--loglevel=info',
         '--queues=analysis',
-        '--concurrency=1',  # Process one document at a time to avoid memory issues
-        '--max-tasks-per-child=10',  # Restart worker after 10 tasks to prevent memory leaks
+        f'--max-tasks-per-child={WORKER_MAX_TASKS_PER_CHILD}',  # Crews are reset between tasks; recycle rarely
         '--task-events',  # Enable task events for monitoring
     ]
+    if WORKER_AUTOSCALE:
+        # Grow with queue depth while the memory headroom admits more analyses
+        worker_args.append(f'--autoscale={WORKER_AUTOSCALE_MAX},{WORKER_AUTOSCALE_MIN}')
+        print(f"Autoscaling between {WORKER_AUTOSCALE_MIN} and {WORKER_AUTOSCALE_MAX} processes (memory-aware)")
+    else:
+        worker_args.append('--concurrency=1')  # Process one document at a time to avoid memory issues
     
     # Start worker
     try:
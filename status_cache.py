@@ -0,0 +1,194 @@
+"""
+Hot cache for analysis status responses
+
+Two levels: an in-process LRU in each API process and an optional shared
+Redis level that workers write on every state transition. Polls are served
+from memory, fall back to Redis, and only reach the database and the Celery
+result backend when neither level has the analysis. Terminal states
+(completed, or failed with a finished Celery task) no longer change, so they
+are cached much longer than active ones, but still expire so entries for
+deleted or re-run analyses do not linger.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from models import Analysis
+from progress_events import publish_event
+
+logger = logging.getLogger(__name__)
+
+# Status cache configuration from environment variables
+STATUS_CACHE_ENABLED = os.getenv("STATUS_CACHE_ENABLED", "true").lower() == "true"
+STATUS_CACHE_SIZE = int(os.getenv("STATUS_CACHE_SIZE", "1024"))  # analyses kept per API process
+STATUS_CACHE_TTL_SECONDS = float(os.getenv("STATUS_CACHE_TTL_SECONDS", "2"))  # in-process, active analyses
+STATUS_CACHE_SHARED_TTL_SECONDS = int(os.getenv("STATUS_CACHE_SHARED_TTL_SECONDS", "60"))  # Redis, active analyses
+STATUS_CACHE_TERMINAL_TTL_SECONDS = int(os.getenv("STATUS_CACHE_TERMINAL_TTL_SECONDS", "3600"))  # both levels, finished analyses
+STATUS_CACHE_REDIS = os.getenv("STATUS_CACHE_REDIS", "true").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+REDIS_RETRY_SECONDS = 30  # back off after Redis errors instead of slowing every poll
+KEY_PREFIX = "analysis-status:"
+
+# Celery task state reported for each analysis status when a worker writes the cache
+TASK_STATES = {"pending": "PENDING", "running": "STARTED", "completed": "SUCCESS", "failed": "FAILURE"}
+
+# Celery states after which a task will not run again (celery.states.READY_STATES)
+FINISHED_TASK_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+
+class StatusEntry(NamedTuple):
+    """A cached /status response body and its ETag"""
+    payload: Dict[str, Any]
+    etag: str
+    terminal: bool
+
+
+def build_status_payload(analysis: Analysis, task_status: Optional[str]) -> Dict[str, Any]:
+    """Build the /status response body for an analysis"""
+    payload = {
+        "analysis_id": analysis.id,
+        "status": analysis.status,
+        "task_id": analysis.task_id,
+        "task_status": task_status,
+        "query": analysis.query,
+        "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
+        "started_at": analysis.started_at.isoformat() if analysis.started_at else None,
+        "completed_at": analysis.completed_at.isoformat() if analysis.completed_at else None,
+        "duration_seconds": analysis.duration_seconds
+    }
+    if analysis.status == "completed":
+        payload["result"] = analysis.result
+    elif analysis.status == "failed":
+        payload["error_message"] = analysis.error_message
+    return payload
+
+
+def is_terminal(payload: Dict[str, Any]) -> bool:
+    """Whether a status can no longer change
+
+    A failed analysis is only terminal once its Celery task has finished; a
+    missing or unknown task state may still be a retry, so it is not.
+    """
+    return payload["status"] == "completed" or (
+        payload["status"] == "failed" and payload.get("task_status") in FINISHED_TASK_STATES
+    )
+
+
+def make_etag(payload: Dict[str, Any]) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+class StatusCache:
+    """In-process TTL/LRU of status responses, optionally backed by Redis"""
+
+    def __init__(self, max_entries: int = STATUS_CACHE_SIZE, ttl: float = STATUS_CACHE_TTL_SECONDS,
+                 redis_url: Optional[str] = REDIS_URL if STATUS_CACHE_REDIS else None,
+                 terminal_ttl: float = STATUS_CACHE_TERMINAL_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.terminal_ttl = terminal_ttl
+        self.redis_url = redis_url
+        self._memory: "OrderedDict[int, tuple]" = OrderedDict()  # id -> (entry, expires_at)
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_retry_at = 0.0
+
+    def peek(self, analysis_id: int) -> Optional[StatusEntry]:
+        """In-process lookup only (never blocks)"""
+        with self._lock:
+            cached = self._memory.get(analysis_id)
+            if cached is None:
+                return None
+            entry, expires_at = cached
+            if expires_at < time.monotonic():
+                del self._memory[analysis_id]
+                return None
+            self._memory.move_to_end(analysis_id)
+            return entry
+
+    def get(self, analysis_id: int) -> Optional[StatusEntry]:
+        """In-process lookup, then the shared Redis level (a blocking call)"""
+        entry = self.peek(analysis_id)
+        if entry is not None:
+            return entry
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            raw = client.get(KEY_PREFIX + str(analysis_id))
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if raw is None:
+            return None
+        entry = StatusEntry(**json.loads(raw))
+        self._remember(analysis_id, entry)
+        return entry
+
+    def put(self, payload: Dict[str, Any], terminal: Optional[bool] = None) -> StatusEntry:
+        """Cache a status response in both levels (workers call this on every state transition)"""
+        terminal = is_terminal(payload) if terminal is None else terminal
+        entry = StatusEntry(payload, make_etag(payload), terminal)
+        self._remember(payload["analysis_id"], entry)
+        client = self._client()
+        if client is not None:
+            try:
+                client.set(
+                    KEY_PREFIX + str(payload["analysis_id"]),
+                    json.dumps(entry._asdict(), separators=(",", ":")),
+                    ex=max(1, int(self.terminal_ttl)) if terminal else STATUS_CACHE_SHARED_TTL_SECONDS,
+                )
+            except Exception as e:
+                self._redis_failed(e)
+        return entry
+
+    def _remember(self, analysis_id: int, entry: StatusEntry) -> None:
+        expires_at = time.monotonic() + (self.terminal_ttl if entry.terminal else self.ttl)
+        with self._lock:
+            self._memory[analysis_id] = (entry, expires_at)
+            self._memory.move_to_end(analysis_id)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _client(self):
+        if not self.redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            except Exception as e:
+                self._redis_failed(e)
+                return None
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning(f"Status cache Redis unavailable, using in-process cache only: {str(error)}")
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+
+# Shared instance used by the API and the workers
+status_cache = StatusCache()
+
+
+def publish_status(analysis: Analysis, terminal: Optional[bool] = None, task_status: Optional[str] = None) -> None:
+    """Write an analysis's current state to the status cache and its progress channel (never raises)"""
+    payload = build_status_payload(analysis, task_status or TASK_STATES.get(analysis.status))
+    if STATUS_CACHE_ENABLED:
+        try:
+            status_cache.put(payload, terminal)
+        except Exception as e:
+            logger.warning(f"Could not update status cache for analysis {analysis.id}: {str(e)}")
+    publish_event(analysis.id, "status", dict(payload, terminal=is_terminal(payload) if terminal is None else terminal))
@@ -4,7 +4,7 @@
 from crewai import Task
 
 from agents import financial_analyst, verifier, investment_advisor, risk_assessor
-from tools import search_tool, financial_document_tool, investment_tool, risk_tool
+from tools import search_tool, financial_document_tool, document_search_tool, financial_tables_tool, financial_metrics_tool, investment_tool, risk_tool
 
 ## Completely rewrote financial document analysis task with professional approach
 ## Old task description encouraged making up information and ignoring user queries
@@ -12,8 +12,18 @@ from tools import search_tool, financial_document_tool, investment_tool, risk_to
 analyze_financial_document = Task(
     description="""Conduct a comprehensive financial analysis of the provided document to address the user's query: {query}
     
+    The document is stored at {file_path}. A pre-computed digest of it (key metrics, statement tables,
+    key sections and risk passages) is included below. Work from the digest; for details it does not cover,
+    prefer the document search tool over reading the full document.
+
+    Document digest:
+    {document_digest}
+
+    Findings from the earlier analysis stages this task builds on:
+    {prior_findings}
+
     Your analysis should include:
-    1. Extract and read the financial document thoroughly
+    1. Review the document digest, reading the full document only where it lacks detail
     2. Identify key financial metrics, ratios, and performance indicators
     3. Analyze financial trends, growth patterns, and operational performance
     4. Evaluate the company's financial health and stability
@@ -46,7 +56,7 @@ analyze_financial_document = Task(
     Format the analysis professionally with clear sections and bullet points where appropriate.""",
 
     agent=financial_analyst,
-    tools=[financial_document_tool],
+    tools=[financial_tables_tool, document_search_tool, financial_document_tool],
     async_execution=False,
 )
 
@@ -56,6 +66,16 @@ analyze_financial_document = Task(
 investment_analysis = Task(
     description="""Based on the financial document analysis, provide investment insights and recommendations related to: {query}
     
+    The document is stored at {file_path}. A pre-computed digest of it (key metrics, statement tables,
+    key sections and risk passages) is included below. Work from the digest; for details it does not cover,
+    prefer the document search tool over reading the full document.
+
+    Document digest:
+    {document_digest}
+
+    Findings from the earlier analysis stages this task builds on:
+    {prior_findings}
+
     Your investment analysis should:
     1. Use the financial data from the document to assess investment attractiveness
     2. Consider valuation metrics, growth prospects, and financial stability
@@ -93,7 +113,7 @@ investment_analysis = Task(
     Provide clear, actionable insights based on the financial analysis.""",
 
     agent=investment_advisor,
-    tools=[investment_tool, financial_document_tool],
+    tools=[investment_tool, financial_metrics_tool, financial_tables_tool, document_search_tool, financial_document_tool],
     async_execution=False,
 )
 
@@ -103,6 +123,16 @@ investment_analysis = Task(
 risk_assessment = Task(
     description="""Conduct a thorough risk assessment based on the financial document analysis, addressing: {query}
     
+    The document is stored at {file_path}. A pre-computed digest of it (key metrics, statement tables,
+    key sections and risk passages) is included below. Work from the digest; for details it does not cover,
+    prefer the document search tool over reading the full document.
+
+    Document digest:
+    {document_digest}
+
+    Findings from the earlier analysis stages this task builds on:
+    {prior_findings}
+
     Your risk assessment should:
     1. Identify specific financial risks from the document data
     2. Evaluate operational, market, and industry-specific risks
@@ -142,7 +172,7 @@ risk_assessment = Task(
     Provide actionable risk insights that investors can use for decision-making.""",
 
     agent=risk_assessor,
-    tools=[risk_tool, financial_document_tool],
+    tools=[risk_tool, financial_metrics_tool, financial_tables_tool, document_search_tool, financial_document_tool],
     async_execution=False,
 )
 
@@ -151,8 +181,18 @@ risk_assessment = Task(
 verification = Task(
     description="""Thoroughly verify and validate that the uploaded document is a legitimate financial document suitable for analysis.
     
+    The document is stored at {file_path}. A pre-computed digest of it (key metrics, statement tables,
+    key sections and risk passages) is included below. Work from the digest; for details it does not cover,
+    prefer the document search tool over reading the full document.
+
+    Document digest:
+    {document_digest}
+
+    Findings from the earlier analysis stages this task builds on:
+    {prior_findings}
+
     Your verification should:
-    1. Read and examine the document content carefully
+    1. Examine the document digest carefully, reading the document itself where needed
     2. Identify document type (10-K, 10-Q, earnings report, financial statement, etc.)
     3. Verify presence of key financial data and metrics
     4. Check for standard financial document formatting and structure
@@ -186,6 +226,6 @@ verification = Task(
     Provide clear guidance on whether the document can support reliable financial analysis.""",
 
     agent=verifier,
-    tools=[financial_document_tool],
+    tools=[document_search_tool, financial_document_tool],
     async_execution=False
 )
\ No newline at end of file
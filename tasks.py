@@ -2,14 +2,27 @@
 Background tasks for financial document analysis
 """
 import os
+import time
 import logging
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from celery import current_task
+from celery.signals import worker_process_init
 from celery_app import celery_app
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, dispose_engines
 from models import Analysis, Document
+from blob_store import release_document, evict_blobs
+from status_cache import publish_status
+from progress_events import publish_event
+from checkpoints import load_checkpoints, save_checkpoint, clear_checkpoints
+from stage_scheduler import run_stages
+from llm_cache import llm_response_cache
+from crew_pool import CrewPool, CREW_POOL_ENABLED
+from pdf_extraction import PDFExtractionError
+from extraction_cache import iter_document_pages
+from document_digest import build_document_digest, DIGEST_ENABLED
 
 # Import analysis components
 from crewai import Crew, Process
@@ -20,35 +33,126 @@ from task import analyze_financial_document, verification, investment_analysis,
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def run_crew_analysis(query: str, file_path: str) -> Dict[str, Any]:
+# Crew execution: "dag" runs independent stages concurrently, "sequential" runs one stage at a time
+CREW_EXECUTION_MODE = os.getenv("CREW_EXECUTION_MODE", "dag").lower()
+CREW_MAX_PARALLEL_STAGES = int(os.getenv("CREW_MAX_PARALLEL_STAGES", "2"))
+
+# Crew stages: (checkpoint name, agent, task, stages whose output it needs)
+# Investment and risk only depend on the verified analysis, so they can run side by side
+CREW_STAGES = [
+    ("verification", verifier, verification, ()),
+    ("analysis", financial_analyst, analyze_financial_document, ("verification",)),
+    ("investment", investment_advisor, investment_analysis, ("verification", "analysis")),
+    ("risk", risk_assessor, risk_assessment, ("verification", "analysis")),
+]
+
+def build_stage_crews() -> Dict[str, Crew]:
+    """One single-task crew per stage, holding its own copies of the stage's agent and task"""
+    return {
+        name: Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=True).copy()
+        for name, agent, task, _ in CREW_STAGES
+    }
+
+# Stage crews are built once per worker process and reset between analyses
+crew_pool = CrewPool(build_stage_crews)
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Give each prefork child its own connections and a warm crew pool"""
+    dispose_engines()
+    llm_response_cache.reset_connection()
+    if CREW_POOL_ENABLED:
+        try:
+            crew_pool.warm()
+        except Exception as e:
+            logger.warning(f"Could not warm crew pool, crews will be built on first use: {str(e)}")
+
+def stage_dependencies(mode: str = CREW_EXECUTION_MODE) -> Dict[str, tuple]:
+    """Dependency graph of the crew stages; sequential mode chains every stage after the previous ones"""
+    if mode == "sequential":
+        names = [name for name, _, _, _ in CREW_STAGES]
+        return {name: tuple(names[:i]) for i, name in enumerate(names)}
+    return {name: deps for name, _, _, deps in CREW_STAGES}
+
+def format_prior_findings(outputs: Dict[str, str]) -> str:
+    """Render the outputs of earlier stages as context for a stage"""
+    if not outputs:
+        return "None - this is the first stage."
+    return "\n\n".join(f"### {stage.title()} stage\n{output}" for stage, output in outputs.items())
+
+def run_crew_analysis(query: str, file_path: str, analysis_id: Optional[int] = None) -> Dict[str, Any]:
     """
     Run the complete financial analysis crew with all agents
-    This is a stateless function that creates fresh agents and crew for each task
+    Stage crews come from the worker's warm pool and are reset after every
+    analysis (or are built fresh when CREW_POOL_ENABLED is false). Stages run as a dependency graph, each in its own single-task crew that
+    receives the outputs of the stages it depends on. When analysis_id is
+    given, each stage is checkpointed as it finishes and a retry only runs
+    the stages without a checkpoint
     """
     try:
         logger.info(f"Creating new crew for analysis - Query: {query[:100]}...")
         
-        # Create fresh crew instance to avoid state contamination
-        financial_crew = Crew(
-            agents=[verifier, financial_analyst, investment_advisor, risk_assessor],
-            tasks=[verification, analyze_financial_document, investment_analysis, risk_assessment],
-            process=Process.sequential,
-            verbose=True
-        )
+        # Stages completed by an earlier attempt are not re-run
+        checkpoints = load_checkpoints(analysis_id) if analysis_id is not None else {}
+        if checkpoints:
+            logger.info(f"Resuming analysis {analysis_id} after stages: {', '.join(checkpoints)}")
         
-        # Prepare inputs
-        crew_inputs = {
-            'query': query,
-            'file_path': file_path
-        }
+        # Pre-LLM stage: digest the document once (metrics, tables, key sections,
+        # risk passages) so the agents work from a size-bounded summary
+        document_digest = "No digest available; use the document tools to read the document."
+        if DIGEST_ENABLED:
+            try:
+                document_digest = build_document_digest(file_path)
+            except Exception as digest_error:
+                logger.warning(f"Could not build document digest for {file_path}: {str(digest_error)}")
         
-        logger.info(f"Starting CrewAI analysis for file: {file_path}")
-        result = financial_crew.kickoff(crew_inputs)
+        setup_started = time.perf_counter()
+        with (crew_pool.acquire() if CREW_POOL_ENABLED else nullcontext(build_stage_crews())) as crews:
+            logger.info(f"Crew setup took {(time.perf_counter() - setup_started) * 1000:.1f} ms")
+            
+            def run_stage(name: str, dependency_outputs: Dict[str, str]) -> str:
+                output = str(crews[name].kickoff({
+                    'query': query,
+                    'file_path': file_path,
+                    'document_digest': document_digest,
+                    'prior_findings': format_prior_findings(dependency_outputs)
+                }))
+                if analysis_id is not None:
+                    save_checkpoint(analysis_id, name, output)
+                return output
+            
+            def on_stage_complete(name: str, output: str, completed: int) -> None:
+                if analysis_id is not None:
+                    publish_event(analysis_id, "task", {
+                        "analysis_id": analysis_id,
+                        "stage": name,
+                        "agent": str(getattr(crews[name].agents[0], "role", "") or ""),
+                        "completed_tasks": completed,
+                        "total_tasks": len(CREW_STAGES)
+                    })
+            
+            logger.info(f"Starting CrewAI analysis for file: {file_path} ({CREW_EXECUTION_MODE} mode)")
+            dependencies = stage_dependencies()
+            outputs = run_stages(
+                dependencies,
+                run_stage,
+                completed=checkpoints,
+                max_parallel=CREW_MAX_PARALLEL_STAGES if CREW_EXECUTION_MODE != "sequential" else 1,
+                on_stage_complete=on_stage_complete
+            )
+        
+        # The result is the output of the final stages (those no other stage depends on)
+        needed = {dep for deps in dependencies.values() for dep in deps}
+        final_stages = [name for name in dependencies if name not in needed]
+        if len(final_stages) == 1:
+            result = outputs[final_stages[0]]
+        else:
+            result = "\n\n".join(f"## {name.title()}\n\n{outputs[name]}" for name in final_stages)
         
-        logger.info("CrewAI analysis completed successfully")
+        logger.info(f"CrewAI analysis completed successfully (LLM response cache: {llm_response_cache.stats()})")
         return {
             "status": "success",
-            "analysis_result": str(result),
+            "analysis_result": result,
             "query_processed": query,
             "file_analyzed": file_path
         }
@@ -74,6 +178,7 @@ def analyze_document(self, analysis_id: int, document_path: str, query: str):
     """
     db: Session = SessionLocal()
     task_id = current_task.request.id
+    finished = True  # False while Celery will retry, so the document blob stays referenced
     
     try:
         # Get analysis record
@@ -87,6 +192,7 @@ def analyze_document(self, analysis_id: int, document_path: str, query: str):
         analysis.started_at = datetime.utcnow()
         analysis.task_id = task_id
         db.commit()
+        publish_status(analysis)
         
         logger.info(f"Task {task_id}: Starting analysis {analysis_id}")
         
@@ -94,8 +200,16 @@ def analyze_document(self, analysis_id: int, document_path: str, query: str):
         if not os.path.exists(document_path):
             raise FileNotFoundError(f"Document not found at path: {document_path}")
         
+        # Extract the document once up front, streaming pages into the extraction
+        # cache, so every agent's document tool call is a cache hit
+        try:
+            page_count = sum(1 for _ in iter_document_pages(document_path))
+            logger.info(f"Task {task_id}: Extracted {page_count} pages from {document_path}")
+        except PDFExtractionError as e:
+            logger.warning(f"Task {task_id}: Could not pre-extract document: {str(e)}")
+        
         # Run the analysis
-        result = run_crew_analysis(query=query, file_path=document_path)
+        result = run_crew_analysis(query=query, file_path=document_path, analysis_id=analysis_id)
         
         if result.get("status") == "error":
             # Analysis failed
@@ -111,6 +225,8 @@ def analyze_document(self, analysis_id: int, document_path: str, query: str):
             analysis.result = str(result.get("analysis_result", ""))
             analysis.completed_at = datetime.utcnow()
             db.commit()
+            publish_status(analysis, terminal=True)
+            clear_checkpoints(analysis_id)
             logger.info(f"Task {task_id}: Analysis completed successfully")
             
             return {
@@ -121,26 +237,31 @@ def analyze_document(self, analysis_id: int, document_path: str, query: str):
     
     except Exception as e:
         # Update analysis status to failed
+        finished = self.request.retries >= self.retry_kwargs.get('max_retries', self.max_retries)
         analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
         if analysis:
             analysis.status = "failed"
             analysis.error_message = str(e)
             analysis.completed_at = datetime.utcnow()
             db.commit()
+            publish_status(analysis, terminal=finished, task_status=None if finished else "RETRY")
         
         logger.error(f"Task {task_id}: Analysis {analysis_id} failed with error: {str(e)}")
         raise e
     
     finally:
+        # The document lives in the shared blob store; drop this analysis's
+        # reference and let the retention policy decide when to delete it
+        if finished:
+            try:
+                analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+                if analysis:
+                    release_document(db, analysis.document_id)
+                evict_blobs(db)
+            except Exception as cleanup_error:
+                db.rollback()
+                logger.warning(f"Failed to release document blob for analysis {analysis_id}: {str(cleanup_error)}")
         db.close()
-        
-        # Clean up document file after analysis
-        try:
-            if os.path.exists(document_path):
-                os.remove(document_path)
-                logger.info(f"Cleaned up document file: {document_path}")
-        except Exception as cleanup_error:
-            logger.warning(f"Failed to cleanup file {document_path}: {str(cleanup_error)}")
 
 # Health check task
 @celery_app.task
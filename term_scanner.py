@@ -0,0 +1,109 @@
+"""
+Single-pass, whole-word term matching for the analysis tools
+
+All term dictionaries are compiled into one case-insensitive regex
+alternation at import time, so a document is scanned once in linear time
+regardless of how many terms are configured.
+"""
+import os
+import re
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Optional JSON file of {"group": ["term", ...]} that overrides or extends the defaults
+TERM_DICTIONARY_PATH = os.getenv("TERM_DICTIONARY_PATH")
+
+DEFAULT_TERM_DICTIONARIES: Dict[str, List[str]] = {
+    "financial_terms": [
+        "revenue", "profit", "loss", "ebitda", "margin", "growth",
+        "cash flow", "debt", "equity", "assets", "liabilities",
+        "earnings", "dividend", "market cap", "p/e ratio", "roi",
+    ],
+    "high_risk": ["loss", "decline", "bankruptcy", "litigation", "regulatory", "volatile"],
+    "moderate_risk": ["uncertainty", "competition", "market conditions", "economic"],
+    "low_risk": ["stable", "consistent", "diversified", "strong position"],
+    "qualifiers": ["low"],
+}
+
+
+def _normalize_term(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+class ScanResult:
+    """Occurrences of every configured term in one document"""
+
+    def __init__(self, dictionaries: Dict[str, List[str]], positions: Dict[str, List[int]]):
+        self.dictionaries = dictionaries
+        self.positions = positions
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        """Number of occurrences per term (terms that were not found are omitted)"""
+        return {term: len(offsets) for term, offsets in self.positions.items()}
+
+    def has(self, term: str) -> bool:
+        """Whether the term occurs at least once"""
+        return _normalize_term(term) in self.positions
+
+    def found(self, group: str) -> List[str]:
+        """Terms of a dictionary group that occur in the document, in dictionary order"""
+        return [term for term in self.dictionaries.get(group, []) if term in self.positions]
+
+    def group_occurrences(self, group: str) -> int:
+        """Total occurrences of all terms in a dictionary group"""
+        return sum(len(self.positions[term]) for term in self.found(group))
+
+    def merge(self, other: "ScanResult", offset: int = 0) -> "ScanResult":
+        """Add the occurrences of a scan of a later chunk of text that starts at offset"""
+        for term, offsets in other.positions.items():
+            self.positions.setdefault(term, []).extend(position + offset for position in offsets)
+        return self
+
+
+class TermScanner:
+    """Precompiled multi-term matcher
+
+    Terms match case-insensitively on word boundaries (so "loss" does not
+    match inside "glossary"), and multi-word terms tolerate any run of
+    whitespace between words, including line breaks.
+    """
+
+    def __init__(self, dictionaries: Dict[str, List[str]]):
+        self.dictionaries = {
+            group: [_normalize_term(term) for term in terms] for group, terms in dictionaries.items()
+        }
+        terms = {term for group_terms in self.dictionaries.values() for term in group_terms}
+        # Longest first so the alternation prefers "cash flow" over a shorter overlapping term
+        alternatives = [
+            r"\s+".join(re.escape(word) for word in term.split())
+            for term in sorted(terms, key=len, reverse=True)
+        ]
+        self._pattern = re.compile(r"\b(?:" + "|".join(alternatives) + r")\b", re.IGNORECASE) if alternatives else None
+
+    def scan(self, text: str) -> ScanResult:
+        """Find every term occurrence in one pass over the text"""
+        positions: Dict[str, List[int]] = {}
+        if self._pattern is not None and text:
+            for match in self._pattern.finditer(text):
+                positions.setdefault(_normalize_term(match.group(0)), []).append(match.start())
+        return ScanResult(self.dictionaries, positions)
+
+
+def load_term_dictionaries(path: Optional[str] = TERM_DICTIONARY_PATH) -> Dict[str, List[str]]:
+    """Default term dictionaries, updated with the groups from an optional JSON file"""
+    dictionaries = dict(DEFAULT_TERM_DICTIONARIES)
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                dictionaries.update(json.load(f))
+        except Exception as e:
+            logger.warning(f"Could not load term dictionaries from {path}, using defaults: {str(e)}")
+    return dictionaries
+
+
+# Shared scanner used by InvestmentTool and RiskTool
+term_scanner = TermScanner(load_term_dictionaries())
@@ -0,0 +1,98 @@
+"""
+Keyword-based investment and risk signals derived from a term scan
+
+Shared by InvestmentTool/RiskTool and the document digest. Working from a
+ScanResult rather than raw text lets the digest scan a document page by page
+and merge the results, and keeps this module free of CrewAI.
+"""
+from typing import Any, Dict
+
+from term_scanner import ScanResult
+
+LEVERAGE_RATIOS = ("debt_to_equity", "liabilities_to_assets", "debt_to_ebitda")
+
+
+def investment_signals(scan: ScanResult, document_length: int, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Key financial terms and simple investment indicators found in a document"""
+    analysis_results = {
+        "document_length": document_length,
+        "key_financial_terms": [],
+        "potential_metrics": metrics,
+        "investment_indicators": [],
+        "analysis_summary": ""
+    }
+
+    found_terms = scan.found("financial_terms")
+    analysis_results["key_financial_terms"] = found_terms[:10]  # Limit to top 10
+    analysis_results["term_counts"] = {term: scan.counts[term] for term in found_terms[:10]}
+
+    # Simple investment indicators
+    if scan.has("growth") and scan.has("revenue"):
+        analysis_results["investment_indicators"].append("Potential Growth Company")
+    if scan.has("dividend"):
+        analysis_results["investment_indicators"].append("Dividend-Paying Stock")
+    if scan.has("debt") and scan.has("low"):
+        analysis_results["investment_indicators"].append("Low Debt Profile")
+
+    analysis_results["analysis_summary"] = f"Found {len(found_terms)} key financial terms in document"
+    return analysis_results
+
+
+def risk_signals(scan: ScanResult, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Risk score, level and identified risks from the risk term dictionaries and leverage ratios"""
+    leverage = {name: values for name, values in metrics.get("ratios", {}).items() if name in LEVERAGE_RATIOS}
+
+    risk_assessment = {
+        "overall_risk_level": "Medium",  # Default
+        "leverage_metrics": leverage,
+        "identified_risks": [],
+        "risk_factors": [],
+        "mitigation_suggestions": [],
+        "risk_score": 5,  # Scale of 1-10
+        "assessment_summary": ""
+    }
+    if "error" in metrics:
+        risk_assessment["leverage_metrics_error"] = metrics["error"]
+
+    # Count risk indicators (distinct terms found per risk dictionary)
+    high_risk_count = len(scan.found("high_risk"))
+    moderate_risk_count = len(scan.found("moderate_risk"))
+    low_risk_count = len(scan.found("low_risk"))
+
+    # Calculate risk score
+    risk_score = 5  # Base score
+    risk_score += high_risk_count * 1.5
+    risk_score += moderate_risk_count * 0.5
+    risk_score -= low_risk_count * 0.5
+    risk_score = max(1, min(10, risk_score))  # Clamp between 1-10
+
+    # Determine overall risk level
+    if risk_score <= 3:
+        risk_level = "Low"
+    elif risk_score <= 7:
+        risk_level = "Medium"
+    else:
+        risk_level = "High"
+
+    # Identify specific risks
+    identified_risks = []
+    if scan.has("debt"):
+        identified_risks.append("Debt levels may impact financial flexibility")
+    if scan.has("competition"):
+        identified_risks.append("Competitive market pressures identified")
+    if scan.has("regulatory"):
+        identified_risks.append("Regulatory compliance risks present")
+
+    risk_assessment.update({
+        "overall_risk_level": risk_level,
+        "risk_score": round(risk_score, 1),
+        "identified_risks": identified_risks[:5],  # Limit to top 5
+        "risk_factors": [f"High-risk terms: {high_risk_count}", f"Moderate-risk terms: {moderate_risk_count}"],
+        "mitigation_suggestions": [
+            "Diversify investment portfolio",
+            "Monitor financial metrics regularly",
+            "Consider position sizing based on risk level"
+        ],
+        "assessment_summary": f"Risk level: {risk_level} (Score: {round(risk_score, 1)}/10)"
+    })
+    return risk_assessment
@@ -3,6 +3,7 @@ Test script for the enhanced financial document analyzer system
 Usage: python test_system.py
 """
 import requests
+import json
 import time
 import sys
 import os
@@ -23,6 +24,26 @@ def test_health_check():
         print(f"   ❌ Health check failed: {e}")
         return False
 
+def follow_progress(analysis_id, timeout):
+    """Read the /progress event stream until a terminal status; returns that status or None"""
+    deadline = time.time() + timeout
+    event = None
+    with requests.get(f"{API_BASE}/progress/{analysis_id}", stream=True, timeout=timeout) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if time.time() > deadline:
+                return None
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "task":
+                    print(f"   Stage {data.get('completed_tasks')}/{data.get('total_tasks')} done: {data.get('stage')} ({data.get('agent')})")
+                elif event == "status":
+                    print(f"   Status: {data.get('status')}")
+                    if data.get("terminal"):
+                        return data
+    return None
+
 def test_document_analysis():
     """Test document analysis with sample file"""
     print("📄 Testing document analysis...")
@@ -54,36 +75,22 @@ def test_document_analysis():
         print(f"   ✅ Analysis submitted (ID: {analysis_id})")
         print(f"   Task ID: {submission.get('task_id')}")
         
-        # Poll for completion
-        print("   ⏳ Polling for completion...")
-        max_attempts = 30  # 5 minutes max
-        attempt = 0
+        # Follow progress over Server-Sent Events (no polling)
+        print("   📡 Following progress...")
+        status_data = follow_progress(analysis_id, timeout=300)  # 5 minutes max
+        if status_data is None:
+            print("   ❌ Analysis did not finish within 5 minutes")
+            return False
         
-        while attempt < max_attempts:
-            time.sleep(10)  # Wait 10 seconds between polls
-            attempt += 1
-            
-            status_response = requests.get(f"{API_BASE}/status/{analysis_id}")
-            if status_response.status_code != 200:
-                print(f"   ❌ Status check failed: {status_response.status_code}")
-                continue
-                
-            status_data = status_response.json()
-            current_status = status_data.get('status')
-            
-            print(f"   Status (attempt {attempt}): {current_status}")
-            
-            if current_status == 'completed':
-                print("   ✅ Analysis completed successfully!")
-                result_length = len(status_data.get('result', ''))
-                print(f"   Result length: {result_length} characters")
-                print(f"   Duration: {status_data.get('duration_seconds', 0):.1f} seconds")
-                return True
-            elif current_status == 'failed':
-                print(f"   ❌ Analysis failed: {status_data.get('error_message')}")
-                return False
+        current_status = status_data.get('status')
+        if current_status == 'completed':
+            print("   ✅ Analysis completed successfully!")
+            result_length = len(status_data.get('result') or '')
+            print(f"   Result length: {result_length} characters")
+            print(f"   Duration: {status_data.get('duration_seconds', 0):.1f} seconds")
+            return True
         
-        print(f"   ❌ Analysis timed out after {max_attempts} attempts")
+        print(f"   ❌ Analysis failed: {status_data.get('error_message')}")
         return False
         
     except Exception as e:
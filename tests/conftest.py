@@ -0,0 +1,70 @@
+"""
+Shared test setup
+
+The modules live at the project root, and several of them read their
+configuration and create engines at import time, so the environment is
+pointed at a scratch directory before any of them is imported.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="analyzer-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(SCRATCH_DIR, 'test.db')}")
+os.environ.setdefault("EXTRACTION_CACHE_DIR", os.path.join(SCRATCH_DIR, "extraction"))
+os.environ.setdefault("BLOB_STORE_DIR", os.path.join(SCRATCH_DIR, "blobs"))
+os.environ.setdefault("STATUS_CACHE_REDIS", "false")
+os.environ.setdefault("PROGRESS_EVENTS_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(SCRATCH_DIR, "llm_responses.sqlite3"))
+
+import pytest
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """TestClient for the API over the scratch database, emptied after the test"""
+    from fastapi.testclient import TestClient
+
+    import main
+    from database import SessionLocal
+    from models import Analysis, Document
+    from status_cache import status_cache
+
+    monkeypatch.setattr(main, "get_task_status", lambda task_id: None)
+    status_cache.clear()
+    with TestClient(main.app) as client:
+        yield client
+    status_cache.clear()
+    db = SessionLocal()
+    for model in (Analysis, Document):
+        for row in db.query(model).all():
+            db.delete(row)  # one by one, so the per-status counters stay in step
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def make_analysis():
+    """Insert an analysis (and its document) and return its id"""
+    from database import SessionLocal
+    from models import Analysis, Document
+
+    def make(status="pending", query="Summarise the results", created_at=None, **fields):
+        db = SessionLocal()
+        try:
+            document = Document(filename="report.pdf", file_hash=os.urandom(32).hex(), file_size=10)
+            db.add(document)
+            db.flush()
+            analysis = Analysis(document_id=document.id, query=query, status=status, **fields)
+            if created_at is not None:
+                analysis.created_at = created_at
+            db.add(analysis)
+            db.commit()
+            return analysis.id
+        finally:
+            db.close()
+
+    return make
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from models import Analysis, AnalysisCount, recount_analysis_counts
+
+
+def counts():
+    db = SessionLocal()
+    try:
+        return {row.status: row.count for row in db.query(AnalysisCount).all() if row.count}
+    finally:
+        db.close()
+
+
+def walk(api, **params):
+    pages, cursor = [], None
+    while True:
+        response = api.get("/analyses", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        pages.append([analysis["analysis_id"] for analysis in body["analyses"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages, body["total"]
+
+
+def test_counters_follow_inserts_status_changes_and_deletes(api, make_analysis):
+    first = make_analysis(status="pending")
+    make_analysis(status="pending")
+    assert counts() == {"pending": 2}
+
+    db = SessionLocal()
+    analysis = db.get(Analysis, first)
+    analysis.status = "running"
+    db.commit()
+    assert counts() == {"pending": 1, "running": 1}
+
+    db.delete(analysis)
+    db.commit()
+    db.close()
+    assert counts() == {"pending": 1}
+
+
+def test_recount_repairs_counters_after_a_bulk_update(api, make_analysis):
+    make_analysis(status="pending")
+    make_analysis(status="pending")
+    db = SessionLocal()
+    db.query(Analysis).update({Analysis.status: "failed"}, synchronize_session=False)  # bypasses the ORM events
+    assert counts() == {"pending": 2}
+    recount_analysis_counts(db.connection())
+    db.commit()
+    db.close()
+    assert counts() == {"failed": 2}
+
+
+def test_cursor_pages_cover_every_analysis_once_in_order(api, make_analysis):
+    tied = datetime(2026, 10, 1, 12, 0, 0)
+    ids = [make_analysis(created_at=tied) for _ in range(4)]  # same created_at, ordered by id
+    ids.append(make_analysis(created_at=tied + timedelta(minutes=1)))
+    ids.insert(0, make_analysis(created_at=tied - timedelta(minutes=1)))
+
+    pages, total = walk(api, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert [analysis_id for page in pages for analysis_id in page] == [ids[5], ids[4], ids[3], ids[2], ids[1], ids[0]]
+    assert total == 6
+
+
+def test_status_filter_applies_to_pages_and_total(api, make_analysis):
+    completed = [make_analysis(status="completed") for _ in range(3)]
+    make_analysis(status="failed")
+
+    pages, total = walk(api, limit=2, status="completed")
+    assert sorted(analysis_id for page in pages for analysis_id in page) == completed
+    assert total == 3
+
+
+def test_malformed_cursor_is_rejected(api):
+    for cursor in ("not-base64!", "bm8tc2VwYXJhdG9y", "MjAyNi0xMC0wMXx4"):  # garbage, "no-separator", "2026-10-01|x"
+        response = api.get("/analyses", params={"cursor": cursor})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import main
+
+
+class FakeSubscription:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed or not self.messages:
+            raise StopAsyncIteration
+        return self.messages.pop(0)
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def subscriptions(monkeypatch):
+    opened = []
+
+    def subscribe(messages=()):
+        async def subscribe_events(analysis_id, timeout):
+            opened.append(FakeSubscription(messages))
+            return opened[-1]
+
+        monkeypatch.setattr(main, "subscribe_events", subscribe_events)
+        return opened
+
+    return subscribe
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.parametrize("status, task_status", [("completed", "SUCCESS"), ("failed", "FAILURE")])
+def test_terminal_analysis_closes_its_subscription(api, make_analysis, subscriptions, monkeypatch, status, task_status):
+    monkeypatch.setattr(main, "get_task_status", lambda task_id: task_status)
+    opened = subscriptions([{"event": "task", "data": {"stage": "never read"}}])
+    analysis_id = make_analysis(status=status, task_id="task-1", result="{}", error_message="boom")
+
+    events = sse_events(api.get(f"/progress/{analysis_id}").text)
+    assert events == [("status", events[0][1])]
+    assert events[0][1]["status"] == status and events[0][1]["terminal"] is True
+    assert len(opened) == 1 and opened[0].closed
+
+
+def test_missing_analysis_never_leaves_a_subscription_open(api, subscriptions):
+    opened = subscriptions()
+    assert api.get("/progress/999999").status_code == 404
+    assert all(subscription.closed for subscription in opened)
+
+
+def test_events_are_relayed_until_a_terminal_status(api, make_analysis, subscriptions):
+    analysis_id = make_analysis(status="running")
+    opened = subscriptions([
+        None,
+        {"event": "task", "data": {"stage": "analysis", "completed_tasks": 1, "total_tasks": 4}},
+        {"event": "status", "data": {"status": "completed", "terminal": True}},
+        {"event": "task", "data": {"stage": "never sent"}},
+    ])
+
+    response = api.get(f"/progress/{analysis_id}")
+    assert ": keep-alive" in response.text
+    assert [event for event, _ in sse_events(response.text)] == ["status", "task", "status"]
+    assert len(opened) == 1 and opened[0].closed
@@ -0,0 +1,49 @@
+from database import SessionLocal
+from models import Analysis
+from status_cache import publish_status
+
+
+def test_repeated_polls_return_the_same_etag(api, make_analysis):
+    analysis_id = make_analysis(status="running")
+    first = api.get(f"/status/{analysis_id}")
+    second = api.get(f"/status/{analysis_id}")
+    assert first.status_code == second.status_code == 200
+    assert first.headers["ETag"] and first.headers["ETag"] == second.headers["ETag"]
+    assert first.json() == second.json()
+
+
+def test_matching_if_none_match_gets_304(api, make_analysis):
+    analysis_id = make_analysis(status="running")
+    etag = api.get(f"/status/{analysis_id}").headers["ETag"]
+
+    response = api.get(f"/status/{analysis_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag and response.content == b""
+
+    # any tag of a list matches
+    response = api.get(f"/status/{analysis_id}", headers={"If-None-Match": f'"stale-1", {etag} ,"stale-2"'})
+    assert response.status_code == 304
+
+    response = api.get(f"/status/{analysis_id}", headers={"If-None-Match": '"stale-1", "stale-2"'})
+    assert response.status_code == 200
+
+
+def test_status_transition_changes_the_etag(api, make_analysis):
+    analysis_id = make_analysis(status="running")
+    etag = api.get(f"/status/{analysis_id}").headers["ETag"]
+
+    db = SessionLocal()
+    analysis = db.get(Analysis, analysis_id)
+    analysis.status = "completed"
+    db.commit()
+    publish_status(analysis)  # as the worker does on every state transition
+    db.close()
+
+    response = api.get(f"/status/{analysis_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.headers["ETag"] != etag
+
+
+def test_unknown_analysis_is_404(api):
+    assert api.get("/status/999999").status_code == 404
@@ -0,0 +1,60 @@
+import glob
+import hashlib
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from blob_store import blob_store
+
+PDF = b"%PDF-1.4\n" + b"0" * 5000
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    calls = []
+
+    def send_task(name, args):
+        calls.append(args)
+        return SimpleNamespace(id=f"task-{len(calls)}")
+
+    monkeypatch.setattr(main.celery_app, "send_task", send_task)
+    return calls
+
+
+def upload(api, content, query="Summarise the results"):
+    return api.post("/analyze", files={"file": ("report.pdf", content, "application/pdf")}, data={"query": query})
+
+
+def temp_files():
+    return glob.glob(os.path.join(blob_store.root, "*.upload"))
+
+
+def test_upload_is_stored_once_under_its_hash(api, sent):
+    file_hash = hashlib.sha256(PDF).hexdigest()
+    assert upload(api, PDF).json()["status"] == "submitted"
+    assert upload(api, PDF, query="List the risks").json()["status"] == "submitted"
+
+    assert [args[1] for args in sent] == [blob_store.path_for(file_hash)] * 2  # second upload reused the blob
+    with open(blob_store.path_for(file_hash), "rb") as stored:
+        assert stored.read() == PDF
+    assert temp_files() == []
+
+
+def test_empty_upload_is_rejected(api, sent):
+    response = upload(api, b"")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Uploaded file is empty"
+    assert sent == [] and temp_files() == []
+
+
+def test_oversized_upload_is_rejected_while_streaming(api, sent, monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_CHUNK_SIZE", 1024)
+    monkeypatch.setattr(main, "MAX_FILE_SIZE_BYTES", 4096)
+    content = PDF + b"oversized"
+    response = upload(api, content)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("File too large")
+    assert sent == [] and temp_files() == []
+    assert not blob_store.exists(hashlib.sha256(content).hexdigest())
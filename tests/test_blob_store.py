@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import blob_store
+from blob_store import acquire_document, claim_blob, evict_blobs, release_document
+from database import SessionLocal, create_tables
+from models import Document
+
+NOW = datetime(2026, 10, 16, 12, 0)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "blob_store", blob_store.BlobStore(str(tmp_path)))
+    create_tables()
+    session = SessionLocal()
+    yield session
+    session.query(Document).delete()
+    session.commit()
+    session.close()
+
+
+def stored_document(db, file_hash, size=100, idle_hours=0.0, refs=0):
+    path = blob_store.blob_store.path_for(file_hash)
+    fd, temp_path = blob_store.blob_store.create_temp()
+    with open(fd, "wb") as out:
+        out.write(b"%PDF" + file_hash.encode())
+    blob_store.blob_store.commit(temp_path, file_hash)
+    document = Document(filename=f"{file_hash}.pdf", file_hash=file_hash, file_size=size, file_path=path,
+                        ref_count=refs, last_used_at=NOW - timedelta(hours=idle_hours))
+    db.add(document)
+    db.commit()
+    return document
+
+
+def test_references_are_counted(db):
+    document = acquire_document(db, "a" * 64, "report.pdf", 10)
+    assert document.ref_count == 1 and document.file_path is None
+    assert acquire_document(db, "a" * 64, "report.pdf", 10).ref_count == 2
+    release_document(db, document.id)
+    release_document(db, document.id)
+    release_document(db, document.id)  # never goes below zero
+    db.refresh(document)
+    assert document.ref_count == 0
+
+
+def test_expired_unreferenced_blobs_are_evicted(db, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_RETENTION_HOURS", 24)
+    old = stored_document(db, "b" * 64, idle_hours=48)
+    in_use = stored_document(db, "c" * 64, idle_hours=48, refs=1)
+    recent = stored_document(db, "d" * 64, idle_hours=1)
+
+    assert evict_blobs(db, now=NOW) == 1
+    db.refresh(old)
+    assert old.file_path is None and not blob_store.blob_store.exists(old.file_hash)
+    assert blob_store.blob_store.exists(in_use.file_hash) and blob_store.blob_store.exists(recent.file_hash)
+
+
+def test_size_budget_evicts_least_recently_used_first(db, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_STORE_MAX_MB", 1)
+    oldest = stored_document(db, "e" * 64, size=600 * 1024, idle_hours=3)
+    newer = stored_document(db, "f" * 64, size=600 * 1024, idle_hours=2)
+
+    assert evict_blobs(db, now=NOW) == 1
+    assert not blob_store.blob_store.exists(oldest.file_hash)
+    assert blob_store.blob_store.exists(newer.file_hash)
+
+
+def test_blob_referenced_after_listing_is_not_claimed(db):
+    document = stored_document(db, "1" * 64, idle_hours=1000)
+    acquire_document(db, document.file_hash, "report.pdf", 100)  # races in after the candidates query
+
+    assert not claim_blob(db, document.id, document.file_hash)
+    db.refresh(document)
+    assert document.file_path is not None and blob_store.blob_store.exists(document.file_hash)
+
+
+def test_acquire_after_eviction_reports_the_blob_missing(db):
+    document = stored_document(db, "2" * 64, idle_hours=1000)
+    assert claim_blob(db, document.id, document.file_hash)
+
+    acquired = acquire_document(db, document.file_hash, "report.pdf", 100)
+    assert acquired.ref_count == 1 and acquired.file_path is None  # the upload must be written again
+    assert not claim_blob(db, document.id, document.file_hash)
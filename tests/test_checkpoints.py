@@ -0,0 +1,49 @@
+import pytest
+
+from checkpoints import clear_checkpoints, load_checkpoints, save_checkpoint
+from database import create_tables
+from stage_scheduler import run_stages
+
+DEPENDENCIES = {"analysis": [], "verification": ["analysis"], "investment": ["verification"], "risk": ["verification"]}
+ANALYSIS_ID = 4242
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_tables()
+    yield
+    clear_checkpoints(ANALYSIS_ID)
+
+
+def test_save_load_and_clear():
+    save_checkpoint(ANALYSIS_ID, "analysis", "first")
+    save_checkpoint(ANALYSIS_ID, "analysis", "second")  # a retry overwrites its own stage
+    save_checkpoint(ANALYSIS_ID, "verification", "verified")
+    assert load_checkpoints(ANALYSIS_ID) == {"analysis": "second", "verification": "verified"}
+    clear_checkpoints(ANALYSIS_ID)
+    assert load_checkpoints(ANALYSIS_ID) == {}
+
+
+def test_retry_resumes_after_checkpointed_stages():
+    def attempt(fail_stage):
+        ran = []
+
+        def run_stage(name, inputs):
+            ran.append(name)
+            if name == fail_stage:
+                raise RuntimeError("rate limited")
+            output = f"{name} output"
+            save_checkpoint(ANALYSIS_ID, name, output)
+            return output
+
+        return ran, lambda: run_stages(DEPENDENCIES, run_stage, completed=load_checkpoints(ANALYSIS_ID), max_parallel=1)
+
+    ran, run = attempt(fail_stage="risk")
+    with pytest.raises(RuntimeError):
+        run()
+    assert set(load_checkpoints(ANALYSIS_ID)) == set(ran) - {"risk"}
+
+    ran, run = attempt(fail_stage=None)
+    outputs = run()
+    assert "analysis" not in ran and "verification" not in ran and "risk" in ran
+    assert outputs == {name: f"{name} output" for name in DEPENDENCIES}
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+from crew_pool import CrewPool, reset_crew_state
+
+
+class MemoryStore:
+    def __init__(self):
+        self.items = []
+
+    def reset(self):
+        self.items = []
+
+
+def make_crew():
+    task = SimpleNamespace(output=None, used_tools=0, tools_errors=0, delegations=0,
+                           start_time=None, end_time=None, processed_by_agents=set())
+    agent = SimpleNamespace(agent_executor=None, tools_results=[], _times_executed=0,
+                            memory=True, _short_term_memory=MemoryStore(), _entity_memory=MemoryStore())
+    return SimpleNamespace(tasks=[task], agents=[agent], usage_metrics=None, memory=False,
+                           _short_term_memory=MemoryStore())
+
+
+def run(crew, document):
+    task, agent = crew.tasks[0], crew.agents[0]
+    task.output, task.used_tools, task.start_time = f"analysis of {document}", 3, 1.0
+    task.processed_by_agents.add("analyst")
+    agent.agent_executor, agent._times_executed = object(), 2
+    agent.tools_results.append({"result": document})
+    agent._short_term_memory.items.append(document)
+    agent._entity_memory.items.append(document)
+    crew._short_term_memory.items.append(document)
+    crew.usage_metrics = {"total_tokens": 100}
+
+
+def test_reused_crew_starts_clean():
+    built = []
+    pool = CrewPool(lambda: built.append(1) or {"analysis": make_crew()}, size=1)
+
+    with pool.acquire() as crews:
+        run(crews["analysis"], "10-K")
+    with pool.acquire() as crews:
+        crew = crews["analysis"]
+        task, agent = crew.tasks[0], crew.agents[0]
+        assert (task.output, task.used_tools, task.start_time, task.processed_by_agents) == (None, 0, None, set())
+        assert (agent.agent_executor, agent.tools_results, agent._times_executed) == (None, [], 0)
+        assert agent._short_term_memory.items == [] and agent._entity_memory.items == []
+        assert crew._short_term_memory.items == [] and crew.usage_metrics is None
+    assert len(built) == 1
+
+
+def test_crew_memory_is_reset_through_the_crew():
+    crew = make_crew()
+    crew.memory = True
+    crew.reset_memories = lambda command_type: calls.append(command_type)
+    calls = []
+    reset_crew_state(crew)
+    assert calls == ["all"]
+
+
+def test_crew_set_that_cannot_be_reset_is_rebuilt():
+    built = []
+
+    def factory():
+        crew = make_crew()
+        if not built:
+            crew.agents[0]._short_term_memory.reset = lambda: 1 / 0
+        built.append(crew)
+        return {"analysis": crew}
+
+    pool = CrewPool(factory, size=1)
+    with pool.acquire():
+        pass
+    with pool.acquire() as crews:
+        assert crews["analysis"] is built[1]
+
+
+def test_pool_waits_when_every_crew_set_is_checked_out():
+    import queue
+
+    pool = CrewPool(lambda: {"analysis": make_crew()}, size=1)
+    with pool.acquire():
+        with pytest.raises(queue.Empty):
+            with pool.acquire(timeout=0.01):
+                pass
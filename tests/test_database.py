@@ -0,0 +1,21 @@
+import pytest
+
+from database import to_async_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./financial_analyzer.db", "sqlite+aiosqlite:///./financial_analyzer.db"),
+    ("postgresql://user:pw@db/analyzer", "postgresql+asyncpg://user:pw@db/analyzer"),
+    ("postgres://user:pw@db/analyzer", "postgresql+asyncpg://user:pw@db/analyzer"),
+    ("postgresql+psycopg2://user:pw@db/analyzer", "postgresql+asyncpg://user:pw@db/analyzer"),
+    ("mysql+pymysql://user:pw@db/analyzer", "mysql+aiomysql://user:pw@db/analyzer"),
+    ("mariadb://user:pw@db/analyzer", "mariadb+aiomysql://user:pw@db/analyzer"),
+    ("mssql+aioodbc://user:pw@db/analyzer", "mssql+aioodbc://user:pw@db/analyzer"),
+])
+def test_async_url_uses_an_async_driver(url, expected):
+    assert to_async_url(url) == expected
+
+
+def test_unknown_backend_without_driver_asks_for_async_url():
+    with pytest.raises(ValueError, match="ASYNC_DATABASE_URL"):
+        to_async_url("mssql://user:pw@db/analyzer")
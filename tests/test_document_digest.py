@@ -0,0 +1,43 @@
+import pytest
+
+import document_digest
+from pdf_extraction import PageRecord
+
+PAGES = [
+    PageRecord(1, "Financial Highlights\n2024 2023\nTotal revenues 125 100\nRevenue growth was strong.", "test"),
+    PageRecord(2, "Risk Factors\nWe face litigation over patents. Competition is intense.", "test"),
+]
+
+
+@pytest.fixture
+def document(monkeypatch):
+    monkeypatch.setattr(document_digest, "iter_document_pages", lambda path: iter(PAGES))
+    monkeypatch.setattr(document_digest, "extract_financial_tables", lambda path: {})
+    return "report.pdf"
+
+
+def test_digest_has_every_part(document):
+    digest = document_digest.build_document_digest(document)
+    assert '"2024 vs 2023":0.25' in digest
+    assert "## Keyword and risk signals" in digest
+    assert "### Risk Factors (pages 2-2)" in digest
+    assert "- Competition is intense." in digest
+
+
+def test_failing_part_is_omitted_and_the_rest_kept(document, monkeypatch):
+    def broken(items, text):
+        raise ValueError("bad numbers")
+
+    monkeypatch.setattr(document_digest, "add_text_line_items", broken)
+    digest = document_digest.build_document_digest(document)
+    assert "## Key metrics" not in digest
+    assert "## Key sections" in digest and "## Risk passages" in digest
+
+
+def test_each_page_is_scanned_once(document, monkeypatch):
+    scanned = []
+    scan = document_digest.term_scanner.scan
+    monkeypatch.setattr(document_digest.term_scanner, "scan", lambda text: scanned.append(text) or scan(text))
+    digest = document_digest.build_document_digest(document)
+    assert len(scanned) == len(PAGES)
+    assert '"identified_risks":["Competitive market pressures identified"]' in digest
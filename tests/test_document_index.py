@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pytest
+
+import document_index
+import extraction_cache as extraction_cache_module
+from document_index import BM25_B, BM25_K1, Chunk, DocumentIndex, chunk_document, tokenize
+from extraction_cache import extraction_cache
+from pdf_extraction import EXTRACTION_PIPELINE_VERSION, PageRecord
+
+CHUNKS = [
+    Chunk("Results of Operations", 1, 1, "Revenue grew 12% on higher vehicle deliveries and revenue from services."),
+    Chunk("Risk Factors", 2, 2, "Litigation and regulatory inquiries could reduce revenue."),
+    Chunk("Liquidity and Capital Resources", 3, 3, "Cash and investments of $36 billion; free cash flow was positive."),
+    Chunk("Risk Factors", 4, 4, "Supply chain disruption and tariff changes may raise costs."),
+]
+
+
+def reference_scores(chunks, query):
+    documents = [tokenize(f"{chunk.section} {chunk.text}") for chunk in chunks]
+    average = sum(map(len, documents)) / len(documents)
+    scores = []
+    for tokens in documents:
+        score = 0.0
+        for term in set(tokenize(query)):
+            frequency = tokens.count(term)
+            containing = sum(term in other for other in documents)
+            if not frequency:
+                continue
+            idf = math.log1p((len(documents) - containing + 0.5) / (containing + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / average))
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_drops_stopwords_and_keeps_financial_tokens():
+    assert tokenize("The P&L of Q2-2025 was 12%") == ["p&l", "q2-2025", "12"]
+
+
+def test_search_ranks_by_bm25():
+    index = DocumentIndex.build(CHUNKS)
+    query = "revenue litigation"
+    expected = reference_scores(CHUNKS, query)
+    scores = np.asarray(index._weights[:, [index.vocabulary[t] for t in tokenize(query)]].sum(axis=1)).ravel()
+    assert scores == pytest.approx(expected)
+
+    ranked = index.search(query, top_k=3)
+    order = sorted(range(len(CHUNKS)), key=lambda i: -expected[i])
+    assert ranked == [CHUNKS[i] for i in order if expected[i] > 0][:3]
+    assert ranked[0].section == "Risk Factors"  # matches both terms
+
+
+def test_search_filters_by_section_and_skips_non_matches():
+    index = DocumentIndex.build(CHUNKS)
+    assert index.search("revenue", section="risk") == [CHUNKS[1]]
+    assert index.search("dividend") == []
+    assert DocumentIndex.build([]).search("revenue") == []
+
+
+def test_artifact_round_trip_preserves_rankings():
+    index = DocumentIndex.build(CHUNKS)
+    restored = DocumentIndex.from_artifact(index.to_artifact())
+    for query in ("revenue", "cash flow", "supply tariff costs"):
+        assert restored.search(query) == index.search(query)
+
+
+def test_chunks_stay_within_sections_and_size(monkeypatch):
+    pages = [
+        PageRecord(1, "Risk Factors\n" + "\n\n".join(f"Risk paragraph {i} " + "x" * 60 for i in range(5)), "test"),
+        PageRecord(2, "Liquidity\nCash was ample.", "test"),
+    ]
+    monkeypatch.setattr(document_index, "iter_document_pages", lambda path: iter(pages))
+    chunks = chunk_document("report.pdf", max_chars=200)
+    assert {chunk.section for chunk in chunks} == {"Risk Factors", "Liquidity and Capital Resources"}
+    assert all(len(chunk.text) <= 200 for chunk in chunks)
+    assert chunks[-1] == Chunk("Liquidity and Capital Resources", 2, 2, "Liquidity\nCash was ample.")
+
+
+def test_chunks_carry_the_pages_of_their_own_lines(monkeypatch):
+    pages = [
+        PageRecord(1, "Risk Factors\nCompetition is intense.", "test"),
+        PageRecord(2, "Supply chain disruption " + "y" * 50 + "\n\nTariffs may raise costs.", "test"),
+        PageRecord(3, "Currency swings affect " + "z" * 50 + "\nmargins.", "test"),
+    ]
+    monkeypatch.setattr(document_index, "iter_document_pages", lambda path: iter(pages))
+    chunks = chunk_document("report.pdf", max_chars=120)
+    assert [(chunk.start_page, chunk.end_page) for chunk in chunks] == [(1, 2), (2, 3)]
+    assert chunks[1].text.startswith("Tariffs")
+
+    # pieces of an oversized paragraph get the pages of their own lines
+    chunks = chunk_document("report.pdf", max_chars=90)
+    assert [(chunk.start_page, chunk.end_page) for chunk in chunks] == [(1, 1), (2, 2), (2, 2), (3, 3)]
+
+
+def test_index_key_changes_with_the_extraction_pipeline(monkeypatch, tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    key = extraction_cache.artifact_key(str(path), document_index.INDEX_PIPELINE, document_index.INDEX_PIPELINE_VERSION)
+    monkeypatch.setattr(extraction_cache_module, "EXTRACTION_PIPELINE_VERSION", EXTRACTION_PIPELINE_VERSION + 1)
+    assert extraction_cache.artifact_key(str(path), document_index.INDEX_PIPELINE, document_index.INDEX_PIPELINE_VERSION) != key
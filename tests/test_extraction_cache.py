@@ -0,0 +1,67 @@
+import pytest
+
+import extraction_cache
+from extraction_cache import ExtractionCache, ExtractionCacheError, iter_document_pages
+from pdf_extraction import EXTRACTION_PIPELINE, EXTRACTION_PIPELINE_VERSION, PageRecord
+
+PAGES = [PageRecord(page, f"page {page} text", "pypdf") for page in (1, 2, 4)]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path / "cache"), max_memory_chars=0)  # disk level only
+    monkeypatch.setattr(extraction_cache, "extraction_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def document(tmp_path, monkeypatch):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.4 test")
+    extractions = []
+
+    def iter_pages(path):
+        extractions.append(path)
+        yield from PAGES
+
+    monkeypatch.setattr(extraction_cache, "iter_pages", iter_pages)
+    return str(path), extractions
+
+
+def entry_path(cache, path):
+    key = cache.make_key(cache.file_hash(path), EXTRACTION_PIPELINE, EXTRACTION_PIPELINE_VERSION)
+    return cache._disk_path(key)
+
+
+def test_pages_are_extracted_once_and_then_served_from_disk(cache, document):
+    path, extractions = document
+    assert list(iter_document_pages(path)) == PAGES
+    assert list(iter_document_pages(path)) == PAGES
+    assert len(extractions) == 1
+
+
+def test_truncated_entry_is_dropped_and_the_remaining_pages_re_extracted(cache, document):
+    path, extractions = document
+    list(iter_document_pages(path))
+    disk_path = entry_path(cache, path)
+    with open(disk_path, encoding="utf-8") as f:
+        content = f.read()
+    with open(disk_path, "w", encoding="utf-8") as f:
+        f.write(content[: content.rindex("\n", 0, len(content) - 1) + 8])  # worker killed mid-write
+
+    assert list(iter_document_pages(path)) == PAGES  # no page repeated or lost
+    assert len(extractions) == 2
+    assert list(iter_document_pages(path)) == PAGES and len(extractions) == 2  # entry was rewritten
+
+
+def test_corrupt_entry_raises_from_the_cache_and_is_deleted(cache, document):
+    path, _ = document
+    list(iter_document_pages(path))
+    disk_path = entry_path(cache, path)
+    with open(disk_path, "w", encoding="utf-8") as f:
+        f.write('[1, "ok", "pypdf"]\n{"not": "a record"}\n')
+
+    key = cache.make_key(cache.file_hash(path), EXTRACTION_PIPELINE, EXTRACTION_PIPELINE_VERSION)
+    with pytest.raises(ExtractionCacheError):
+        list(cache.iter_pages(key))
+    assert cache.iter_pages(key) is None
@@ -0,0 +1,112 @@
+import pandas as pd
+import pytest
+
+from financial_metrics import canonical_line_item, compute_metrics, line_items_from_text, metrics_from_text
+
+QUARTERLY_TEXT = """Three Months Ended September 30, Nine Months Ended September 30,
+2025 2024 2025 2024
+Total revenues 28,095 25,182 69,926 71,983
+Net income 1,373 2,167 4,175 5,988
+"""
+
+
+def test_canonical_line_item():
+    assert canonical_line_item("Total revenues") == "revenue"
+    assert canonical_line_item("Net income attributable to common stockholders") == "net_income"
+    assert canonical_line_item("Total stockholders' equity (1)") == "total_equity"
+    assert canonical_line_item("Deferred revenue") is None
+
+
+def test_duplicate_period_header_is_qualified_by_duration():
+    items = line_items_from_text(QUARTERLY_TEXT)
+    assert list(items["revenue"].index) == [
+        "2025 (Three Months Ended)", "2024 (Three Months Ended)",
+        "2025 (Nine Months Ended)", "2024 (Nine Months Ended)",
+    ]
+    growth = metrics_from_text(QUARTERLY_TEXT)["growth"]["revenue"]
+    assert growth == {
+        "2025 (Three Months Ended) vs 2024 (Three Months Ended)": pytest.approx(0.1157, abs=1e-4),
+        "2025 (Nine Months Ended) vs 2024 (Nine Months Ended)": pytest.approx(-0.0286, abs=1e-4),
+    }
+
+
+def test_duplicate_period_header_without_durations_does_not_raise():
+    metrics = metrics_from_text(QUARTERLY_TEXT.split("\n", 1)[1])
+    assert set(metrics["growth"]["revenue"]) == {"2025 vs 2024", "2025 [2] vs 2024 [2]"}
+    assert metrics["growth"]["revenue"]["2025 vs 2024"] > 0
+
+
+def test_compute_metrics_accepts_series_with_duplicate_periods():
+    items = {"revenue": pd.Series([120.0, 100.0, 300.0, 280.0], index=["2025", "2024", "2025", "2024"])}
+    metrics = compute_metrics(items)
+    assert metrics["growth"]["revenue"]["2025 vs 2024"] == pytest.approx(0.2)
+
+
+def test_mixed_labels_never_compare_positional_columns():
+    text = "2024 2023\nTotal revenues 125 100\n--- Page 2 ---\nNet income 10 8\n"
+    metrics = metrics_from_text(text)
+    assert metrics["periods"][:2] == ["2024", "2023"]
+    assert metrics["growth"] == {"revenue": {"2024 vs 2023": 0.25}}
+
+
+def test_growth_is_sorted_by_year_whatever_the_reported_order():
+    metrics = metrics_from_text("2023 2024\nTotal revenues 100 125\n")
+    assert metrics["growth"]["revenue"] == {"2024 vs 2023": 0.25}
+
+
+def test_quarter_labels_compare_like_quarters():
+    metrics = metrics_from_text("Q2-2025 Q2-2024\nTotal revenues 110 100\nGross profit 22 25\n")
+    assert metrics["growth"]["revenue"] == {"Q2-2025 vs Q2-2024": pytest.approx(0.1)}
+    assert metrics["ratios"]["gross_margin"]["Q2-2025"] == pytest.approx(0.2)
+
+
+def test_ratios_and_derived_free_cash_flow():
+    items = {
+        "revenue": pd.Series([200.0], index=["2024"]),
+        "operating_cash_flow": pd.Series([50.0], index=["2024"]),
+        "capital_expenditures": pd.Series([-20.0], index=["2024"]),
+        "total_debt": pd.Series([40.0], index=["2024"]),
+        "total_equity": pd.Series([0.0], index=["2024"]),
+    }
+    metrics = compute_metrics(items)
+    assert metrics["line_items"]["free_cash_flow"] == {"2024": 30.0}
+    assert metrics["ratios"]["free_cash_flow_margin"] == {"2024": 0.15}
+    assert "debt_to_equity" not in metrics["ratios"]  # division by zero is omitted
+
+
+def test_metrics_failure_keeps_keyword_analysis(monkeypatch):
+    pytest.importorskip("crewai")
+    import financial_metrics
+    import tools
+
+    def broken(text):
+        raise ValueError("bad periods")
+
+    monkeypatch.setattr(financial_metrics, "metrics_from_text", broken)
+    text = "Revenue growth was strong. Dividend maintained. Litigation pending.\n2024 2023\nTotal revenues 125 100"
+    investment = tools.InvestmentTool.analyze_investment_tool(text)
+    assert "error" not in investment and "revenue" in investment["key_financial_terms"]
+    assert investment["potential_metrics"] == {"error": "Metric extraction failed: bad periods"}
+    risk = tools.RiskTool.create_risk_assessment_tool(text)
+    assert "error" not in risk and risk["leverage_metrics"] == {}
+
+
+def test_text_line_items_only_fill_gaps_left_by_tables():
+    from financial_metrics import add_text_line_items
+
+    items = {"revenue": pd.Series([130.0], index=["2024"])}
+    add_text_line_items(items, "2024 2023\nTotal revenues 125 100\nNet income 10 8\n")
+    assert items["revenue"].tolist() == [130.0]
+    assert items["net_income"].tolist() == [10.0, 8.0]
+
+
+@pytest.mark.parametrize("text, item, expected", [
+    ("Total revenues (1) 100 200", "revenue", {"p1": 100.0, "p2": 200.0}),
+    ("2024 2023\nTotal stockholders' equity (1) 500 400", "total_equity", {"2024": 500.0, "2023": 400.0}),
+    ("2024 2023\nNet income (loss) (2) 10 8", "net_income", {"2024": 10.0, "2023": 8.0}),
+    ("2024 2023\nNet loss (12) (10)", "net_income", {"2024": -12.0, "2023": -10.0}),
+    ("Net loss (12) (10)", "net_income", {"p1": -12.0, "p2": -10.0}),
+    ("2024 2023\nNet (loss) income (5) 3", "net_income", {"2024": -5.0, "2023": 3.0}),
+])
+def test_footnote_markers_are_not_read_as_amounts(text, item, expected):
+    assert line_items_from_text(text)[item].to_dict() == expected
@@ -0,0 +1,60 @@
+import pandas as pd
+
+from financial_tables import _merge_frames, classify_statement, parse_amounts, table_to_frame, unique_labels
+
+# Shape of a 10-Q income statement: column-group headings over repeated years
+QUARTERLY_ROWS = [
+    ["", "Three Months Ended September 30,", None, "Nine Months Ended September 30,", None],
+    ["", "2025", "2024", "2025", "2024"],
+    ["Total revenues", "28,095", "25,182", "69,926", "71,983"],
+    ["Gross profit", "5,054", "4,997", "12,578", "13,425"],
+    ["Net income", "1,373", "2,167", "4,175", "5,988"],
+]
+
+
+def test_parse_amounts_handles_formatting():
+    values = parse_amounts(pd.Series(["$1,234", "(56)", "7.5%", "—", None, "-3"]))
+    assert values.tolist()[:3] == [1234.0, -56.0, 7.5]
+    assert values.isna().tolist()[3:5] == [True, True]
+    assert values.iloc[5] == -3.0
+
+
+def test_quarterly_columns_are_qualified_by_group():
+    frame = table_to_frame(QUARTERLY_ROWS)
+    assert list(frame.columns) == [
+        "2025 (Three Months Ended September 30)",
+        "2024 (Three Months Ended September 30)",
+        "2025 (Nine Months Ended September 30)",
+        "2024 (Nine Months Ended September 30)",
+    ]
+    assert frame.loc["Total revenues", "2024 (Nine Months Ended September 30)"] == 71983.0
+
+
+def test_repeated_periods_without_group_row_are_made_unique():
+    frame = table_to_frame(QUARTERLY_ROWS[1:])
+    assert list(frame.columns) == ["2025", "2024", "2025 [2]", "2024 [2]"]
+    assert frame.columns.is_unique
+
+
+def test_single_header_row_is_unchanged():
+    frame = table_to_frame([["", "2024", "2023"], ["Total assets", "10", "8"], ["Other", "—", "—"]])
+    assert list(frame.columns) == ["2024", "2023"]
+    assert list(frame.index) == ["Total assets"]
+
+
+def test_merge_frames_with_quarterly_tables():
+    grouped = table_to_frame(QUARTERLY_ROWS)
+    ungrouped = table_to_frame(QUARTERLY_ROWS[1:] + [["Operating income", "1", "2", "3", "4"]])
+    merged = _merge_frames([grouped, ungrouped])
+    assert merged.index.is_unique and merged.columns.is_unique
+    assert merged.loc["Total revenues", "2025 (Three Months Ended September 30)"] == 28095.0
+    assert merged.loc["Operating income", "2024 [2]"] == 4.0
+
+
+def test_unique_labels():
+    assert unique_labels(["a", "b", "a", "a"]) == ["a", "b", "a [2]", "a [3]"]
+
+
+def test_classify_statement():
+    assert classify_statement("Total revenues ... Gross profit ... Net income") == "income_statement"
+    assert classify_statement("Nothing financial here") is None
@@ -0,0 +1,64 @@
+import pytest
+
+import llm_cache
+from llm_cache import LLMResponseCache, tool_names
+
+MESSAGES = [{"role": "system", "content": "You are an analyst."}, {"role": "user", "content": "Digest: ..."}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(str(tmp_path / "responses.sqlite3"), ttl_seconds=60, max_bytes=1024)
+
+
+def test_key_covers_model_settings_messages_and_tools():
+    key = LLMResponseCache.make_key("gpt-4o", {"temperature": 0.1, "max_tokens": 500}, MESSAGES, ["search"])
+    assert key == LLMResponseCache.make_key("gpt-4o", {"max_tokens": 500, "temperature": 0.1}, MESSAGES, ["search"])
+    assert len({
+        key,
+        LLMResponseCache.make_key("gpt-4o-mini", {"temperature": 0.1, "max_tokens": 500}, MESSAGES, ["search"]),
+        LLMResponseCache.make_key("gpt-4o", {"temperature": 0.2, "max_tokens": 500}, MESSAGES, ["search"]),
+        LLMResponseCache.make_key("gpt-4o", {"temperature": 0.1, "max_tokens": 500}, MESSAGES[:1], ["search"]),
+        LLMResponseCache.make_key("gpt-4o", {"temperature": 0.1, "max_tokens": 500}, MESSAGES, []),
+    }) == 5
+    assert LLMResponseCache.make_key("m", {}, "prompt") == LLMResponseCache.make_key("m", {}, "prompt", None)
+
+
+def test_hits_and_misses_are_counted(cache):
+    assert cache.get("k") is None
+    cache.put("k", "gpt-4o", "answer")
+    assert cache.get("k") == "answer"
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1, "size_bytes": 6}
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    cache.put("k", "gpt-4o", "answer")
+    clock[0] += 60
+    assert cache.get("k") == "answer"
+    clock[0] += 1
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0  # expired entries are deleted on lookup
+
+
+def test_least_recently_used_entries_are_evicted_over_budget(cache, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    for key in ("a", "b"):
+        cache.put(key, "gpt-4o", "x" * 400)
+        clock[0] += 1
+    cache.get("a")  # now more recently used than b
+    clock[0] += 1
+    cache.put("c", "gpt-4o", "x" * 400)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_tool_names_accept_schemas_and_tool_objects():
+    class Tool:
+        name = "Document Search"
+
+    schema = {"type": "function", "function": {"name": "read_tables"}}
+    assert tool_names([Tool(), schema]) == ["Document Search", "read_tables"]
+    assert tool_names(None) == []
@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pdf_extraction
+from pdf_extraction import PageRecord, normalize_whitespace
+
+
+def test_normalize_whitespace():
+    assert normalize_whitespace("Net  income\n\n\n\n  12") == "Net income\n\n 12"
+    assert normalize_whitespace("a\n\n\n\nb", collapse_blank_lines=False) == "a\n\n\n\nb"
+
+
+def test_parallel_extraction_keeps_page_order_and_bounds_in_flight_ranges(monkeypatch):
+    outstanding, peak = set(), [0]
+
+    def extract_page_range(path, backend, start, stop=None):
+        outstanding.add(start)
+        peak[0] = max(peak[0], len(outstanding))
+        return [PageRecord(page + 1, f"page {page + 1}", backend) for page in range(start, stop)]
+
+    monkeypatch.setattr(pdf_extraction, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(pdf_extraction, "_extract_page_range", extract_page_range)
+
+    pages = []
+    for stop, records in pdf_extraction._iter_parallel("report.pdf", "pypdf", 2, 100, workers=2):
+        assert records[-1].page_num == stop
+        pages.extend(record.page_num for record in records)
+        outstanding.discard(records[0].page_num - 1)
+    assert pages == list(range(3, 101))
+    assert peak[0] <= 2 * pdf_extraction.PDF_MAX_IN_FLIGHT_PER_WORKER
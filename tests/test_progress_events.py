@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+from progress_events import ProgressSubscription, format_sse
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.calls = []
+
+    async def get_message(self, timeout):
+        return self.messages.pop(0) if self.messages else None
+
+    async def unsubscribe(self):
+        self.calls.append("unsubscribe")
+
+    async def aclose(self):
+        self.calls.append("close")
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_closing_before_iterating_releases_the_connection():
+    pubsub, client = FakePubSub([]), FakeClient()
+    subscription = ProgressSubscription(client, pubsub, timeout=1)
+    asyncio.run(subscription.aclose())
+    asyncio.run(subscription.aclose())  # idempotent
+    assert pubsub.calls == ["unsubscribe", "close"] and client.closed
+
+
+def test_messages_are_decoded_and_timeouts_yield_none():
+    event = {"event": "status", "data": {"status": "running"}}
+    subscription = ProgressSubscription(FakeClient(), FakePubSub([{"data": json.dumps(event)}]), timeout=1)
+
+    async def read(count):
+        received = []
+        async for message in subscription:
+            received.append(message)
+            if len(received) == count:
+                await subscription.aclose()
+        return received
+
+    assert asyncio.run(read(2)) == [event, None]
+
+
+def test_format_sse():
+    assert format_sse("task", {"stage": "risk"}) == 'event: task\ndata: {"stage":"risk"}\n\n'
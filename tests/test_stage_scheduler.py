@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from stage_scheduler import run_stages
+
+DEPENDENCIES = {"analysis": [], "verification": ["analysis"], "investment": ["verification"], "risk": ["verification"]}
+
+
+def test_stages_run_after_their_dependencies_with_their_outputs():
+    calls = []
+
+    def run_stage(name, inputs):
+        calls.append((name, dict(inputs)))
+        return f"{name} output"
+
+    completions = []
+    outputs = run_stages(DEPENDENCIES, run_stage, on_stage_complete=lambda name, output, count: completions.append((name, count)))
+
+    order = [name for name, _ in calls]
+    assert order[:2] == ["analysis", "verification"] and set(order[2:]) == {"investment", "risk"}
+    assert dict(calls)["risk"] == {"verification": "verification output"}
+    assert outputs == {name: f"{name} output" for name in DEPENDENCIES}
+    assert [count for _, count in completions] == [1, 2, 3, 4]
+
+
+def test_independent_stages_run_concurrently():
+    both_running = threading.Barrier(2, timeout=5)
+
+    def run_stage(name, inputs):
+        if name in ("investment", "risk"):
+            both_running.wait()  # only passes if the two stages overlap
+        return name
+
+    run_stages(DEPENDENCIES, run_stage, max_parallel=2)
+
+
+def test_completed_stages_are_not_rerun():
+    calls = []
+    completed = {"analysis": "cached analysis", "verification": "cached verification"}
+    outputs = run_stages(DEPENDENCIES, lambda name, inputs: calls.append(inputs) or name, completed=completed)
+    assert calls == [{"verification": "cached verification"}] * 2
+    assert outputs["analysis"] == "cached analysis" and outputs["risk"] == "risk"
+
+
+def test_failure_lets_running_stages_finish_and_skips_dependents():
+    finished = []
+
+    def run_stage(name, inputs):
+        if name == "investment":
+            raise RuntimeError("LLM unavailable")
+        time.sleep(0.05)
+        finished.append(name)
+        return name
+
+    with pytest.raises(RuntimeError, match="LLM unavailable"):
+        run_stages(dict(DEPENDENCIES, report=["investment", "risk"]), run_stage, max_parallel=2)
+    assert finished == ["analysis", "verification", "risk"]
+
+
+def test_unsatisfiable_dependencies_are_reported():
+    with pytest.raises(ValueError, match="summary"):
+        run_stages({"summary": ["missing"]}, lambda name, inputs: name)
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from status_cache import StatusCache, is_terminal, make_etag
+
+
+def payload(status, task_status=None, **extra):
+    return dict({"analysis_id": 1, "status": status, "task_status": task_status}, **extra)
+
+
+@pytest.mark.parametrize("status, task_status, terminal", [
+    ("completed", "SUCCESS", True),
+    ("completed", None, True),
+    ("failed", "FAILURE", True),
+    ("failed", "REVOKED", True),
+    ("failed", "RETRY", False),
+    ("failed", "STARTED", False),
+    ("failed", None, False),
+    ("failed", "SOMETHING_NEW", False),
+    ("running", "STARTED", False),
+])
+def test_is_terminal(status, task_status, terminal):
+    assert is_terminal(payload(status, task_status)) is terminal
+
+
+def test_etag_is_stable_and_changes_with_the_payload():
+    first = make_etag(payload("running", "STARTED", progress=1))
+    assert first == make_etag({"progress": 1, "task_status": "STARTED", "status": "running", "analysis_id": 1})
+    assert first != make_etag(payload("running", "STARTED", progress=2))
+    assert first.startswith('"') and first.endswith('"')
+
+
+def test_active_and_terminal_entries_expire_after_their_ttls(monkeypatch):
+    cache = StatusCache(ttl=2, terminal_ttl=3600, redis_url=None)
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+
+    active = cache.put(payload("running", "STARTED"))
+    assert not active.terminal and cache.peek(1) == active
+    clock[0] += 3
+    assert cache.peek(1) is None
+
+    finished = cache.put(payload("failed", "FAILURE", error_message="boom"))
+    assert finished.terminal
+    clock[0] += 3599
+    assert cache.peek(1) == finished
+    clock[0] += 2
+    assert cache.peek(1) is None
+
+
+def test_least_recently_used_entries_are_dropped():
+    cache = StatusCache(max_entries=2, redis_url=None)
+    for analysis_id in (1, 2):
+        cache.put(dict(payload("completed"), analysis_id=analysis_id))
+    cache.peek(1)
+    cache.put(dict(payload("completed"), analysis_id=3))
+    assert cache.peek(2) is None and cache.peek(1) is not None and cache.peek(3) is not None
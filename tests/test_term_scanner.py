@@ -0,0 +1,15 @@
+from term_scanner import TermScanner
+
+scanner = TermScanner({"risk": ["litigation", "market conditions"], "terms": ["loss"]})
+
+
+def test_terms_match_whole_words_across_line_breaks():
+    scan = scanner.scan("Glossary. Market\nconditions weakened; litigation and LOSS.")
+    assert scan.found("risk") == ["litigation", "market conditions"]
+    assert scan.counts == {"market conditions": 1, "litigation": 1, "loss": 1}
+
+
+def test_merged_page_scans_match_a_scan_of_the_joined_text():
+    pages = ["Litigation is pending.", "A loss and more litigation."]
+    merged = scanner.scan(pages[0]).merge(scanner.scan(pages[1]), len(pages[0]) + 1)
+    assert merged.positions == scanner.scan("\n".join(pages)).positions
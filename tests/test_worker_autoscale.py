@@ -0,0 +1,82 @@
+import pytest
+from celery.worker import state
+
+import worker_autoscale
+from worker_autoscale import MB, MemoryAwareAutoscaler, estimate_request_memory_mb, estimate_task_memory_mb
+
+
+class FakePool:
+    def __init__(self, processes):
+        self.num_processes = processes
+
+    def grow(self, n):
+        self.num_processes += n
+
+    def shrink(self, n):
+        self.num_processes -= n
+
+
+class FakeRequest:
+    def __init__(self, path="missing.pdf"):
+        self.args = [1, path, "query"]
+
+
+@pytest.fixture
+def reserved():
+    requests = []
+
+    def reserve(*paths, active=0):
+        for path in paths:
+            request = FakeRequest(path)
+            requests.append(request)  # reserved_requests is a WeakSet
+            state.reserved_requests.add(request)
+        for request in requests[:active]:
+            state.active_requests.add(request)
+        return requests
+
+    yield reserve
+    for request in requests:
+        state.reserved_requests.discard(request)
+        state.active_requests.discard(request)
+
+
+def test_task_estimate_grows_with_file_size_and_pages():
+    assert estimate_task_memory_mb(0, 0) == 300
+    assert estimate_task_memory_mb(10 * MB, 100) == 300 + 40 + 150
+
+
+def test_request_estimate_reads_the_document(tmp_path):
+    document = tmp_path / "scan.pdf"
+    document.write_bytes(b"not a pdf" * (MB // 9))  # unreadable, so pages are estimated from size
+    size = document.stat().st_size
+    assert estimate_request_memory_mb(FakeRequest(str(document))) == estimate_task_memory_mb(size, size // (100 * 1024))
+    assert estimate_request_memory_mb(FakeRequest()) == estimate_task_memory_mb(0, 0)
+    assert estimate_request_memory_mb(object()) == estimate_task_memory_mb(0, 0)
+
+
+def test_admission_fits_waiting_tasks_into_the_headroom(reserved):
+    scaler = MemoryAwareAutoscaler(FakePool(1), max_concurrency=8)
+    reserved("a.pdf", "b.pdf", "c.pdf", "d.pdf", active=1)  # one is already running
+    assert scaler.admissible(3, headroom=None) == 3
+    assert scaler.admissible(3, headroom=650) == 2
+    assert scaler.admissible(3, headroom=2000) == 3
+    assert scaler.admissible(3, headroom=299) == 0
+
+
+def test_pool_grows_within_the_headroom(reserved, monkeypatch):
+    monkeypatch.setattr(worker_autoscale, "memory_headroom_mb", lambda: 700)
+    pool = FakePool(1)
+    scaler = MemoryAwareAutoscaler(pool, max_concurrency=4)
+    reserved("a.pdf", "b.pdf", "c.pdf", "d.pdf", "e.pdf")
+
+    assert scaler._maybe_scale()
+    assert pool.num_processes == 3  # 700 MB admits two 300 MB analyses
+    assert not scaler._maybe_scale()  # cooldown before measuring again
+
+
+def test_pool_shrinks_when_over_budget(monkeypatch):
+    monkeypatch.setattr(worker_autoscale, "memory_headroom_mb", lambda: -100)
+    pool = FakePool(3)
+    scaler = MemoryAwareAutoscaler(pool, max_concurrency=4, min_concurrency=1)
+    assert scaler._maybe_scale()
+    assert pool.num_processes == 2
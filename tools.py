@@ -5,40 +5,30 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-## Updated PDF processing imports to match optimized installation
-## Added pypdf as primary library with PyPDF2 as fallback
-# PDF processing imports
-try:
-    from pypdf import PdfReader  # Primary PDF library
-    PYPDF_AVAILABLE = True
-except ImportError:
-    PYPDF_AVAILABLE = False
-    
-try:
-    import PyPDF2
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
-    
-try:
-    import pdfplumber
-    PDFPLUMBER_AVAILABLE = True
-except ImportError:
-    PDFPLUMBER_AVAILABLE = False
-import pandas as pd
-import numpy as np
-from typing import Dict, List, Any, Optional, Type
+from typing import Dict, Iterator, List, Any, Optional, Type
 from pydantic import BaseModel, Field
 
+## PDF backends live in pdf_extraction so extraction worker processes stay lightweight
+from pdf_extraction import PageRecord, PDFExtractionError, normalize_whitespace
+from extraction_cache import iter_document_pages
+from term_scanner import ScanResult, term_scanner
+from term_signals import investment_signals, risk_signals
+## pandas/NumPy/SciPy-backed modules (financial_tables, document_index, financial_metrics)
+## are imported inside the tools on first use, keeping this module cheap to import
+
 
 ## from crewai_tools import BaseTool
 from crewai.tools import BaseTool  # << moved from crewai_tools to crewai.tools
 ## from crewai_tools.tools.serper_dev_tool import SerperDevTool
 
-from crewai_tools import SerperDevTool
+## Creating search tool (only when a Serper key is configured; crewai_tools is a heavy import)
+def _build_search_tool():
+    if not os.getenv("SERPER_API_KEY"):
+        return None
+    from crewai_tools import SerperDevTool
+    return SerperDevTool()
 
-## Creating search tool
-search_tool = SerperDevTool()
+search_tool = _build_search_tool()
 
 class ReadPDFInput(BaseModel):
     path: str = Field(default="data/sample.pdf", description="Path to the PDF file")
@@ -53,6 +43,11 @@ class FinancialDocumentTool(BaseTool):
     args_schema: Type[BaseModel] = ReadPDFInput
 
 
+    @staticmethod
+    def iter_pages(path: str = 'data/sample.pdf') -> Iterator[PageRecord]:
+        """Stream the pages of a PDF as (page_num, text, extractor) records, in page order"""
+        return iter_document_pages(path)
+
     @staticmethod
     def read_data_tool(path: str = 'data/sample.pdf') -> str:
         # """Tool to read data from a pdf file from a path
@@ -66,73 +61,106 @@ class FinancialDocumentTool(BaseTool):
         try:
             if not os.path.exists(path):
                 return f"Error: File {path} not found."
-                
-            full_report = ""
-            
-            # Try multiple PDF processing approaches in order of preference
-            pdf_processed = False
-            
-            # 1. Try pdfplumber first (best for financial documents)
-            if PDFPLUMBER_AVAILABLE and not pdf_processed:
-                try:
-                    with pdfplumber.open(path) as pdf:
-                        for page_num, page in enumerate(pdf.pages):
-                            text = page.extract_text()
-                            if text:
-                                # Clean and format the financial document data
-                                content = text.strip()
-                                # Remove excessive whitespaces and format properly
-                                while "\n\n\n" in content:
-                                    content = content.replace("\n\n\n", "\n\n")
-                                
-                                full_report += f"\n--- Page {page_num + 1} ---\n{content}\n"
-                    pdf_processed = True
-                except Exception as pdfplumber_error:
-                    pass  # Try next method
-            
-            # 2. Try pypdf as secondary option
-            if PYPDF_AVAILABLE and not pdf_processed:
-                try:
-                    with open(path, 'rb') as file:
-                        pdf_reader = PdfReader(file)
-                        for page_num, page in enumerate(pdf_reader.pages):
-                            text = page.extract_text()
-                            if text:
-                                content = text.strip()
-                                while "\n\n\n" in content:
-                                    content = content.replace("\n\n\n", "\n\n")
-                                full_report += f"\n--- Page {page_num + 1} ---\n{content}\n"
-                    pdf_processed = True
-                except Exception as pypdf_error:
-                    pass  # Try next method
-            
-            # 3. Fallback to PyPDF2 if other methods fail
-            if PYPDF2_AVAILABLE and not pdf_processed:
-                try:
-                    with open(path, 'rb') as file:
-                        pdf_reader = PyPDF2.PdfReader(file)
-                        for page_num, page in enumerate(pdf_reader.pages):
-                            text = page.extract_text()
-                            if text:
-                                content = text.strip()
-                                while "\n\n\n" in content:
-                                    content = content.replace("\n\n\n", "\n\n")
-                                full_report += f"\n--- Page {page_num + 1} ---\n{content}\n"
-                    pdf_processed = True
-                except Exception as pypdf2_error:
-                    pass  # All methods failed
-            
-            if not pdf_processed:
-                return f"Error: No PDF processing libraries available or all methods failed"
-                            
+
+            ## Pages are streamed (and cached by document hash) by iter_pages;
+            ## the tool output is a single join over them
+            full_report = "".join(
+                f"\n--- Page {record.page_num} ---\n{record.text}\n" for record in FinancialDocumentTool.iter_pages(path)
+            )
             return full_report if full_report else "Error: Could not extract text from PDF"
-            
+
+        except PDFExtractionError as e:
+            return f"Error: {str(e)}"
         except Exception as e:
             return f"Error reading PDF file: {str(e)}"
     
     def _run(self, path: str = 'data/sample.pdf') -> str:
         return self.read_data_tool(path)
 
+class DocumentSearchInput(BaseModel):
+    path: str = Field(default="data/sample.pdf", description="Path to the PDF file")
+    query: str = Field(..., description="What to look for, e.g. 'debt maturities' or 'liquidity risk'")
+    top_k: int = Field(default=5, description="Number of passages to return")
+    section: Optional[str] = Field(default=None, description="Optional section filter, e.g. 'Risk Factors'")
+
+
+## Returns only the top-ranked section-labelled passages (BM25 over a per-document
+## index) instead of the whole report
+class DocumentSearchTool(BaseTool):
+    name: str = "Financial Document Search"
+    description: str = (
+        "Finds the most relevant passages of a financial PDF for a question, labelled with their section "
+        "and pages (e.g. MD&A, Risk Factors, Liquidity, debt footnotes)"
+    )
+    args_schema: Type[BaseModel] = DocumentSearchInput
+
+    @staticmethod
+    def search_document_tool(path: str, query: str, top_k: int = 5, section: Optional[str] = None) -> str:
+        try:
+            if not os.path.exists(path):
+                return f"Error: File {path} not found."
+            from document_index import get_document_index, format_chunks
+            return format_chunks(get_document_index(path).search(query, top_k=top_k, section=section))
+        except PDFExtractionError as e:
+            return f"Error: {str(e)}"
+        except Exception as e:
+            return f"Error searching document: {str(e)}"
+
+    def _run(self, path: str = 'data/sample.pdf', query: str = "", top_k: int = 5, section: Optional[str] = None) -> str:
+        return self.search_document_tool(path, query, top_k, section)
+
+## Financial statement tables are returned as compact CSV so agents read numbers
+## directly instead of re-parsing them from the page text
+class FinancialTablesTool(BaseTool):
+    name: str = "Financial Statement Tables"
+    description: str = "Extracts income statement, balance sheet and cash-flow tables from a PDF as CSV"
+    args_schema: Type[BaseModel] = ReadPDFInput
+
+    @staticmethod
+    def read_tables_tool(path: str = 'data/sample.pdf') -> str:
+        try:
+            if not os.path.exists(path):
+                return f"Error: File {path} not found."
+            from financial_tables import extract_financial_tables, format_tables
+            return format_tables(extract_financial_tables(path))
+        except PDFExtractionError as e:
+            return f"Error: {str(e)}"
+        except Exception as e:
+            return f"Error extracting tables: {str(e)}"
+
+    def _run(self, path: str = 'data/sample.pdf') -> str:
+        return self.read_tables_tool(path)
+
+## Computed ratios and growth rates are a few hundred tokens of JSON instead of
+## the thousands of tokens of raw text the agents would otherwise read
+class FinancialMetricsTool(BaseTool):
+    name: str = "Financial Metrics Calculator"
+    description: str = "Computes margins, year-over-year growth and leverage ratios from a financial PDF as JSON"
+    args_schema: Type[BaseModel] = ReadPDFInput
+
+    @staticmethod
+    def calculate_metrics_tool(path: str = 'data/sample.pdf') -> str:
+        try:
+            if not os.path.exists(path):
+                return f"Error: File {path} not found."
+            from financial_metrics import metrics_from_document, format_metrics
+            return format_metrics(metrics_from_document(path))
+        except PDFExtractionError as e:
+            return f"Error: {str(e)}"
+        except Exception as e:
+            return f"Error computing metrics: {str(e)}"
+
+    def _run(self, path: str = 'data/sample.pdf') -> str:
+        return self.calculate_metrics_tool(path)
+
+def _metrics_or_error(text: str) -> Dict[str, Any]:
+    ## A metrics failure is reported in place so the term and risk analysis still run
+    try:
+        from financial_metrics import metrics_from_text
+        return metrics_from_text(text)
+    except Exception as e:
+        return {"error": f"Metric extraction failed: {str(e)}"}
+
 class InvestmentInput(BaseModel):
     financial_document_data: str = Field(..., description="Raw text extracted from a financial PDF")
 
@@ -157,46 +185,27 @@ class InvestmentTool(BaseTool):
             if not financial_document_data or financial_document_data.strip() == "":
                 return {"error": "No financial data provided for analysis"}
             
-            # Clean up the data format
-            processed_data = financial_document_data
-            while "  " in processed_data:  # Remove double spaces
-                processed_data = processed_data.replace("  ", " ")
-            
-            # Basic financial metrics extraction (simplified)
-            analysis_results = {
-                "document_length": len(processed_data),
-                "key_financial_terms": [],
-                "potential_metrics": [],
-                "investment_indicators": [],
-                "analysis_summary": ""
-            }
-            
-            # Look for common financial terms
-            financial_terms = [
-                "revenue", "profit", "loss", "ebitda", "margin", "growth", 
-                "cash flow", "debt", "equity", "assets", "liabilities",
-                "earnings", "dividend", "market cap", "p/e ratio", "roi"
-            ]
-            
-            text_lower = processed_data.lower()
-            found_terms = [term for term in financial_terms if term in text_lower]
-            analysis_results["key_financial_terms"] = found_terms[:10]  # Limit to top 10
-            
-            # Simple investment indicators
-            if "growth" in text_lower and "revenue" in text_lower:
-                analysis_results["investment_indicators"].append("Potential Growth Company")
-            if "dividend" in text_lower:
-                analysis_results["investment_indicators"].append("Dividend-Paying Stock")
-            if "debt" in text_lower and "low" in text_lower:
-                analysis_results["investment_indicators"].append("Low Debt Profile")
-                
-            analysis_results["analysis_summary"] = f"Found {len(found_terms)} key financial terms in document"
+            # Clean up the data format (collapse runs of spaces in one pass)
+            processed_data = normalize_whitespace(financial_document_data, collapse_blank_lines=False)
             
-            return analysis_results
+            ## Terms come from the shared term_scanner dictionaries and are matched
+            ## as whole words in a single pass over the document
+            scan = term_scanner.scan(processed_data)
+            # Numeric line items parsed from the text, with margins, growth and leverage
+            metrics = _metrics_or_error(processed_data)
+            return InvestmentTool.analyze_scan(scan, len(processed_data), metrics)
             
         except Exception as e:
             return {"error": f"Investment analysis failed: {str(e)}"}
     
+    ## The signal logic lives in term_signals, shared with the document digest
+    @staticmethod
+    def analyze_scan(scan: ScanResult, document_length: int, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return investment_signals(scan, document_length, metrics)
+        except Exception as e:
+            return {"error": f"Investment analysis failed: {str(e)}"}
+    
     def _run(self, financial_document_data: str) -> Dict[str, Any]:
         return self.analyze_investment_tool(financial_document_data)
 
@@ -224,72 +233,27 @@ class RiskTool(BaseTool):
             if not financial_document_data or financial_document_data.strip() == "":
                 return {"error": "No financial data provided for risk assessment"}
             
-            text_lower = financial_document_data.lower()
-            
-            risk_assessment = {
-                "overall_risk_level": "Medium",  # Default
-                "identified_risks": [],
-                "risk_factors": [],
-                "mitigation_suggestions": [],
-                "risk_score": 5,  # Scale of 1-10
-                "assessment_summary": ""
-            }
-            
-            # Risk indicators
-            high_risk_terms = ["loss", "decline", "bankruptcy", "litigation", "regulatory", "volatile"]
-            moderate_risk_terms = ["uncertainty", "competition", "market conditions", "economic"]
-            low_risk_terms = ["stable", "consistent", "diversified", "strong position"]
-            
-            # Count risk indicators
-            high_risk_count = sum(1 for term in high_risk_terms if term in text_lower)
-            moderate_risk_count = sum(1 for term in moderate_risk_terms if term in text_lower)
-            low_risk_count = sum(1 for term in low_risk_terms if term in text_lower)
-            
-            # Calculate risk score
-            risk_score = 5  # Base score
-            risk_score += high_risk_count * 1.5
-            risk_score += moderate_risk_count * 0.5
-            risk_score -= low_risk_count * 0.5
-            risk_score = max(1, min(10, risk_score))  # Clamp between 1-10
-            
-            # Determine overall risk level
-            if risk_score <= 3:
-                risk_level = "Low"
-            elif risk_score <= 7:
-                risk_level = "Medium"
-            else:
-                risk_level = "High"
-                
-            # Identify specific risks
-            identified_risks = []
-            if "debt" in text_lower:
-                identified_risks.append("Debt levels may impact financial flexibility")
-            if "competition" in text_lower:
-                identified_risks.append("Competitive market pressures identified")
-            if "regulatory" in text_lower:
-                identified_risks.append("Regulatory compliance risks present")
-                
-            risk_assessment.update({
-                "overall_risk_level": risk_level,
-                "risk_score": round(risk_score, 1),
-                "identified_risks": identified_risks[:5],  # Limit to top 5
-                "risk_factors": [f"High-risk terms: {high_risk_count}", f"Moderate-risk terms: {moderate_risk_count}"],
-                "mitigation_suggestions": [
-                    "Diversify investment portfolio",
-                    "Monitor financial metrics regularly",
-                    "Consider position sizing based on risk level"
-                ],
-                "assessment_summary": f"Risk level: {risk_level} (Score: {round(risk_score, 1)}/10)"
-            })
-            
-            return risk_assessment
+            scan = term_scanner.scan(financial_document_data)
+            metrics = _metrics_or_error(financial_document_data)
+            return RiskTool.assess_scan(scan, metrics)
             
         except Exception as e:
             return {"error": f"Risk assessment failed: {str(e)}"}
     
+    ## The signal logic lives in term_signals, shared with the document digest
+    @staticmethod
+    def assess_scan(scan: ScanResult, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return risk_signals(scan, metrics)
+        except Exception as e:
+            return {"error": f"Risk assessment failed: {str(e)}"}
+    
     def _run(self, financial_document_data: str) -> Dict[str, Any]:
         return self.create_risk_assessment_tool(financial_document_data)
 
 financial_document_tool = FinancialDocumentTool()
+document_search_tool = DocumentSearchTool()
+financial_tables_tool = FinancialTablesTool()
+financial_metrics_tool = FinancialMetricsTool()
 investment_tool = InvestmentTool()
 risk_tool = RiskTool()
\ No newline at end of file
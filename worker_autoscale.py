@@ -0,0 +1,201 @@
+"""
+Memory-aware autoscaling for the analysis worker
+
+With `celery worker --autoscale=max,min` the worker reserves up to `max`
+tasks from the queue and grows its process pool to match. Analyses spend
+most of their time waiting on the LLM, so many can run side by side, but
+their memory depends on the document: MemoryAwareAutoscaler only adds a
+process while the estimated footprint of the next waiting task fits in the
+memory headroom. The headroom is the smaller of the free memory (host
+MemAvailable, or the cgroup limit when running in a container) minus a
+reserve, and the worker's RSS budget minus its current RSS. When the
+headroom goes negative, idle processes are shut down.
+
+Per-task memory is estimated from the document's file size and page count:
+a fixed base for the crew and LLM clients, plus a multiple of the file size,
+plus a per-page allowance for text and layout extraction.
+"""
+import os
+import logging
+from functools import lru_cache
+from time import monotonic
+from typing import Any, List, Optional
+
+from celery.worker import state
+from celery.worker.autoscale import Autoscaler
+
+from pdf_extraction import count_pages
+
+logger = logging.getLogger(__name__)
+
+# Admission thresholds from environment variables
+WORKER_MIN_FREE_MEMORY_MB = int(os.getenv("WORKER_MIN_FREE_MEMORY_MB", "1024"))  # always left free
+WORKER_MAX_RSS_MB = int(os.getenv("WORKER_MAX_RSS_MB", "0"))  # RSS budget of the worker and its children; 0 = none
+WORKER_SCALE_UP_COOLDOWN = float(os.getenv("WORKER_SCALE_UP_COOLDOWN", "20"))  # seconds for new tasks to allocate
+
+# Per-task memory estimate: base + file size x factor + pages x per-page allowance
+WORKER_TASK_BASE_MEMORY_MB = int(os.getenv("WORKER_TASK_BASE_MEMORY_MB", "300"))
+WORKER_TASK_FILE_SIZE_FACTOR = float(os.getenv("WORKER_TASK_FILE_SIZE_FACTOR", "4"))
+WORKER_TASK_MEMORY_PER_PAGE_MB = float(os.getenv("WORKER_TASK_MEMORY_PER_PAGE_MB", "1.5"))
+ASSUMED_BYTES_PER_PAGE = 100 * 1024  # page count fallback when the PDF cannot be opened
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+MB = 1024 * 1024
+
+
+@lru_cache(maxsize=1024)
+def _document_pages(path: str, size: int) -> int:
+    try:
+        return count_pages(path)
+    except Exception:
+        return max(1, size // ASSUMED_BYTES_PER_PAGE)
+
+
+def estimate_task_memory_mb(file_size: int, page_count: int) -> float:
+    """Estimated peak memory of one analysis of a document"""
+    return (
+        WORKER_TASK_BASE_MEMORY_MB
+        + WORKER_TASK_FILE_SIZE_FACTOR * file_size / MB
+        + WORKER_TASK_MEMORY_PER_PAGE_MB * page_count
+    )
+
+
+def estimate_request_memory_mb(request: Any) -> float:
+    """Estimate for a reserved analyze_document request (args: analysis_id, document_path, query)"""
+    args = getattr(request, "args", None) or ()
+    path = args[1] if len(args) > 1 and isinstance(args[1], str) else None
+    if not path or not os.path.exists(path):
+        return estimate_task_memory_mb(0, 0)
+    size = os.path.getsize(path)
+    return estimate_task_memory_mb(size, _document_pages(path, size))
+
+
+def _read_proc_kb(path: str, field: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _cgroup_available_mb() -> Optional[float]:
+    # cgroup v2: memory.max is "max" when the container has no limit
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = f.read().strip()
+        with open("/sys/fs/cgroup/memory.current") as f:
+            current = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+    if limit == "max":
+        return None
+    return (int(limit) - current) / MB
+
+
+def available_memory_mb() -> Optional[float]:
+    """Memory that can still be allocated without swapping, or None if unknown"""
+    if PSUTIL_AVAILABLE:
+        host = psutil.virtual_memory().available / MB
+    else:
+        available_kb = _read_proc_kb("/proc/meminfo", "MemAvailable")
+        host = available_kb / 1024 if available_kb is not None else None
+    cgroup = _cgroup_available_mb()
+    candidates = [value for value in (host, cgroup) if value is not None]
+    return min(candidates) if candidates else None
+
+
+def worker_rss_mb() -> Optional[float]:
+    """RSS of this process plus its pool children, or None if unknown"""
+    if PSUTIL_AVAILABLE:
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / MB
+    own_kb = _read_proc_kb(f"/proc/{os.getpid()}/status", "VmRSS")
+    if own_kb is None:
+        return None
+    total_kb = own_kb
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        if _read_proc_kb(f"/proc/{pid}/status", "PPid") == os.getpid():
+            total_kb += _read_proc_kb(f"/proc/{pid}/status", "VmRSS") or 0
+    return total_kb / 1024
+
+
+def memory_headroom_mb() -> Optional[float]:
+    """Memory available for new tasks under both thresholds, or None if it cannot be measured"""
+    limits: List[float] = []
+    available = available_memory_mb()
+    if available is not None:
+        limits.append(available - WORKER_MIN_FREE_MEMORY_MB)
+    if WORKER_MAX_RSS_MB > 0:
+        rss = worker_rss_mb()
+        if rss is not None:
+            limits.append(WORKER_MAX_RSS_MB - rss)
+    return min(limits) if limits else None
+
+
+class MemoryAwareAutoscaler(Autoscaler):
+    """Celery autoscaler that grows the pool with queue depth, within the memory headroom"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._throttled = False
+
+    def admissible(self, wanted: int, headroom: Optional[float]) -> int:
+        """How many of the wanted extra processes the memory headroom allows"""
+        if headroom is None:
+            return wanted
+        waiting = [request for request in state.reserved_requests if request not in state.active_requests]
+        admitted = 0
+        for request in waiting[:wanted]:
+            estimate = estimate_request_memory_mb(request)
+            if estimate > headroom:
+                break
+            headroom -= estimate
+            admitted += 1
+        throttled = admitted < wanted
+        if throttled and not self._throttled:
+            logger.warning(
+                f"Memory headroom admits {admitted} of {wanted} waiting analyses; "
+                f"holding the pool at {self.processes + admitted} processes"
+            )
+        self._throttled = throttled
+        return admitted
+
+    def _maybe_scale(self, req=None):
+        procs = self.processes
+        headroom = memory_headroom_mb()
+        if headroom is not None and headroom < 0 and procs > max(self.min_concurrency, 1):
+            logger.warning(f"Worker is {-headroom:.0f} MB over its memory budget; shutting down an idle process")
+            self._shrink(1)
+            return True
+
+        wanted = min(self.qty, self.max_concurrency) - procs
+        if wanted <= 0:
+            return super()._maybe_scale(req)
+        # Give the last admitted tasks time to allocate before measuring again
+        if self._last_scale_up and monotonic() - self._last_scale_up < WORKER_SCALE_UP_COOLDOWN:
+            return False
+        admitted = self.admissible(wanted, headroom)
+        if admitted:
+            self.scale_up(admitted)
+            return True
+        return False
+
+    def info(self):
+        info = super().info()
+        headroom = memory_headroom_mb()
+        info["memory_headroom_mb"] = round(headroom) if headroom is not None else None
+        return info